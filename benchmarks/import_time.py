@@ -0,0 +1,100 @@
+"""
+Measures the import times of the iprPy_fit modules in fresh interpreters and
+the time needed to start worker processes that import them.
+
+Usage:
+    python benchmarks/import_time.py [--repeat N] [--workers N ...]
+"""
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import time
+import importlib
+
+# Import iprPy_fit from this repository
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+MODULES = [
+    'numpy',
+    'lammps',
+    'iprPy_fit',
+    'iprPy_fit.worker',
+    'iprPy_fit.evaluate',
+    'iprPy_fit.lammps',
+    'iprPy_fit.reference',
+    'iprPy_fit.parambuilder',
+    'iprPy_fit.minimize',
+    'iprPy_fit.record',
+]
+
+def interpreter_time(repeat: int) -> list:
+    """Times starting and stopping bare interpreters, in seconds"""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+def import_time(module: str, repeat: int) -> list:
+    """Times importing a module in new interpreters, in seconds"""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True,
+                       cwd=ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+def _import(module: str):
+    importlib.import_module(module)
+
+def spawn_time(module: str, nworkers: int) -> float:
+    """Times starting nworkers spawned processes that import a module"""
+    ctx = mp.get_context('spawn')
+    start = time.perf_counter()
+    processes = [ctx.Process(target=_import, args=(module,))
+                 for i in range(nworkers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    if any(process.exitcode != 0 for process in processes):
+        raise RuntimeError(f'workers failed to import {module}')
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of interpreters started per module')
+    parser.add_argument('--workers', type=int, nargs='*', default=[4],
+                        help='worker counts to time process startup for')
+    args = parser.parse_args()
+
+    baseline = statistics.median(interpreter_time(args.repeat))
+    print(f'{"interpreter startup":<26} {baseline:8.3f} s')
+    print()
+    print(f'{"module":<26} {"median":>8} {"min":>8}  (seconds, startup subtracted)')
+    for module in MODULES:
+        try:
+            times = import_time(module, args.repeat)
+        except subprocess.CalledProcessError:
+            print(f'{module:<26} {"failed":>8}')
+            continue
+        print(f'{module:<26} {statistics.median(times) - baseline:8.3f} '
+              f'{min(times) - baseline:8.3f}')
+
+    print()
+    for nworkers in args.workers:
+        for module in ['iprPy_fit.worker', 'iprPy_fit.evaluate']:
+            elapsed = spawn_time(module, nworkers)
+            print(f'spawn {nworkers:>3} workers importing {module:<20} {elapsed:8.3f} s')
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,14 @@
-from . import parambuilder
-from . import record
-from . import lammps
-from . import evaluate
-from . import minimize
+# The subpackages are imported on first access so that worker processes that
+# only need iprPy_fit.worker do not pay for importing atomman, potentials,
+# iprPy, yabadaba and scipy.
+import importlib
 
-__all__ = ['parambuilder', 'lammps', 'record', 'evaluate', 'minimize']
\ No newline at end of file
+__all__ = ['parambuilder', 'lammps', 'record', 'reference', 'evaluate', 'minimize']
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
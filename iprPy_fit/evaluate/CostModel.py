@@ -0,0 +1,143 @@
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+class CostModel():
+    """
+    Estimates the evaluation time of each reference structure.  Initial
+    estimates scale with the number of atoms times the number of neighbors
+    each atom has.  Measured evaluation times replace the estimates as they
+    become available, and the estimates for unmeasured structures are
+    rescaled to the measured times.
+    """
+    def __init__(self,
+                 natoms: npt.ArrayLike,
+                 volumes: Optional[npt.ArrayLike] = None,
+                 cutoff: float = 4.0,
+                 smoothing: float = 0.5):
+        """
+        Initializes a CostModel.
+
+        Parameters
+        ----------
+        natoms : array-like object
+            The number of atoms in each structure.
+        volumes : array-like object, optional
+            The box volume of each structure.  If not given, all structures
+            are assumed to have the same atomic density.
+        cutoff : float, optional
+            The neighbor cutoff distance used to estimate the number of
+            neighbors from the atomic density.  Default value is 4.0.
+        smoothing : float, optional
+            The weight given to each new timing when updating a structure's
+            measured time.  Default value is 0.5.
+        """
+        self.__natoms = np.asarray(natoms, dtype=float)
+        if volumes is None:
+            neighbors = np.zeros_like(self.__natoms)
+        else:
+            density = self.__natoms / np.asarray(volumes, dtype=float)
+            neighbors = 4.0 / 3.0 * np.pi * cutoff**3 * density
+        self.__estimates = self.__natoms * (1.0 + neighbors)
+        self.__measured = np.full(len(self.__natoms), np.nan)
+        self.smoothing = smoothing
+
+    @classmethod
+    def from_paramsets(cls,
+                       paramsets: list,
+                       cutoff: float = 4.0,
+                       smoothing: float = 0.5):
+        """
+        Initializes a CostModel based on paramsets.
+
+        Parameters
+        ----------
+        paramsets : list of dict
+            The paramsets as generated by dump_lammps_dynamic_parameters().
+        cutoff : float, optional
+            The neighbor cutoff distance used to estimate the number of
+            neighbors from the atomic density.  Default value is 4.0.
+        smoothing : float, optional
+            The weight given to each new timing when updating a structure's
+            measured time.  Default value is 0.5.
+        """
+        natoms = []
+        volumes = []
+        for params in paramsets:
+            xlo, xhi, ylo, yhi, zlo, zhi = params['region_params'][:6]
+            natoms.append(len(params['atype']))
+            volumes.append((xhi - xlo) * (yhi - ylo) * (zhi - zlo))
+
+        return cls(natoms, volumes, cutoff=cutoff, smoothing=smoothing)
+
+    @classmethod
+    def from_systems(cls,
+                     systems: list,
+                     cutoff: float = 4.0,
+                     smoothing: float = 0.5):
+        """
+        Initializes a CostModel based on atomman Systems.
+
+        Parameters
+        ----------
+        systems : list of atomman.System
+            The reference atomic systems.
+        cutoff : float, optional
+            The neighbor cutoff distance used to estimate the number of
+            neighbors from the atomic density.  Default value is 4.0.
+        smoothing : float, optional
+            The weight given to each new timing when updating a structure's
+            measured time.  Default value is 0.5.
+        """
+        natoms = [system.natoms for system in systems]
+        volumes = [system.box.volume for system in systems]
+
+        return cls(natoms, volumes, cutoff=cutoff, smoothing=smoothing)
+
+    @property
+    def natoms(self) -> np.ndarray:
+        """numpy.ndarray: The number of atoms in each structure"""
+        return self.__natoms
+
+    @property
+    def estimates(self) -> np.ndarray:
+        """numpy.ndarray: The initial relative cost estimates"""
+        return self.__estimates
+
+    @property
+    def measured(self) -> np.ndarray:
+        """numpy.ndarray: The measured times, with nan for unmeasured structures"""
+        return self.__measured
+
+    @property
+    def costs(self) -> np.ndarray:
+        """numpy.ndarray: The current best estimate of each structure's cost"""
+        known = ~np.isnan(self.__measured)
+        if not np.any(known):
+            return self.__estimates.copy()
+
+        # Scale estimates to match the measured times
+        scale = self.__measured[known].sum() / self.__estimates[known].sum()
+        costs = self.__estimates * scale
+        costs[known] = self.__measured[known]
+        return costs
+
+    def update(self,
+               index: npt.ArrayLike,
+               times: npt.ArrayLike):
+        """
+        Updates the measured times for structures.
+
+        Parameters
+        ----------
+        index : array-like object
+            The indices of the structures that were timed.
+        times : array-like object
+            The measured evaluation times.
+        """
+        index = np.asarray(index, dtype=int)
+        times = np.asarray(times, dtype=float)
+        old = self.__measured[index]
+        self.__measured[index] = np.where(np.isnan(old), times,
+                                          (1 - self.smoothing) * old + self.smoothing * times)
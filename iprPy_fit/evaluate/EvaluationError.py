@@ -0,0 +1,6 @@
+class EvaluationError(RuntimeError):
+    """
+    Raised when an evaluation fails because LAMMPS crashed or did not finish
+    within the timeout.  Raised by IsolatedEvaluator after the failed worker
+    has been replaced, so the evaluator can be used again.
+    """
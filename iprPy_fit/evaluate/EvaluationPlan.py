@@ -0,0 +1,120 @@
+from typing import Optional
+
+import numpy as np
+
+class EvaluationPlan():
+    """
+    Defines which values an evaluation computes and extracts.  LAMMPS only
+    tallies the energy and virial on steps where a thermo output needs
+    them, so leaving the pressures out of the thermo output also skips the
+    virial computation.  Values that are not planned are returned as nan,
+    and forces as None.  The forces can also be limited to a subset of the
+    atoms of each structure, see ForceSampler.
+
+    A plan is usually derived once per fit from the weights with
+    from_weights().
+    """
+    def __init__(self,
+                 energy: bool = True,
+                 pressure: bool = True,
+                 forces: bool = True,
+                 force_atoms: Optional[list] = None):
+        """
+        Initializes an EvaluationPlan.
+
+        Parameters
+        ----------
+        energy : bool, optional
+            If True (default), E_pot_total and E_pot_atom are computed.
+        pressure : bool, optional
+            If True (default), P_xx, P_yy and P_zz are computed.
+        forces : bool, optional
+            If True (default), the per-atom forces are extracted.
+        force_atoms : list, optional
+            The indices of the atoms whose forces are extracted for each
+            structure, with None for all atoms.  Default extracts the forces
+            of all atoms.
+        """
+        self.energy = energy
+        self.pressure = pressure
+        self.forces = forces
+        self.force_atoms = force_atoms
+
+    def __repr__(self) -> str:
+        sampled = self.force_atoms is not None
+        return (f'EvaluationPlan(energy={self.energy}, pressure={self.pressure}, '
+                f'forces={self.forces}, sampled_forces={sampled})')
+
+    @classmethod
+    def from_weights(cls,
+                     weights: dict,
+                     ref_values: Optional[dict] = None) -> 'EvaluationPlan':
+        """
+        Builds the plan that computes only the values needed by the error
+        function.
+
+        Parameters
+        ----------
+        weights : dict
+            The weights used for the error calculation.  Keys that are
+            missing, None, nan or non-positive are not needed.
+        ref_values : dict, optional
+            The reference values.  If given, keys without any reference
+            values are also not needed, and the forces are limited to the
+            'F_atoms' of sampled reference forces.
+
+        Returns
+        -------
+        EvaluationPlan
+        """
+        def needed(key):
+            weight = weights.get(key)
+            if weight is None:
+                return False
+            if not isinstance(weight, (list, tuple)):
+                weight = np.ravel(weight)
+            if not any(w is not None and w > 0.0 for w in weight):
+                return False
+            if ref_values is not None:
+                ref_value = ref_values.get(key)
+                if ref_value is None:
+                    return False
+                if all(value is None for value in ref_value):
+                    return False
+            return True
+
+        force_atoms = None
+        if ref_values is not None:
+            force_atoms = ref_values.get('F_atoms')
+
+        return cls(energy=needed('E_pot_total') or needed('E_pot_atom'),
+                   pressure=needed('P_xx') or needed('P_yy') or needed('P_zz'),
+                   forces=needed('F'), force_atoms=force_atoms)
+
+    def atoms(self, index: int) -> Optional[np.ndarray]:
+        """
+        Gets the atoms whose forces are extracted for a structure.
+
+        Parameters
+        ----------
+        index : int
+            The index of the structure.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The atom indices, or None for all atoms.
+        """
+        if not self.forces or self.force_atoms is None:
+            return None
+        return self.force_atoms[index]
+
+    @property
+    def thermo_keywords(self) -> list:
+        """list: The LAMMPS thermo_style custom keywords for the plan"""
+        keywords = ['step']
+        if self.pressure:
+            keywords += ['pxx', 'pyy', 'pzz']
+        if self.energy:
+            keywords += ['pe']
+        return keywords
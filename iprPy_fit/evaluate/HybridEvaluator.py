@@ -0,0 +1,203 @@
+from typing import Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+import queue
+import threading
+import os
+
+import numpy as np
+import numpy.typing as npt
+
+from ..lammps import SystemCache
+from . import structure_runner, EvaluationPlan
+
+class HybridEvaluator():
+    """
+    Evaluates structures by size class in the current process.  Structures
+    with at least large_natoms atoms run on one LAMMPS instance that uses
+    the OPENMP package across several threads.  At the same time, the
+    smaller structures run on single-threaded LAMMPS instances, one per
+    remaining core.  Once the large instance finishes the large structures,
+    it also takes small ones, so the cores stay busy until the end of each
+    evaluation.
+
+    A HybridEvaluator can be given as the lmp parameter of evaluate().
+    """
+    def __init__(self,
+                 ncores: Optional[int] = None,
+                 large_threads: Optional[int] = None,
+                 large_natoms: int = 1000,
+                 cmdargs: Optional[list] = None):
+        """
+        Initializes the LAMMPS instances.
+
+        Parameters
+        ----------
+        ncores : int, optional
+            The total number of cores to use.  Default value is the number of
+            CPUs.
+        large_threads : int, optional
+            The number of OpenMP threads used by the large-structure instance.
+            Default value is half of ncores.
+        large_natoms : int, optional
+            The number of atoms at and above which a structure is evaluated
+            by the large-structure instance.  Default value is 1000.
+        cmdargs : list, optional
+            The command line arguments used when creating each
+            lammps.lammps object.  Default value turns off the log and screen
+            outputs.
+        """
+        from lammps import lammps
+
+        if ncores is None:
+            ncores = os.cpu_count()
+        if large_threads is None:
+            large_threads = max(ncores // 2, 1)
+        if cmdargs is None:
+            cmdargs = ['-log', 'none', '-screen', 'none']
+
+        self.__ncores = ncores
+        self.__large_threads = large_threads
+        self.large_natoms = large_natoms
+
+        # OpenMP instance for large structures
+        self.__large_lmp = lammps(cmdargs=cmdargs + ['-sf', 'omp', '-pk', 'omp',
+                                                     str(large_threads)])
+
+        # Single-threaded instances for small structures on the other cores
+        nsmall = max(ncores - large_threads, 1)
+        self.__small_lmps = [lammps(cmdargs=cmdargs) for i in range(nsmall)]
+        self.__executor = ThreadPoolExecutor(nsmall + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def ncores(self) -> int:
+        """int: The total number of cores used"""
+        return self.__ncores
+
+    @property
+    def large_threads(self) -> int:
+        """int: The number of OpenMP threads of the large-structure instance"""
+        return self.__large_threads
+
+    @property
+    def nsmall(self) -> int:
+        """int: The number of single-threaded instances"""
+        return len(self.__small_lmps)
+
+    def close(self):
+        """Shuts down the threads and closes the LAMMPS instances"""
+        self.__executor.shutdown()
+        self.__large_lmp.close()
+        for lmp in self.__small_lmps:
+            lmp.close()
+
+    def iter_run(self,
+                 scripts = None,
+                 systems = None,
+                 potential = None,
+                 paramsets = None,
+                 include_velocities: bool = False,
+                 order: Optional[npt.ArrayLike] = None,
+                 buffers: Optional[dict] = None,
+                 cache: Optional[SystemCache] = None,
+                 plan: Optional[EvaluationPlan] = None) -> Iterator[tuple]:
+        """
+        Evaluates the structures, yielding the results of each structure as
+        soon as it finishes.  If the generator is closed early, the
+        structures that have not started are skipped after the running
+        ones finish.
+
+        Parameters
+        ----------
+        scripts : list or None
+            Scripts are all treated as small structures.
+        systems : list or None
+        potential
+        paramsets : list or None
+        include_velocities : bool, optional
+        order : array-like object, optional
+            The order in which to start the structures within each size
+            class.  Default starts the structures with the most atoms first.
+        buffers : dict, optional
+            Force arrays to reuse between evaluations.  See iter_evaluate().
+        cache : SystemCache, optional
+            Reuses the LAMMPS setup parameters of systems between
+            evaluations.
+        plan : EvaluationPlan, optional
+            If given, only the planned values are computed and extracted.
+
+        Yields
+        ------
+        index : int
+            The index of the evaluated structure.
+        rawresult : dict
+            The energy, forces and pressures of the structure as returned by
+            lib_output().
+        """
+        structures, natoms, run = structure_runner(scripts=scripts, systems=systems,
+                                                   potential=potential, paramsets=paramsets,
+                                                   include_velocities=include_velocities,
+                                                   cache=cache, plan=plan)
+
+        # Split the structures into size classes
+        if natoms is None:
+            natoms = np.zeros(len(structures), dtype=int)
+        natoms = np.asarray(natoms)
+        if order is None:
+            order = np.argsort(natoms, kind='stable')[::-1]
+        order = np.asarray(order, dtype=int)
+        large = order[natoms[order] >= self.large_natoms]
+        small = queue.SimpleQueue()
+        for i in order[natoms[order] < self.large_natoms]:
+            small.put(int(i))
+
+        results = queue.SimpleQueue()
+        stop = threading.Event()
+
+        def evaluate_one(lmp, i):
+            structure = structures[i]
+            out = None if buffers is None else buffers.get(id(structure))
+            rawresult = run(lmp, i, out)
+            if buffers is not None:
+                buffers[id(structure)] = rawresult['F']
+            results.put((int(i), rawresult))
+
+        def drain_small(lmp):
+            while not stop.is_set():
+                try:
+                    i = small.get_nowait()
+                except queue.Empty:
+                    return
+                evaluate_one(lmp, i)
+
+        def large_worker():
+            for i in large:
+                if stop.is_set():
+                    return
+                evaluate_one(self.__large_lmp, i)
+            drain_small(self.__large_lmp)
+
+        futures = [self.__executor.submit(large_worker)]
+        for lmp in self.__small_lmps:
+            futures.append(self.__executor.submit(drain_small, lmp))
+
+        try:
+            for n in range(len(order)):
+                while True:
+                    try:
+                        yield results.get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        # Raise any worker errors
+                        for future in futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+        finally:
+            # Let running structures finish so the instances are free
+            stop.set()
+            wait(futures)
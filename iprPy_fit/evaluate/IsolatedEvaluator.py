@@ -0,0 +1,244 @@
+from typing import Iterator, Optional
+import multiprocessing as mp
+import warnings
+
+import numpy.typing as npt
+
+from .. import worker
+from . import EvaluationError, EvaluationPlan
+
+class IsolatedEvaluator():
+    """
+    Evaluates paramsets in a supervised worker process so that bad trial
+    parameters that crash or hang LAMMPS do not end the fit.  The worker
+    keeps its LAMMPS object and paramsets between evaluations.  If the
+    worker dies or a structure does not finish within the timeout, the
+    worker is killed and a new one is started with the paramsets reloaded,
+    and an EvaluationError is raised for the failed evaluation.
+
+    When given as the lmp of minimize() or minfxn(), failed evaluations and
+    non-finite errors are replaced by the penalty error.  An
+    IsolatedEvaluator can also be given as the lmp parameter of evaluate().
+    """
+    def __init__(self,
+                 paramsets: list,
+                 timeout: float = 60.0,
+                 penalty: float = 1e20,
+                 startup_timeout: float = 120.0,
+                 cmdargs: Optional[list] = None,
+                 mp_context = None):
+        """
+        Starts the worker process.
+
+        Parameters
+        ----------
+        paramsets : list of dict or SharedReferenceData
+            The paramsets as generated by dump_lammps_dynamic_parameters().
+            A SharedReferenceData is sent to the workers as a reference to
+            its shared memory block instead of a copy of the arrays.
+        timeout : float, optional
+            The wall-clock time in seconds to wait for any one structure
+            before the worker is considered hung.  Default value is 60.
+        penalty : float, optional
+            The error used by minfxn() for failed evaluations and non-finite
+            errors.  Default value is 1e20.
+        startup_timeout : float, optional
+            The wall-clock time in seconds to wait for a new worker to
+            import lammps and load the paramsets.  Default value is 120.
+        cmdargs : list, optional
+            The command line arguments used when creating the worker's
+            lammps.lammps object.  Default value turns off the log and screen
+            outputs.
+        mp_context : multiprocessing context, optional
+            The multiprocessing context to start the worker with.  Default
+            uses 'spawn' so that workers get fresh LAMMPS instances.
+        """
+        if cmdargs is None:
+            cmdargs = ['-log', 'none', '-screen', 'none']
+        if mp_context is None:
+            mp_context = mp.get_context('spawn')
+
+        self.__paramsets = paramsets
+        self.__cmdargs = cmdargs
+        self.__factors = worker.unit_factors(paramsets)
+        self.__context = mp_context
+        self.timeout = timeout
+        self.penalty = penalty
+        self.startup_timeout = startup_timeout
+        self.__failures = 0
+        self.__respawns = 0
+        self.__process = None
+        self.__conn = None
+        self.__spawn()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def paramsets(self) -> list:
+        """list: The paramsets loaded by the worker"""
+        return self.__paramsets
+
+    @property
+    def failures(self) -> int:
+        """int: The number of evaluations that crashed or timed out"""
+        return self.__failures
+
+    @property
+    def respawns(self) -> int:
+        """int: The number of times the worker has been replaced"""
+        return self.__respawns
+
+    def __spawn(self):
+        """Starts a new worker process"""
+        conn, child_conn = self.__context.Pipe()
+        process = self.__context.Process(target=worker.serve,
+                                         args=(child_conn, self.__paramsets,
+                                               self.__cmdargs, self.__factors),
+                                         daemon=True)
+        process.start()
+        child_conn.close()
+        self.__process = process
+        self.__conn = conn
+        self.__ready = False
+
+    def __kill(self):
+        """Kills the current worker process"""
+        if self.__process.is_alive():
+            self.__process.kill()
+        self.__process.join()
+        self.__conn.close()
+
+    def __respawn(self):
+        """Replaces the current worker with a new one"""
+        self.__kill()
+        self.__respawns += 1
+        self.__spawn()
+
+    def __fail(self, reason: str):
+        """Replaces the worker after a failure and raises EvaluationError"""
+        self.__failures += 1
+        exitcode = self.__process.exitcode
+        self.__respawn()
+        if exitcode is not None:
+            reason += f' (worker exit code {exitcode})'
+        warnings.warn(reason, RuntimeWarning)
+        raise EvaluationError(reason)
+
+    def __receive(self, timeout: float, reason: str):
+        """Receives the next message from the worker or fails"""
+        try:
+            if self.__conn.poll(timeout):
+                return self.__conn.recv()
+        except (EOFError, OSError):
+            self.__process.join(1.0)
+            self.__fail(f'LAMMPS worker crashed {reason}')
+        self.__fail(f'LAMMPS worker timed out after {timeout} s {reason}')
+
+    def close(self):
+        """Shuts down the worker process"""
+        if self.__process is None:
+            return
+        try:
+            self.__conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.__process.join(5.0)
+        self.__kill()
+        self.__process = None
+
+    def run(self,
+            order: Optional[npt.ArrayLike] = None,
+            plan: Optional[EvaluationPlan] = None) -> list:
+        """
+        Evaluates all paramsets.
+
+        Parameters
+        ----------
+        order : array-like object, optional
+            The order in which to evaluate the structures.
+        plan : EvaluationPlan, optional
+            If given, only the planned values are computed and extracted.
+
+        Returns
+        -------
+        list of dict
+            The results for each paramset as returned by lib_params().
+        """
+        rawresults = [None for i in range(len(self.__paramsets))]
+        for i, raw in self.iter_run(order=order, plan=plan):
+            rawresults[i] = raw
+
+        return rawresults
+
+    def iter_run(self,
+                 order: Optional[npt.ArrayLike] = None,
+                 plan: Optional[EvaluationPlan] = None) -> Iterator[tuple]:
+        """
+        Evaluates the paramsets in the worker, yielding the results of each
+        structure as soon as it finishes.  If the generator is closed early,
+        the worker stops after its current structure.
+
+        Parameters
+        ----------
+        order : array-like object, optional
+            The order in which to evaluate the structures.
+        plan : EvaluationPlan, optional
+            If given, only the planned values are computed and extracted.
+
+        Yields
+        ------
+        index : int
+            The index of the evaluated paramset.
+        rawresult : dict
+            The results as returned by lib_params().
+
+        Raises
+        ------
+        EvaluationError
+            If the worker crashed or timed out.  The worker has already been
+            replaced when this is raised.
+        """
+        if self.__process is None:
+            raise ValueError('IsolatedEvaluator is closed')
+        if order is None:
+            order = range(len(self.__paramsets))
+        order = [int(i) for i in order]
+
+        # Wait for a new worker to load the paramsets
+        if not self.__ready:
+            self.__receive(self.startup_timeout, 'while starting')
+            self.__ready = True
+
+        self.__conn.send((order, plan))
+        done = False
+        try:
+            for i in order:
+                message = self.__receive(self.timeout, f'on structure {i}')
+                if isinstance(message, str):
+                    self.__fail(f'LAMMPS error on structure {i}: {message}')
+                yield message
+            self.__receive(self.timeout, 'while finishing')
+            done = True
+        except EvaluationError:
+            done = True
+            raise
+        finally:
+            if not done:
+                self.__stop()
+
+    def __stop(self):
+        """Stops the current request early and discards its results"""
+        try:
+            self.__conn.send('stop')
+            while True:
+                if not self.__conn.poll(self.timeout):
+                    raise TimeoutError
+                if self.__conn.recv() is None:
+                    break
+        except (EOFError, OSError, TimeoutError):
+            self.__failures += 1
+            self.__respawn()
@@ -0,0 +1,175 @@
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+
+from .. import worker
+from . import CostModel, lpt_schedule
+
+class PoolEvaluator():
+    """
+    Evaluates paramsets in parallel on a pool of worker processes that each
+    have their own LAMMPS library object.  The paramsets are sent to each
+    worker once when the pool starts.  Structures are divided between the
+    workers using longest-processing-time-first scheduling based on a
+    CostModel that is refined with the measured evaluation times, and the
+    assignments are rebalanced whenever the measured times drift.
+
+    A PoolEvaluator can be given as the lmp parameter of evaluate().
+    """
+    def __init__(self,
+                 paramsets: list,
+                 nworkers: Optional[int] = None,
+                 cmdargs: Optional[list] = None,
+                 costmodel: Optional[CostModel] = None,
+                 rebalance_tol: float = 0.1,
+                 mp_context = None):
+        """
+        Initializes the worker pool.
+
+        Parameters
+        ----------
+        paramsets : list of dict or SharedReferenceData
+            The paramsets as generated by dump_lammps_dynamic_parameters().
+            A SharedReferenceData is sent to the workers as a reference to
+            its shared memory block instead of a copy of the arrays.
+        nworkers : int, optional
+            The number of worker processes.  Default value is the number of
+            CPUs.
+        cmdargs : list, optional
+            The command line arguments used when creating each worker's
+            lammps.lammps object.  Default value turns off the log and screen
+            outputs.
+        costmodel : CostModel, optional
+            The cost model to use.  If not given, one will be built from the
+            paramsets.
+        rebalance_tol : float, optional
+            The structure assignments are rebuilt when the predicted wall
+            time of the current assignments exceeds that of a fresh schedule
+            by more than this fraction.  Default value is 0.1.
+        mp_context : multiprocessing context, optional
+            The multiprocessing context to start the workers with.  Default
+            uses 'spawn' so that workers get fresh LAMMPS instances.
+        """
+        if nworkers is None:
+            nworkers = mp.cpu_count()
+        if cmdargs is None:
+            cmdargs = ['-log', 'none', '-screen', 'none']
+        if costmodel is None:
+            costmodel = CostModel.from_paramsets(paramsets)
+        if mp_context is None:
+            mp_context = mp.get_context('spawn')
+
+        self.__paramsets = paramsets
+        self.__nworkers = nworkers
+        self.__costmodel = costmodel
+        self.rebalance_tol = rebalance_tol
+        self.__schedule = lpt_schedule(costmodel.costs, nworkers)
+        self.__executor = ProcessPoolExecutor(nworkers, mp_context=mp_context,
+                                              initializer=worker.init,
+                                              initargs=(paramsets, cmdargs,
+                                                        worker.unit_factors(paramsets)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def paramsets(self) -> list:
+        """list: The paramsets loaded by the workers"""
+        return self.__paramsets
+
+    @property
+    def nworkers(self) -> int:
+        """int: The number of worker processes"""
+        return self.__nworkers
+
+    @property
+    def costmodel(self) -> CostModel:
+        """CostModel: The structure cost model"""
+        return self.__costmodel
+
+    @property
+    def schedule(self) -> list:
+        """list: The structure indices currently assigned to each worker"""
+        return self.__schedule
+
+    def close(self):
+        """Shuts down the worker processes"""
+        self.__executor.shutdown()
+
+    def run(self, plan = None) -> list:
+        """
+        Evaluates all paramsets across the workers.
+
+        Parameters
+        ----------
+        plan : EvaluationPlan, optional
+            If given, only the planned values are computed and extracted.
+
+        Returns
+        -------
+        list of dict
+            The results for each paramset as returned by lib_params().
+        """
+        rawresults = [None for i in range(len(self.__paramsets))]
+        for i, raw in self.iter_run(plan=plan):
+            rawresults[i] = raw
+
+        return rawresults
+
+    def iter_run(self, plan = None):
+        """
+        Evaluates all paramsets across the workers, yielding the results of
+        each worker's structures as soon as the worker finishes them.  The
+        cost model is updated once all results have been yielded.  If the
+        generator is closed early, workers that have not started are
+        cancelled.
+
+        Parameters
+        ----------
+        plan : EvaluationPlan, optional
+            If given, only the planned values are computed and extracted.
+
+        Yields
+        ------
+        index : int
+            The index of the evaluated paramset.
+        rawresult : dict
+            The results as returned by lib_params().
+        """
+        futures = [self.__executor.submit(worker.run_chunk, chunk, plan)
+                   for chunk in self.__schedule]
+
+        index = []
+        times = []
+        try:
+            for future in as_completed(futures):
+                for i, raw, elapsed in future.result():
+                    index.append(i)
+                    times.append(elapsed)
+                    yield i, raw
+        finally:
+            for future in futures:
+                future.cancel()
+
+        self.__costmodel.update(index, times)
+        self.rebalance()
+
+    def rebalance(self, force: bool = False):
+        """
+        Rebuilds the worker assignments if the current ones have become
+        unbalanced based on the current costs.
+
+        Parameters
+        ----------
+        force : bool, optional
+            If True, the assignments are rebuilt regardless of balance.
+        """
+        costs = self.__costmodel.costs
+        schedule = lpt_schedule(costs, self.__nworkers)
+        current = max(costs[chunk].sum() for chunk in self.__schedule)
+        new = max(costs[chunk].sum() for chunk in schedule)
+        if force or current > new * (1 + self.rebalance_tol):
+            self.__schedule = schedule
@@ -0,0 +1,152 @@
+from typing import Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import queue
+import threading
+import os
+
+import numpy as np
+import numpy.typing as npt
+
+from ..lammps import SystemCache
+from . import structure_runner, EvaluationPlan
+
+class ThreadEvaluator():
+    """
+    Evaluates structures on a thread pool using multiple independent LAMMPS
+    library objects in the current process.  The LAMMPS library calls
+    release the GIL, so the instances run concurrently while the reference
+    structures stay shared in memory with no pickling.  This is convenient
+    for notebooks and for nodes where duplicating the reference data in
+    worker processes is too costly.
+
+    A ThreadEvaluator can be given as the lmp parameter of evaluate().
+    """
+    def __init__(self,
+                 nthreads: Optional[int] = None,
+                 cmdargs: Optional[list] = None):
+        """
+        Initializes the LAMMPS instances and thread pool.
+
+        Parameters
+        ----------
+        nthreads : int, optional
+            The number of threads and LAMMPS instances.  Default value is the
+            number of CPUs.
+        cmdargs : list, optional
+            The command line arguments used when creating each
+            lammps.lammps object.  Default value turns off the log and screen
+            outputs.
+        """
+        from lammps import lammps
+
+        if nthreads is None:
+            nthreads = os.cpu_count()
+        if cmdargs is None:
+            cmdargs = ['-log', 'none', '-screen', 'none']
+
+        self.__nthreads = nthreads
+        self.__instances = queue.Queue()
+        for i in range(nthreads):
+            self.__instances.put(lammps(cmdargs=cmdargs))
+        self.__executor = ThreadPoolExecutor(nthreads)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def nthreads(self) -> int:
+        """int: The number of threads and LAMMPS instances"""
+        return self.__nthreads
+
+    def close(self):
+        """Shuts down the threads and closes the LAMMPS instances"""
+        self.__executor.shutdown()
+        while not self.__instances.empty():
+            self.__instances.get().close()
+
+    def iter_run(self,
+                 scripts = None,
+                 systems = None,
+                 potential = None,
+                 paramsets = None,
+                 include_velocities: bool = False,
+                 order: Optional[npt.ArrayLike] = None,
+                 buffers: Optional[dict] = None,
+                 cache: Optional[SystemCache] = None,
+                 plan: Optional[EvaluationPlan] = None) -> Iterator[tuple]:
+        """
+        Evaluates the structures across the threads, yielding the results of
+        each structure as soon as it finishes.  If the generator is closed
+        early, structures that have not started are cancelled and the
+        running structures are finished before it returns, so the buffers
+        and parameter file can be safely reused.
+
+        Parameters
+        ----------
+        scripts : list or None
+        systems : list or None
+        potential
+        paramsets : list or None
+        include_velocities : bool, optional
+        order : array-like object, optional
+            The order in which to start the structures.  Default starts the
+            structures with the most atoms first, when known.
+        buffers : dict, optional
+            Force arrays to reuse between evaluations.  See iter_evaluate().
+        cache : SystemCache, optional
+            Reuses the LAMMPS setup parameters of systems between
+            evaluations.
+        plan : EvaluationPlan, optional
+            If given, only the planned values are computed and extracted.
+
+        Yields
+        ------
+        index : int
+            The index of the evaluated structure.
+        rawresult : dict
+            The energy, forces and pressures of the structure as returned by
+            lib_output().
+        """
+        structures, natoms, run = structure_runner(scripts=scripts, systems=systems,
+                                                   potential=potential, paramsets=paramsets,
+                                                   include_velocities=include_velocities,
+                                                   cache=cache, plan=plan)
+
+        if order is None:
+            if natoms is None:
+                order = range(len(structures))
+            else:
+                order = np.argsort(natoms, kind='stable')[::-1]
+
+        stop = threading.Event()
+
+        def task(i):
+            if stop.is_set():
+                return None
+            structure = structures[i]
+            out = None if buffers is None else buffers.get(id(structure))
+
+            # Borrow an idle LAMMPS instance
+            lmp = self.__instances.get()
+            try:
+                rawresult = run(lmp, i, out)
+            finally:
+                self.__instances.put(lmp)
+
+            if buffers is not None:
+                buffers[id(structure)] = rawresult['F']
+            return int(i), rawresult
+
+        futures = [self.__executor.submit(task, i) for i in order]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Let running structures finish before the caller moves on
+            stop.set()
+            for future in futures:
+                future.cancel()
+            wait(futures)
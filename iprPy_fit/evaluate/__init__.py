@@ -5,8 +5,24 @@ from .lib_output import lib_output
 from .lib_system import lib_system
 from .lib_params import lib_params
 from .lib_script import lib_script
+from .structure_runner import structure_runner
+from .expand_results import expand_results
+from .expand_rawresult import expand_rawresult
 
+from .CostModel import CostModel
+from .lpt_schedule import lpt_schedule
+from .EvaluationPlan import EvaluationPlan
+from .EvaluationError import EvaluationError
+from .PoolEvaluator import PoolEvaluator
+from .ThreadEvaluator import ThreadEvaluator
+from .HybridEvaluator import HybridEvaluator
+from .IsolatedEvaluator import IsolatedEvaluator
+
+from .iter_evaluate import iter_evaluate
 from .evaluate import evaluate
 
-__all__ = ['evaluate', 'exe_script', 'lib_run0', 'lib_output', 'lib_system',
-           'lib_params', 'lib_script']
\ No newline at end of file
+__all__ = ['evaluate', 'iter_evaluate', 'exe_script', 'lib_run0', 'lib_output',
+           'lib_system', 'lib_params', 'lib_script', 'structure_runner',
+           'expand_results', 'expand_rawresult', 'CostModel', 'lpt_schedule',
+           'EvaluationPlan', 'EvaluationError', 'PoolEvaluator',
+           'ThreadEvaluator', 'HybridEvaluator', 'IsolatedEvaluator']
\ No newline at end of file
@@ -1,11 +1,9 @@
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 from copy import deepcopy
 
 import numpy as np
-
-import atomman as am
-import atomman.unitconvert as uc
+import numpy.typing as npt
 
 try:
     from lammps import lammps as lammpsobj
@@ -14,8 +12,9 @@ except:
 else:
     has_lammps_lib = True
 
-from ..lammps import build_combined_script
-from . import lib_system, lib_script, lib_params, exe_script
+from ..lammps import build_combined_script, SystemCache
+from . import (exe_script, expand_results, iter_evaluate, EvaluationPlan,
+               PoolEvaluator, ThreadEvaluator, HybridEvaluator, IsolatedEvaluator)
 
 def evaluate(lmp = None,
              scripts = None,
@@ -23,17 +22,49 @@ def evaluate(lmp = None,
              potential = None,
              paramsets = None,
              include_velocities: bool = False,
-             units: str = 'metal') -> dict:
+             units: str = 'metal',
+             reduction: Optional[dict] = None,
+             order: Optional[npt.ArrayLike] = None,
+             callback: Optional[Callable] = None,
+             buffers: Optional[dict] = None,
+             cache: Optional[SystemCache] = None,
+             plan: Optional[EvaluationPlan] = None) -> dict:
     """
     Evaluates a set of reference systems using an interatomic potential
     and returns a dict of energies, pressures, and forces for comparison.
 
     Parameters
     ----------
-    lmp : lammps.lammps, str, Path or None
-        A LAMMPS interactive object or path to a LAMMPS executable.  If None,
-        will attempt to import lammps and create a new lammps.lammps object.
+    lmp : lammps.lammps, PoolEvaluator, ThreadEvaluator, HybridEvaluator, IsolatedEvaluator, str, Path or None
+        A LAMMPS interactive object, a PoolEvaluator of LAMMPS worker
+        processes, a ThreadEvaluator or HybridEvaluator of in-process LAMMPS
+        instances, an IsolatedEvaluator supervised worker process, or path
+        to a LAMMPS executable.  If None, will attempt to
+        import lammps and create a new lammps.lammps object.
     scripts : list or None
+    reduction : dict, optional
+        The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+        the given scripts, systems or paramsets are a reduced set.  If given,
+        the returned results are expanded back to the original structures.
+    order : array-like object, optional
+        The order in which to evaluate the structures.  Not used with a
+        PoolEvaluator or a LAMMPS executable.
+    callback : callable, optional
+        Function called as callback(index, rawresult) after each structure
+        is evaluated.  If it returns True, no further structures are
+        evaluated and the results for the unevaluated structures are nan,
+        with None for forces.  Not used with a LAMMPS executable.
+    buffers : dict, optional
+        Force arrays to reuse between evaluations.  See iter_evaluate().
+        The returned forces are then overwritten by later evaluations.
+    cache : SystemCache, optional
+        Reuses the LAMMPS setup parameters of systems between evaluations.
+        See iter_evaluate().
+    plan : EvaluationPlan, optional
+        If given, only the values needed by the plan are computed and
+        extracted, which can be built from the fitting weights with
+        EvaluationPlan.from_weights().  The other values are nan, with None
+        for forces.
     """
 
     # Create a lammps interactive object if needed
@@ -43,61 +74,41 @@ def evaluate(lmp = None,
         else:
             raise ValueError('lammps package not found!')
 
-    # Interactive variations
-    if isinstance(lmp, lammpsobj):
-        
-        rawresults = []
-
-        # Run using prepared scripts
-        if scripts is not None:
-            assert systems is None, 'scripts and systems cannot both be given'
-            assert potential is None, 'potential object can only be used with systems'
-            assert paramsets is None, 'scripts and paramsets cannot both be given'
-
-            for script in scripts:
-                rawresults.append(lib_script(lmp, script))
-
-        # Run using system and potential objects
+    # Interactive and parallel variations
+    if isinstance(lmp, (lammpsobj, PoolEvaluator, ThreadEvaluator, HybridEvaluator,
+                        IsolatedEvaluator)):
+        if paramsets is not None:
+            nsims = len(paramsets)
+        elif isinstance(lmp, (PoolEvaluator, IsolatedEvaluator)):
+            nsims = len(lmp.paramsets)
         elif systems is not None:
-            assert potential is not None, 'potential must be given with systems'
-            assert paramsets is None, 'systems and paramsets cannot both be given'
-            for system in systems:
-                rawresults.append(lib_system(lmp, system, potential,
-                                             include_velocities=include_velocities))
-        
-        # Run using extracted parameters (should be pickle-safe)
-        elif paramsets is not None:
-            assert potential is None, 'potential object can only be used with systems'
-            for params in paramsets:
-                rawresults.append(lib_params(lmp, **params))
-
+            nsims = len(systems)
+        elif scripts is not None:
+            nsims = len(scripts)
         else:
             raise ValueError('scripts, systems + potential or paramsets must be given')
 
-        # Initialize results dict
-        nsims = len(rawresults)
-        results = {}
-        results['E_pot_total'] = np.empty(nsims)
-        results['E_pot_atom'] = np.empty(nsims)
-        results['P_xx'] = np.empty(nsims)
-        results['P_yy'] = np.empty(nsims)
-        results['P_zz'] = np.empty(nsims)
-        results['F'] = []
-
-        # Extract values from the simulation
-        for i, raw in enumerate(rawresults):
-            results['E_pot_total'][i] = raw['E_pot_total']
-            results['E_pot_atom'][i] = raw['E_pot_atom']
-            results['P_xx'][i] = raw['P_xx']
-            results['P_yy'][i] = raw['P_yy']
-            results['P_zz'][i] = raw['P_zz']
-            results['F'].append(raw['F'])
+        rawresults = [None for i in range(nsims)]
+        evaluations = iter_evaluate(lmp, scripts=scripts, systems=systems,
+                                    potential=potential, paramsets=paramsets,
+                                    include_velocities=include_velocities,
+                                    order=order, buffers=buffers,
+                                    cache=cache, plan=plan)
+        for i, rawresult in evaluations:
+            rawresults[i] = rawresult
+            if callback is not None and callback(i, rawresult):
+                evaluations.close()
+                break
 
+        results = _collect_results(rawresults)
 
     # Non-interactive variations
     elif isinstance(lmp, (str, Path)):
+        import atomman as am
+
         # Get lammps version date
         lammps_date = am.lammps.checkversion(lmp)['date']
+        assert callback is None, 'callback cannot be used with a LAMMPS executable'
         
         if paramsets is not None:
             raise ValueError('paramsets not currently supported with lammps executable')
@@ -105,7 +116,8 @@ def evaluate(lmp = None,
         if systems is not None:
             assert scripts is None, 'scripts and systems cannot both be given'
             assert potential is not None, 'potential must be given with systems'
-            script = build_combined_script(potential, systems, lammps_date)
+            script = build_combined_script(potential, systems, lammps_date,
+                                           plan=plan)
             units = potential.units
         
         elif scripts is not None:
@@ -117,6 +129,38 @@ def evaluate(lmp = None,
         else:
             raise ValueError('scripts, systems + potential or paramsets must be given')
         
-        results = exe_script(lmp, script, units)
+        results = exe_script(lmp, script, units, plan=plan)
+
+    # Map results for reduced structures back to the original structures
+    if reduction is not None:
+        results = expand_results(results, reduction)
     
     return results
+
+def _collect_results(rawresults: list) -> dict:
+    """Combines the per-structure results into arrays"""
+    # Initialize results dict
+    nsims = len(rawresults)
+    results = {}
+    results['E_pot_total'] = np.empty(nsims)
+    results['E_pot_atom'] = np.empty(nsims)
+    results['P_xx'] = np.empty(nsims)
+    results['P_yy'] = np.empty(nsims)
+    results['P_zz'] = np.empty(nsims)
+    results['F'] = []
+
+    # Extract values from the simulation
+    for i, raw in enumerate(rawresults):
+        if raw is None:
+            for key in ['E_pot_total', 'E_pot_atom', 'P_xx', 'P_yy', 'P_zz']:
+                results[key][i] = np.nan
+            results['F'].append(None)
+            continue
+        results['E_pot_total'][i] = raw['E_pot_total']
+        results['E_pot_atom'][i] = raw['E_pot_atom']
+        results['P_xx'][i] = raw['P_xx']
+        results['P_yy'][i] = raw['P_yy']
+        results['P_zz'][i] = raw['P_zz']
+        results['F'].append(raw['F'])
+
+    return results
\ No newline at end of file
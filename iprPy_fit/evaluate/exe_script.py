@@ -1,8 +1,6 @@
-import atomman as am
-import atomman.unitconvert as uc
 import numpy as np
 
-def exe_script(lammps_command, script, units='metal'):
+def exe_script(lammps_command, script, units='metal', plan=None):
     """
     Evaluates the energies of all ref_systems using a LAMMPS script
     and a LAMMPS executable. (Forces not currently supported)
@@ -16,12 +14,18 @@ def exe_script(lammps_command, script, units='metal'):
     units : str, optional.
         The LAMMPS units the simulation is running in.  Used to convert
         output values to atomman working units.  Default value is 'metal'.
+    plan : EvaluationPlan, optional
+        If given, only the planned values are read from the log and the
+        others are nan.  The script should be built with the same plan.
 
     Returns
     -------
     values : DataModelDict
         The computed values for the reference systems.
     """
+    import atomman as am
+    import atomman.unitconvert as uc
+
     # Get lammps units
     lammps_units = am.lammps.style.unit(units)
     
@@ -38,12 +42,23 @@ def exe_script(lammps_command, script, units='metal'):
     results['P_zz'] = np.empty(nsims)
 
     # Extract values from the simulation
+    energy = plan is None or plan.energy
+    pressure = plan is None or plan.pressure
     for i, simulation in enumerate(log.simulations):
-        results['E_pot_total'][i] = simulation.thermo.PotEng.values[-1]
-        results['E_pot_atom'][i] = simulation.thermo.v_peatom.values[-1]
-        results['P_xx'][i] = simulation.thermo.Pxx.values[-1]
-        results['P_yy'][i] = simulation.thermo.Pyy.values[-1]
-        results['P_zz'][i] = simulation.thermo.Pzz.values[-1]
+        if energy:
+            results['E_pot_total'][i] = simulation.thermo.PotEng.values[-1]
+            results['E_pot_atom'][i] = simulation.thermo.v_peatom.values[-1]
+        else:
+            results['E_pot_total'][i] = np.nan
+            results['E_pot_atom'][i] = np.nan
+        if pressure:
+            results['P_xx'][i] = simulation.thermo.Pxx.values[-1]
+            results['P_yy'][i] = simulation.thermo.Pyy.values[-1]
+            results['P_zz'][i] = simulation.thermo.Pzz.values[-1]
+        else:
+            results['P_xx'][i] = np.nan
+            results['P_yy'][i] = np.nan
+            results['P_zz'][i] = np.nan
 
     # Convert values to working units
     results['E_pot_total'] = uc.set_in_units(results['E_pot_total'], lammps_units['energy'])
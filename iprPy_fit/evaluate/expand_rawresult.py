@@ -0,0 +1,33 @@
+import numpy as np
+
+def expand_rawresult(rawresult: dict,
+                     index: int,
+                     reduction: dict) -> list:
+    """
+    Maps the result computed for one reduced paramset back to each of the
+    original paramsets that reduce to it.
+
+    Parameters
+    ----------
+    rawresult : dict
+        The evaluation result for the reduced paramset.
+    index : int
+        The index of the reduced paramset.
+    reduction : dict
+        The reduction mapping as returned by
+        iprPy_fit.reference.reduce_paramsets().
+
+    Returns
+    -------
+    list of tuple
+        The (index, result) pairs for the original paramsets.
+    """
+    expanded = []
+    for j in np.flatnonzero(reduction['index'] == index):
+        raw = dict(rawresult)
+        raw['E_pot_total'] = rawresult['E_pot_total'] * reduction['multiplier'][j]
+        if rawresult['F'] is not None:
+            raw['F'] = rawresult['F'][reduction['atom_map'][j]]
+        expanded.append((int(j), raw))
+
+    return expanded
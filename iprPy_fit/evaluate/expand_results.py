@@ -0,0 +1,39 @@
+import numpy as np
+
+def expand_results(results: dict,
+                   reduction: dict) -> dict:
+    """
+    Maps the results computed for reduced paramsets back to the original
+    paramsets they were generated from.
+
+    Parameters
+    ----------
+    results : dict
+        The evaluation results for the reduced paramsets.
+    reduction : dict
+        The reduction mapping as returned by
+        iprPy_fit.reference.reduce_paramsets().
+
+    Returns
+    -------
+    dict
+        The evaluation results for the original paramsets.
+    """
+    index = reduction['index']
+    multiplier = reduction['multiplier']
+
+    expanded = {}
+    for key, value in results.items():
+        if key == 'F':
+            expanded['F'] = []
+            for i, amap in zip(index, reduction['atom_map']):
+                if value[i] is None:
+                    expanded['F'].append(None)
+                else:
+                    expanded['F'].append(value[i][amap])
+        elif key == 'E_pot_total':
+            expanded[key] = np.asarray(value)[index] * multiplier
+        else:
+            expanded[key] = np.asarray(value)[index]
+
+    return expanded
@@ -0,0 +1,121 @@
+from typing import Iterator, Optional
+
+import numpy.typing as npt
+
+try:
+    from lammps import lammps as lammpsobj
+except:
+    has_lammps_lib = False
+else:
+    has_lammps_lib = True
+
+from ..lammps import SystemCache
+from . import (structure_runner, EvaluationPlan, PoolEvaluator, ThreadEvaluator,
+               HybridEvaluator, IsolatedEvaluator)
+
+def iter_evaluate(lmp = None,
+                  scripts = None,
+                  systems = None,
+                  potential = None,
+                  paramsets = None,
+                  include_velocities: bool = False,
+                  order: Optional[npt.ArrayLike] = None,
+                  buffers: Optional[dict] = None,
+                  cache: Optional[SystemCache] = None,
+                  plan: Optional[EvaluationPlan] = None) -> Iterator[tuple]:
+    """
+    Generator form of evaluate() that yields the results of each reference
+    system as soon as it is evaluated so that they can be processed and
+    discarded one at a time.
+
+    Parameters
+    ----------
+    lmp : lammps.lammps, PoolEvaluator, ThreadEvaluator, HybridEvaluator, IsolatedEvaluator or None
+        A LAMMPS interactive object, a PoolEvaluator of LAMMPS worker
+        processes, a ThreadEvaluator or HybridEvaluator of in-process
+        LAMMPS instances, or an IsolatedEvaluator supervised worker process.
+        If None, will attempt to import lammps and create a new
+        lammps.lammps object.
+    scripts : list or None
+    systems : list or None
+    potential
+    paramsets : list or None
+    include_velocities : bool, optional
+    order : array-like object, optional
+        The order in which to evaluate the structures.  Not used with a
+        PoolEvaluator, which yields results in the order they finish.
+    buffers : dict, optional
+        If given, the force array of each structure is stored in this dict
+        and refilled in place by later evaluations of the same structure.
+        Yielded force arrays are then only valid until the structure is
+        evaluated again.  Not used with a PoolEvaluator.
+    cache : SystemCache, optional
+        If given, the LAMMPS setup parameters of the systems are reused
+        between evaluations.  Only used with systems.
+    plan : EvaluationPlan, optional
+        If given, only the values needed by the plan are computed and
+        extracted.  The other values are nan, with None for forces.
+
+    Yields
+    ------
+    index : int
+        The index of the evaluated structure.
+    rawresult : dict
+        The energy, forces and pressures of the structure as returned by
+        lib_output().
+    """
+    # Create a lammps interactive object if needed
+    if lmp is None:
+        if has_lammps_lib:
+            lmp = lammpsobj(cmdargs=['-log', 'none', '-screen', 'none'])
+        else:
+            raise ValueError('lammps package not found!')
+
+    # Parallel worker pool variation
+    if isinstance(lmp, PoolEvaluator):
+        assert scripts is None, 'scripts cannot be used with a PoolEvaluator'
+        assert systems is None, 'systems cannot be used with a PoolEvaluator'
+        if paramsets is not None and paramsets is not lmp.paramsets:
+            raise ValueError('paramsets differ from those loaded by the PoolEvaluator')
+
+        yield from lmp.iter_run(plan=plan)
+        return
+
+    # Supervised worker process variation
+    if isinstance(lmp, IsolatedEvaluator):
+        assert scripts is None, 'scripts cannot be used with an IsolatedEvaluator'
+        assert systems is None, 'systems cannot be used with an IsolatedEvaluator'
+        if paramsets is not None and paramsets is not lmp.paramsets:
+            raise ValueError('paramsets differ from those loaded by the IsolatedEvaluator')
+
+        yield from lmp.iter_run(order=order, plan=plan)
+        return
+
+    # In-process thread variations
+    if isinstance(lmp, (ThreadEvaluator, HybridEvaluator)):
+        yield from lmp.iter_run(scripts=scripts, systems=systems,
+                                potential=potential, paramsets=paramsets,
+                                include_velocities=include_velocities,
+                                order=order, buffers=buffers, cache=cache,
+                                plan=plan)
+        return
+
+    if not isinstance(lmp, lammpsobj):
+        raise TypeError('lmp must be a lammps.lammps object or an evaluator')
+
+    structures, natoms, run = structure_runner(scripts=scripts, systems=systems,
+                                               potential=potential, paramsets=paramsets,
+                                               include_velocities=include_velocities,
+                                               cache=cache, plan=plan)
+
+    if order is None:
+        order = range(len(structures))
+
+    for i in order:
+        structure = structures[i]
+        if buffers is None:
+            yield int(i), run(lmp, i, None)
+        else:
+            rawresult = run(lmp, i, buffers.get(id(structure)))
+            buffers[id(structure)] = rawresult['F']
+            yield int(i), rawresult
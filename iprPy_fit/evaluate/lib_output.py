@@ -1,35 +1,112 @@
+from typing import Optional
+import ctypes
 
-import atomman as am
-import atomman.unitconvert as uc
+import numpy as np
 
-def lib_output(lmp) -> dict:
+def lib_output(lmp,
+               out: Optional[np.ndarray] = None,
+               plan = None,
+               atoms: Optional[np.ndarray] = None) -> dict:
     """
     This extracts the energy, force and pressure values from an interactive
-    LAMMPS run.
+    LAMMPS run.  The forces are copied out of LAMMPS in the order of the
+    atom ids, i.e. the order the atoms were created in, as LAMMPS may sort
+    the atoms during setup.
     
     Parameters
     ----------
     lmp : lammps.lammps
         The LAMMPS library object to interact with.
-    natoms : int
-        The number of atoms in the system.
-    units : str
-        The LAMMPS units option allowing for the conversion of the outputs
-        to atomman working units.
+    out : numpy.ndarray, optional
+        A (natoms, 3) array to fill with the forces, such as the force array
+        returned by a previous evaluation of the same structure.  If not
+        given or the shape does not match, a new array is created.
+    plan : EvaluationPlan, optional
+        If given, only the planned values are extracted.  The others are nan,
+        or None for the forces.
+    atoms : numpy.ndarray, optional
+        The indices of the atoms to extract the forces of, in the order the
+        atoms were created.  If the atoms were created with an atom map,
+        only the selected forces are gathered by LAMMPS.
     """
-    # Get lammps units
-    lammps_units = am.lammps.style.unit(lmp.extract_global('units'))
+    # Get lammps unit conversion factors
+    energy, pressure, force = _unit_factors(lmp.extract_global('units'))
     
     # Get natoms
     natoms = lmp.get_natoms()
 
     # Get results
     results = {}
-    results['E_pot_total'] = uc.set_in_units(lmp.get_thermo('pe'), lammps_units['energy'])
-    results['E_pot_atom'] =  uc.set_in_units(lmp.get_thermo('pe') / natoms, lammps_units['energy'])
-    results['P_xx'] = uc.set_in_units(lmp.get_thermo('pxx'), lammps_units['pressure'])
-    results['P_yy'] = uc.set_in_units(lmp.get_thermo('pyy'), lammps_units['pressure'])
-    results['P_zz'] = uc.set_in_units(lmp.get_thermo('pzz'), lammps_units['pressure'])
-    results['F'] = uc.set_in_units(lmp.numpy.extract_atom('f', nelem=natoms, dim=3), lammps_units['force'])
-
-    return results
\ No newline at end of file
+    if plan is None or plan.energy:
+        pe = lmp.get_thermo('pe')
+        results['E_pot_total'] = pe * energy
+        results['E_pot_atom'] = pe / natoms * energy
+    else:
+        results['E_pot_total'] = np.nan
+        results['E_pot_atom'] = np.nan
+    if plan is None or plan.pressure:
+        results['P_xx'] = lmp.get_thermo('pxx') * pressure
+        results['P_yy'] = lmp.get_thermo('pyy') * pressure
+        results['P_zz'] = lmp.get_thermo('pzz') * pressure
+    else:
+        results['P_xx'] = np.nan
+        results['P_yy'] = np.nan
+        results['P_zz'] = np.nan
+
+    if plan is not None and not plan.forces:
+        results['F'] = None
+        return results
+
+    if atoms is not None:
+        results['F'] = _subset_forces(lmp, natoms, atoms, out)
+        results['F'] *= force
+        return results
+
+    # Copy forces from LAMMPS memory in atom id order
+    if out is None or out.shape != (natoms, 3):
+        out = np.empty((natoms, 3))
+    ids = lmp.numpy.extract_atom('id', nelem=natoms)
+    f = lmp.numpy.extract_atom('f', nelem=natoms, dim=3)
+    np.take(f, np.argsort(ids), axis=0, out=out)
+    out *= force
+    results['F'] = out
+
+    return results
+
+def _subset_forces(lmp, natoms, atoms, out):
+    """Copies the forces of selected atoms from LAMMPS in the given order"""
+    if out is None or out.shape != (len(atoms), 3):
+        out = np.empty((len(atoms), 3))
+    ids = np.ascontiguousarray(np.asarray(atoms) + 1, dtype=np.int32)
+
+    # Gather only the selected atoms if LAMMPS has an atom map
+    if lmp.extract_global('map_style'):
+        data = lmp.gather_atoms_subset('f', 1, 3, len(ids),
+                                       ids.ctypes.data_as(ctypes.POINTER(ctypes.c_int)))
+        out[:] = np.frombuffer(data).reshape(-1, 3)
+        return out
+
+    # Otherwise find the local index of each selected atom id
+    local = np.empty(natoms + 1, dtype=int)
+    local[lmp.numpy.extract_atom('id', nelem=natoms)] = np.arange(natoms)
+    f = lmp.numpy.extract_atom('f', nelem=natoms, dim=3)
+    np.take(f, local[ids], axis=0, out=out)
+    return out
+
+# Conversion factors by LAMMPS units style.  Workers that do not import
+# atomman are given the factors by the parent process.
+_unit_factor_cache = {}
+
+def _unit_factors(lammps_units: str) -> tuple:
+    """Gets the energy, pressure and force conversion factors for a LAMMPS units style"""
+    factors = _unit_factor_cache.get(lammps_units)
+    if factors is None:
+        import atomman as am
+        import atomman.unitconvert as uc
+
+        units = am.lammps.style.unit(lammps_units)
+        factors = (uc.set_in_units(1.0, units['energy']),
+                   uc.set_in_units(1.0, units['pressure']),
+                   uc.set_in_units(1.0, units['force']))
+        _unit_factor_cache[lammps_units] = factors
+    return factors
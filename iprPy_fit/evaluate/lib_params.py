@@ -1,8 +1,16 @@
+from typing import Optional
+
+import numpy as np
+
 from ..lammps import create_box_atoms
 
 from . import lib_run0, lib_output
 
-def lib_params(lmp, **kwargs) -> dict:
+def lib_params(lmp,
+               out: Optional[np.ndarray] = None,
+               plan = None,
+               atoms: Optional[np.ndarray] = None,
+               **kwargs) -> dict:
     """
     Evaluate the energy, forces, and pressures on an atomman system using a
     dynamic LAMMPS interaction using system information extracted by
@@ -12,6 +20,13 @@ def lib_params(lmp, **kwargs) -> dict:
     ----------
     lmp : lammps.lammps
         The LAMMPS interactive object to use.
+    out : numpy.ndarray, optional
+        An array to reuse for the forces.  See lib_output().
+    plan : EvaluationPlan, optional
+        If given, only the planned values are computed and extracted.
+    atoms : numpy.ndarray, optional
+        If given, only the forces of these atoms are extracted.  See
+        lib_output().
     **kwargs : any
         The output from dump_lammps_dynamic_parameters().
     
@@ -21,12 +36,12 @@ def lib_params(lmp, **kwargs) -> dict:
         Dict containing energy, forces and system pressure values.
     """
     # Set basic parameters, box, atoms and potential based on kwargs
-    create_box_atoms(lmp, **kwargs)
+    create_box_atoms(lmp, atom_map=atoms is not None, **kwargs)
 
     # Perform a run 0
-    lib_run0(lmp)
+    lib_run0(lmp, plan=plan)
 
     # Extract results
-    results = lib_output(lmp)
+    results = lib_output(lmp, out=out, plan=plan, atoms=atoms)
     
     return results
\ No newline at end of file
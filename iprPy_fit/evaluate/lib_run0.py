@@ -1,10 +1,23 @@
-def lib_run0(lmp):
+def lib_run0(lmp, plan=None):
     """
     This performs the LAMMPS commands for a run 0.  Assumes basic settings,
     box, atoms and potential are already set.
+
+    Parameters
+    ----------
+    lmp : lammps.lammps
+        The LAMMPS library object to interact with.
+    plan : EvaluationPlan, optional
+        Limits the thermo output to the planned values so that unneeded
+        energy and virial tallies are skipped.
     """
+    if plan is None:
+        keywords = ['step', 'pxx', 'pyy', 'pzz', 'pe']
+    else:
+        keywords = plan.thermo_keywords
+
     # Setup a run 0
-    lmp.cmd.thermo_style('custom', 'step', 'pxx', 'pyy', 'pzz', 'pe')
+    lmp.cmd.thermo_style('custom', *keywords)
     lmp.cmd.thermo_modify('format', 'float', '%.13e')
     lmp.cmd.fix('nve', 'all', 'nve')
     lmp.cmd.run(0)
\ No newline at end of file
@@ -1,7 +1,14 @@
+from typing import Optional
+
+import numpy as np
+
 from . import lib_output
 
 def lib_script(lmp,
-               script) -> dict:
+               script,
+               out: Optional[np.ndarray] = None,
+               plan = None,
+               atoms: Optional[np.ndarray] = None) -> dict:
     """
     Evaluate the energy, forces, and pressures on an atomman system using a
     dynamic LAMMPS interaction and a full LAMMPS script.
@@ -12,6 +19,14 @@ def lib_script(lmp,
         The LAMMPS interactive object to use.
     script : str
         The LAMMPS script to use.
+    out : numpy.ndarray, optional
+        An array to reuse for the forces.  See lib_output().
+    plan : EvaluationPlan, optional
+        If given, only the planned values are extracted.  The script should
+        be built with the same plan.
+    atoms : numpy.ndarray, optional
+        If given, only the forces of these atoms are extracted.  See
+        lib_output().
     
     Returns
     -------
@@ -22,6 +37,6 @@ def lib_script(lmp,
     lmp.commands_string(script)
 
     # Extract results
-    results = lib_output(lmp)
+    results = lib_output(lmp, out=out, plan=plan, atoms=atoms)
     
     return results
\ No newline at end of file
@@ -1,6 +1,8 @@
 from typing import Optional
 
-from ..lammps import dump_lammps_dynamic
+import numpy as np
+
+from ..lammps import dump_lammps_dynamic, create_box_atoms, SystemCache
 from . import lib_run0, lib_output
 
 def lib_system(lmp,
@@ -9,7 +11,11 @@ def lib_system(lmp,
                atom_style: Optional[str] = None,
                units: Optional[str] = None,
                natypes: Optional[int] = None,
-               include_velocities: bool = False
+               include_velocities: bool = False,
+               out: Optional[np.ndarray] = None,
+               cache: Optional[SystemCache] = None,
+               plan = None,
+               atoms: Optional[np.ndarray] = None
                ) -> dict:
     """
     Evaluate the energy, forces, and pressures on an atomman system using a
@@ -39,6 +45,16 @@ def lib_system(lmp,
         Indicates if velocity information in the system (if present) is to
         be extracted and included in the returned outputs.  Default value is
         False.
+    out : numpy.ndarray, optional
+        An array to reuse for the forces.  See lib_output().
+    cache : SystemCache, optional
+        If given, the LAMMPS setup parameters for the system are taken from
+        and stored in the cache.
+    plan : EvaluationPlan, optional
+        If given, only the planned values are computed and extracted.
+    atoms : numpy.ndarray, optional
+        If given, only the forces of these atoms are extracted.  See
+        lib_output().
     
     Returns
     -------
@@ -46,14 +62,20 @@ def lib_system(lmp,
         Dict containing energy, forces and system pressure values.
     """
     # Set basic parameters, box, atoms and potential based on system and potential objects
-    dump_lammps_dynamic(system, lmp, potential, atom_style=atom_style,
-                        units=units, natypes=natypes,
-                        include_velocities=include_velocities)
+    if cache is None:
+        dump_lammps_dynamic(system, lmp, potential, atom_style=atom_style,
+                            units=units, natypes=natypes,
+                            include_velocities=include_velocities)
+    else:
+        params = cache.get(system, potential, atom_style=atom_style,
+                           units=units, natypes=natypes,
+                           include_velocities=include_velocities)
+        create_box_atoms(lmp, atom_map=atoms is not None, **params)
     
     # Perform a run 0
-    lib_run0(lmp)
+    lib_run0(lmp, plan=plan)
 
     # Extract results
-    results = lib_output(lmp)
+    results = lib_output(lmp, out=out, plan=plan, atoms=atoms)
     
     return results
\ No newline at end of file
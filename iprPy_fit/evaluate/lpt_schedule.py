@@ -0,0 +1,35 @@
+import heapq
+
+import numpy as np
+import numpy.typing as npt
+
+def lpt_schedule(costs: npt.ArrayLike,
+                 nworkers: int) -> list:
+    """
+    Assigns structures to workers using longest-processing-time-first
+    scheduling: structures are taken from most to least expensive and each
+    is given to the worker with the smallest total load so far.
+
+    Parameters
+    ----------
+    costs : array-like object
+        The estimated cost of each structure.
+    nworkers : int
+        The number of workers to divide the structures between.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The structure indices assigned to each worker, sorted from most to
+        least expensive.  Workers that have no structures are excluded.
+    """
+    costs = np.asarray(costs, dtype=float)
+    heap = [(0.0, worker) for worker in range(nworkers)]
+    assignments = [[] for worker in range(nworkers)]
+
+    for i in np.argsort(-costs, kind='stable'):
+        load, worker = heapq.heappop(heap)
+        assignments[worker].append(i)
+        heapq.heappush(heap, (load + costs[i], worker))
+
+    return [np.array(a, dtype=int) for a in assignments if len(a) > 0]
@@ -0,0 +1,80 @@
+from typing import Optional
+
+from ..lammps import SystemCache
+from . import lib_system, lib_script, lib_params, EvaluationPlan
+
+def structure_runner(scripts = None,
+                     systems = None,
+                     potential = None,
+                     paramsets = None,
+                     include_velocities: bool = False,
+                     cache: Optional[SystemCache] = None,
+                     plan: Optional[EvaluationPlan] = None) -> tuple:
+    """
+    Selects the library evaluation method for the given type of reference
+    structures.
+
+    Parameters
+    ----------
+    scripts : list or None
+    systems : list or None
+    potential
+    paramsets : list or None
+    include_velocities : bool, optional
+    cache : SystemCache, optional
+        Reuses the LAMMPS setup parameters of systems between evaluations.
+    plan : EvaluationPlan, optional
+        If given, only the planned values are computed and extracted.
+
+    Returns
+    -------
+    structures : list
+        The reference structures.
+    natoms : list or None
+        The number of atoms in each structure, or None for scripts.
+    run : callable
+        Function run(lmp, index, out) that evaluates the structure with the
+        given index with a lammps.lammps object, reusing the out force array
+        if given.
+    """
+    def atoms(i):
+        return None if plan is None else plan.atoms(i)
+
+    # Run using prepared scripts
+    if scripts is not None:
+        assert systems is None, 'scripts and systems cannot both be given'
+        assert potential is None, 'potential object can only be used with systems'
+        assert paramsets is None, 'scripts and paramsets cannot both be given'
+
+        natoms = None
+        def run(lmp, i, out):
+            return lib_script(lmp, scripts[i], out=out, plan=plan, atoms=atoms(i))
+
+        return scripts, natoms, run
+
+    # Run using system and potential objects
+    elif systems is not None:
+        assert potential is not None, 'potential must be given with systems'
+        assert paramsets is None, 'systems and paramsets cannot both be given'
+
+        natoms = [system.natoms for system in systems]
+        def run(lmp, i, out):
+            return lib_system(lmp, systems[i], potential,
+                              include_velocities=include_velocities,
+                              out=out, cache=cache, plan=plan, atoms=atoms(i))
+
+        return systems, natoms, run
+
+    # Run using extracted parameters (should be pickle-safe)
+    elif paramsets is not None:
+        assert potential is None, 'potential object can only be used with systems'
+
+        natoms = [len(params['atype']) for params in paramsets]
+        def run(lmp, i, out):
+            return lib_params(lmp, out=out, plan=plan, atoms=atoms(i),
+                              **paramsets[i])
+
+        return paramsets, natoms, run
+
+    else:
+        raise ValueError('scripts, systems + potential or paramsets must be given')
@@ -0,0 +1,73 @@
+from typing import Optional
+
+from . import dump_lammps_dynamic_parameters
+
+class SystemCache():
+    """
+    Caches the LAMMPS setup parameters generated by
+    dump_lammps_dynamic_parameters() for atomman Systems so that repeated
+    evaluations of the same systems skip the box checks and the conversion
+    of the atomic positions.  Entries are keyed by the identities of the
+    system and potential objects, and references to both are held so the
+    identities stay valid.
+    """
+    def __init__(self):
+        """
+        Initializes an empty SystemCache.
+        """
+        self.__entries = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def clear(self):
+        """Removes all cached parameters"""
+        self.__entries = {}
+
+    def get(self,
+            system,
+            potential,
+            atom_style: Optional[str] = None,
+            units: Optional[str] = None,
+            natypes: Optional[int] = None,
+            include_velocities: bool = False) -> dict:
+        """
+        Returns the setup parameters for a system and potential, generating
+        them on the first call.
+
+        Parameters
+        ----------
+        system : atomman.System
+            The system that LAMMPS will replicate.
+        potential : atomman.lammps.Potential
+            The potential to build pair_info for.
+        atom_style : str, optional
+            The LAMMPS atom_style option.
+        units : str, optional
+            The LAMMPS units option.
+        natypes : int, optional
+            Allows the natypes value to be manually changed.
+        include_velocities : bool, optional
+            Indicates if velocity information in the system (if present) is to
+            be included.  Default value is False.
+
+        Returns
+        -------
+        dict
+            The parameters as returned by dump_lammps_dynamic_parameters()
+            with return_pair_info=True.  The dict is shared with the cache
+            and should not be modified.
+        """
+        key = (id(system), id(potential), atom_style, units, natypes,
+               include_velocities)
+        entry = self.__entries.get(key)
+        if entry is None:
+            params = dump_lammps_dynamic_parameters(system, atom_style=atom_style,
+                                                    units=units, natypes=natypes,
+                                                    potential=potential,
+                                                    return_pair_info=True,
+                                                    include_velocities=include_velocities)
+            entry = (system, potential, params)
+            self.__entries[key] = entry
+
+        return entry[2]
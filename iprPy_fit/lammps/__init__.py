@@ -4,9 +4,10 @@ from .create_box_atoms import create_box_atoms
 from .dump_lammps_commands import dump_lammps_commands
 from .dump_lammps_dynamic_parameters import dump_lammps_dynamic_parameters
 from .dump_lammps_dynamic import dump_lammps_dynamic
+from .SystemCache import SystemCache
 
 from .build_script import build_script, build_combined_script
 
 __all__ = ['version_date', 'create_box_atoms', 'dump_lammps_commands',
-           'dump_lammps_dynamic_parameters', 'dump_lammps_dynamic',
+           'dump_lammps_dynamic_parameters', 'dump_lammps_dynamic', 'SystemCache',
            'build_script', 'build_combined_script']
\ No newline at end of file
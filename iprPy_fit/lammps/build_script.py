@@ -1,19 +1,19 @@
 import datetime
-
-
-from potentials.record.PotentialLAMMPS import PotentialLAMMPS
-from atomman import System
-from atomman.tools import filltemplate
-from iprPy.tools import read_calc_file
-
+from typing import Optional, TYPE_CHECKING
 
 from . import dump_lammps_commands
 
+if TYPE_CHECKING:
+    from potentials.record.PotentialLAMMPS import PotentialLAMMPS
+    from atomman import System
+    from ..evaluate import EvaluationPlan
+
 
 
-def build_script(potential: PotentialLAMMPS,
-                 system: System,
-                 lammps_date: datetime.date) -> str:
+def build_script(potential: 'PotentialLAMMPS',
+                 system: 'System',
+                 lammps_date: datetime.date,
+                 plan: Optional['EvaluationPlan'] = None) -> str:
     """
     Builds the LAMMPS input script to evaluate a single reference system.
 
@@ -24,6 +24,10 @@ def build_script(potential: PotentialLAMMPS,
         command lines.
     system : atomman.System
         The reference atomic system to evaluate.
+    lammps_date : datetime.date
+        The version date of the LAMMPS executable.
+    plan : EvaluationPlan, optional
+        If given, the thermo output is limited to the planned values.
 
     Returns
     -------
@@ -41,15 +45,34 @@ def build_script(potential: PotentialLAMMPS,
     else:
         lammps_variables['box_tilt_large'] = ''
 
+    # Only output what the plan needs
+    if plan is None:
+        keywords = ['step', 'lx', 'ly', 'lz', 'pxx', 'pyy', 'pzz', 'pe']
+        energy = True
+    else:
+        keywords = plan.thermo_keywords
+        energy = plan.energy
+    if energy:
+        lammps_variables['peatom_variable'] = 'variable peatom equal pe/atoms'
+        keywords = keywords + ['v_peatom']
+    else:
+        lammps_variables['peatom_variable'] = ''
+    lammps_variables['thermo_keywords'] = ' '.join(keywords)
+
+    # iprPy and atomman are only needed for building scripts
+    from atomman.tools import filltemplate
+    from iprPy.tools import read_calc_file
+
     template = read_calc_file('iprPy_fit.lammps', 'run0.template')
     script = filltemplate(template, lammps_variables, '<', '>')
 
     return script
 
 
-def build_combined_script(potential: PotentialLAMMPS,
+def build_combined_script(potential: 'PotentialLAMMPS',
                           systems: list,
-                          lammps_date: datetime.date) -> str:
+                          lammps_date: datetime.date,
+                          plan: Optional['EvaluationPlan'] = None) -> str:
     """
     Builds the LAMMPS input script to evaluate all reference systems.
 
@@ -60,6 +83,10 @@ def build_combined_script(potential: PotentialLAMMPS,
         command lines.
     systems : list of atomman.System
         The reference atomic systems to evaluate.
+    lammps_date : datetime.date
+        The version date of the LAMMPS executable.
+    plan : EvaluationPlan, optional
+        If given, the thermo output is limited to the planned values.
 
     Returns
     -------
@@ -68,6 +95,6 @@ def build_combined_script(potential: PotentialLAMMPS,
     """
     script = ''
     for system in systems:
-        script += build_script(potential, system, lammps_date)
+        script += build_script(potential, system, lammps_date, plan=plan)
 
     return script
\ No newline at end of file
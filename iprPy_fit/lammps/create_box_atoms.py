@@ -15,10 +15,14 @@ def create_box_atoms(lmp,
                      symbols: list,
                      masses: list,
                      pair_info: Optional[str],
-                     potential = None):
+                     potential = None,
+                     atom_map: bool = False):
     """
     Initial setup of a dynamic LAMMPS simulation using parameter extracted
     from an atomman System by dump_lammps_dynamic_parameters()
+
+    If atom_map is True, an atom map is created so that the values of
+    selected atoms can be gathered by atom id.
     """
     lammps_date = version_date(lmp)
 
@@ -28,6 +32,8 @@ def create_box_atoms(lmp,
         lmp.cmd.box('tilt', 'large')
     lmp.cmd.units(units)
     lmp.cmd.atom_style(atom_style)
+    if atom_map:
+        lmp.cmd.atom_modify('map', 'yes')
     
     # Create box
     lmp.cmd.boundary(*pbc)
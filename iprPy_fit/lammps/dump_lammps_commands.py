@@ -2,19 +2,20 @@
 
 # Standard Python libraries
 from copy import deepcopy
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 # http://www.numpy.org/
 import numpy as np
 import numpy.typing as npt
 
-from potentials.record.PotentialLAMMPS import PotentialLAMMPS
+if TYPE_CHECKING:
+    from potentials.record.PotentialLAMMPS import PotentialLAMMPS
 
 def dump_lammps_commands(system,
          atom_style: Optional[str] = None,
          units: Optional[str] = None,
          natypes: Optional[int] = None, 
-         potential: Optional[PotentialLAMMPS] = None,
+         potential: Optional['PotentialLAMMPS'] = None,
          uvws: Optional[npt.ArrayLike] = None,
          shift: Optional[npt.ArrayLike] = None,
          size_mults: Optional[npt.ArrayLike] = None,
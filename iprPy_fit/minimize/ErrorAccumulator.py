@@ -0,0 +1,115 @@
+from typing import Optional
+
+import numpy as np
+
+from ..evaluate import expand_rawresult
+from . import structure_error
+
+class ErrorAccumulator():
+    """
+    Incrementally accumulates the error of an evaluation as the results for
+    each structure become available.  Only the per-structure errors of each
+    weights key are kept, so the energy, pressure and force values can be
+    discarded as soon as they are added.
+    """
+    def __init__(self,
+                 ref_values: dict,
+                 weights: dict,
+                 reduction: Optional[dict] = None):
+        """
+        Initializes an ErrorAccumulator.
+
+        Parameters
+        ----------
+        ref_values : dict
+            The reference property values to compare to.
+        weights : dict
+            The weights to use for each property type.
+        reduction : dict, optional
+            The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+            the added results are for a reduced set of structures.  The
+            errors are then for the original structures.
+        """
+        self.__ref_values = ref_values
+        self.__weights = weights
+        self.__reduction = reduction
+
+        if reduction is not None:
+            nsims = len(reduction['index'])
+        else:
+            nsims = len(next(iter(ref_values.values())))
+        self.__errors = np.full(nsims, np.nan)
+        self.__key_errors = {key: np.zeros(nsims) for key in weights}
+        self.__added = np.zeros(nsims, dtype=bool)
+        self.__error = 0.0
+
+    @property
+    def error(self) -> float:
+        """float: The total error of the structures added so far"""
+        return self.__error
+
+    @property
+    def errors(self) -> np.ndarray:
+        """numpy.ndarray: The error of each structure, nan if not yet added"""
+        return self.__errors
+
+    @property
+    def key_errors(self) -> dict:
+        """dict: The total error of each weights key for the structures added so far"""
+        return {key: float(errors.sum()) for key, errors in self.__key_errors.items()}
+
+    @property
+    def nevaluated(self) -> int:
+        """int: The number of structures that have been added"""
+        return int(np.sum(self.__added))
+
+    @property
+    def complete(self) -> bool:
+        """bool: True if all structures have been added"""
+        return bool(np.all(self.__added))
+
+    def reset(self):
+        """Clears all accumulated errors"""
+        self.__errors[:] = np.nan
+        for errors in self.__key_errors.values():
+            errors[:] = 0.0
+        self.__added[:] = False
+        self.__error = 0.0
+
+    def add(self,
+            index: int,
+            rawresult: dict) -> float:
+        """
+        Adds the result of one structure.
+
+        Parameters
+        ----------
+        index : int
+            The index of the evaluated structure.
+        rawresult : dict
+            The energy, forces and pressures of the structure.
+
+        Returns
+        -------
+        float
+            The total error of the structures added so far.
+        """
+        if self.__reduction is None:
+            expanded = [(index, rawresult)]
+        else:
+            expanded = expand_rawresult(rawresult, index, self.__reduction)
+
+        for j, values in expanded:
+            error = 0.0
+            for key, weight in self.__weights.items():
+                key_error = structure_error(values, j, self.__ref_values,
+                                            {key: weight})
+                self.__key_errors[key][j] = key_error
+                error += key_error
+            if self.__added[j]:
+                self.__error -= self.__errors[j]
+            self.__errors[j] = error
+            self.__added[j] = True
+            self.__error += error
+
+        return self.__error
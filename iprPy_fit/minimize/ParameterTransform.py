@@ -0,0 +1,217 @@
+from typing import Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+
+class ParameterTransform():
+    """
+    Maps parameter values to and from a well-scaled internal space that the
+    optimizer works in.  Each parameter uses one of the kinds:
+
+    - 'affine' maps the bounds onto [0, 1].
+    - 'log' maps the log of the bounds onto [0, 1].  Requires a positive
+      lower bound.
+    - 'logit' maps the bounds onto (-inf, inf) so that any internal value is
+      within the bounds.
+    - 'none' leaves the parameter in its original units.
+    """
+    def __init__(self,
+                 bounds: list,
+                 kinds: Union[str, list] = 'auto',
+                 log_ratio: float = 100.0,
+                 eps: float = 1e-12):
+        """
+        Initializes a ParameterTransform.
+
+        Parameters
+        ----------
+        bounds : list
+            The (min, max) bounds for each parameter.  Parameters with None
+            bounds or None limits use the 'none' kind.
+        kinds : str or list, optional
+            The transform kind to use for all parameters or for each
+            parameter.  'auto' (default) selects 'log' for positive bounds
+            spanning more than log_ratio and 'affine' for the others.
+        log_ratio : float, optional
+            The max/min bounds ratio above which 'auto' selects 'log'.
+            Default value is 100.0.
+        eps : float, optional
+            The closest normalized distance from the bounds that values are
+            clipped to for the 'logit' kind.  Default value is 1e-12.
+        """
+        nparams = len(bounds)
+        lower = np.full(nparams, np.nan)
+        upper = np.full(nparams, np.nan)
+        for i, bound in enumerate(bounds):
+            if bound is None:
+                continue
+            if bound[0] is not None:
+                lower[i] = bound[0]
+            if bound[1] is not None:
+                upper[i] = bound[1]
+        finite = np.isfinite(lower) & np.isfinite(upper)
+        if np.any(upper[finite] <= lower[finite]):
+            raise ValueError('upper bounds must be larger than lower bounds')
+
+        if isinstance(kinds, str):
+            kinds = [kinds for i in range(nparams)]
+        if len(kinds) != nparams:
+            raise ValueError('kinds and bounds must be the same length')
+        kinds = np.array(kinds, dtype=object)
+        for i in range(nparams):
+            if not finite[i]:
+                kinds[i] = 'none'
+            elif kinds[i] == 'auto':
+                if lower[i] > 0 and upper[i] / lower[i] > log_ratio:
+                    kinds[i] = 'log'
+                else:
+                    kinds[i] = 'affine'
+            elif kinds[i] not in ('affine', 'log', 'logit', 'none'):
+                raise ValueError(f'unknown transform kind {kinds[i]}')
+            elif kinds[i] == 'log' and lower[i] <= 0:
+                raise ValueError('log transform requires positive bounds')
+
+        self.__kinds = kinds
+        self.__bounds = list(bounds)
+        self.__eps = eps
+
+        # Precompute the normalization for the bounded kinds
+        self.__log = kinds == 'log'
+        self.__logit = kinds == 'logit'
+        self.__none = kinds == 'none'
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.__lower = np.where(self.__log, np.log(lower), lower)
+            self.__width = np.where(self.__log, np.log(upper), upper) - self.__lower
+        self.__lower[self.__none] = 0.0
+        self.__width[self.__none] = 1.0
+
+    @property
+    def kinds(self) -> np.ndarray:
+        """numpy.ndarray: The transform kind used for each parameter"""
+        return self.__kinds
+
+    @property
+    def bounds(self) -> Optional[list]:
+        """list or None: The bounds in the internal space, None if unbounded"""
+        bounds = []
+        for i, kind in enumerate(self.__kinds):
+            if kind in ('affine', 'log'):
+                bounds.append((0.0, 1.0))
+            elif kind == 'logit':
+                bounds.append((None, None))
+            else:
+                bounds.append(self.__bounds[i])
+        if all(bound is None or tuple(bound) == (None, None) for bound in bounds):
+            return None
+        return bounds
+
+    def to_internal(self, values: npt.ArrayLike) -> np.ndarray:
+        """
+        Transforms parameter values into the internal space.
+
+        Parameters
+        ----------
+        values : array-like object
+            The parameter values.
+
+        Returns
+        -------
+        numpy.ndarray
+            The internal values.
+        """
+        values = np.array(values, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values[self.__log] = np.log(values[self.__log])
+        t = (values - self.__lower) / self.__width
+
+        p = np.clip(t[self.__logit], self.__eps, 1 - self.__eps)
+        t[self.__logit] = np.log(p / (1 - p))
+        return t
+
+    def to_external(self, internal: npt.ArrayLike) -> np.ndarray:
+        """
+        Transforms internal values back into parameter values.
+
+        Parameters
+        ----------
+        internal : array-like object
+            The internal values.
+
+        Returns
+        -------
+        numpy.ndarray
+            The parameter values.
+        """
+        t = np.array(internal, dtype=float)
+        t[self.__logit] = 1 / (1 + np.exp(-t[self.__logit]))
+
+        values = self.__lower + t * self.__width
+        values[self.__log] = np.exp(values[self.__log])
+        return values
+
+    def from_unit_cube(self, points: npt.ArrayLike) -> np.ndarray:
+        """
+        Maps points in the unit cube onto parameter values within the bounds
+        so that samples are uniform in the normalized space, i.e. log-uniform
+        for the 'log' kind.
+
+        Parameters
+        ----------
+        points : array-like object
+            The unit cube coordinates, with the last dimension matching the
+            number of parameters.
+
+        Returns
+        -------
+        numpy.ndarray
+            The parameter values.
+        """
+        if np.any(self.__none):
+            raise ValueError('all parameters must have finite bounds')
+        values = self.__lower + np.asarray(points, dtype=float) * self.__width
+        values[..., self.__log] = np.exp(values[..., self.__log])
+        return values
+
+    def initial_simplex(self,
+                        values: npt.ArrayLike,
+                        step: float = 0.1) -> np.ndarray:
+        """
+        Builds a Nelder-Mead initial simplex in the internal space whose
+        edges are a fraction of each parameter's bounds.
+
+        Parameters
+        ----------
+        values : array-like object
+            The starting parameter values.
+        step : float, optional
+            The edge length as a fraction of the normalized bounds.  Default
+            value is 0.1.
+
+        Returns
+        -------
+        numpy.ndarray
+            The (N+1, N) simplex vertices in the internal space.
+        """
+        values = np.asarray(values, dtype=float)
+        start = self.to_internal(values)
+        simplex = np.tile(start, (len(values) + 1, 1))
+
+        for i in range(len(values)):
+            if self.__none[i]:
+                # Match scipy's default relative step
+                if values[i] != 0:
+                    simplex[i + 1, i] = start[i] * 1.05
+                else:
+                    simplex[i + 1, i] = 0.00025
+                continue
+
+            # Step in normalized [0, 1] space, away from the nearer bound
+            t = (values[i] if not self.__log[i] else np.log(values[i]))
+            t = (t - self.__lower[i]) / self.__width[i]
+            t = t + step if t + step <= 1.0 else t - step
+            if self.__logit[i]:
+                t = np.clip(t, self.__eps, 1 - self.__eps)
+                t = np.log(t / (1 - t))
+            simplex[i + 1, i] = t
+
+        return simplex
@@ -0,0 +1,7 @@
+class PartialError(float):
+    """
+    The error returned when an evaluation stops early because the running
+    error exceeded the error ceiling.  The value is a lower bound of the
+    full error and can be used anywhere a float can.
+    """
+    partial = True
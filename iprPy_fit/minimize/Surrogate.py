@@ -0,0 +1,309 @@
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+class Surrogate():
+    """
+    Quadratic response surface model of the error as a function of the
+    parameters, trained on the (parameters, error) history of a
+    minimization.  The model fits the log of the error, and is retrained
+    incrementally by accumulating the normal equations of the least squares
+    fit as each evaluation is added.
+
+    Before a trial point is evaluated with LAMMPS, promising() checks if the
+    model expects it to be far worse than the best error so far.  A
+    quadratic fit is usually worst near the minimum, so rather than a
+    typical residual, the largest over-prediction of the evaluated points
+    whose errors were below the rejection threshold sets how cautious the
+    rejection is.  Each point's over-prediction is the larger of the
+    out-of-sample one found before it was added and that of the current
+    model.  Points are never rejected if no evaluated point was below the
+    threshold, or if they are predicted to be better than the best error.
+    The errors of added points are also kept so that repeated trial points,
+    such as the start of each line search, are not evaluated again.
+    """
+    def __init__(self,
+                 ndim: int,
+                 bounds: Optional[list] = None,
+                 quadratic: str = 'auto',
+                 reject_ratio: float = 2.0,
+                 confidence: float = 1.0,
+                 min_points: Optional[int] = None,
+                 forget: float = 1.0,
+                 ridge: float = 1e-8):
+        """
+        Initializes an untrained Surrogate.
+
+        Parameters
+        ----------
+        ndim : int
+            The number of parameters.
+        bounds : list, optional
+            The (min, max) bounds for each parameter, used to scale the
+            parameters.  If not given, the parameters are scaled by the
+            magnitude of the first point added.
+        quadratic : str, optional
+            'diagonal' uses only the squared terms, 'full' also uses all
+            cross terms, and 'auto' (default) switches from 'diagonal' to
+            'full' once there are twice as many points as full terms.
+        reject_ratio : float, optional
+            Points predicted to have errors above reject_ratio times the best
+            error are not promising.  Default value is 2.0.
+        confidence : float, optional
+            The multiple of the largest over-prediction of points below the
+            rejection threshold that the prediction must exceed the threshold
+            by.  Default value is 1.0.
+        min_points : int, optional
+            The number of points needed before any point is rejected.
+            Default value is twice the number of diagonal model terms.
+        forget : float, optional
+            Factor applied to the accumulated history each time a point is
+            added, with values below 1 favoring recent points.  Default value
+            is 1.0.
+        ridge : float, optional
+            Ridge regularization added to the normal equations.  Default value
+            is 1e-8.
+        """
+        if quadratic not in ('auto', 'diagonal', 'full'):
+            raise ValueError("quadratic must be 'auto', 'diagonal' or 'full'")
+        if not 0.0 < forget <= 1.0:
+            raise ValueError('forget must be in (0, 1]')
+        if reject_ratio < 1.0:
+            raise ValueError('reject_ratio must be at least 1')
+
+        self.__ndim = ndim
+        self.__quadratic = quadratic
+        self.reject_ratio = reject_ratio
+        self.confidence = confidence
+        self.forget = forget
+        self.ridge = ridge
+
+        if bounds is not None:
+            bounds = np.asarray(bounds, dtype=float)
+            if bounds.shape != (ndim, 2):
+                raise ValueError('bounds must give (min, max) for each parameter')
+            self.__center = bounds.mean(axis=1)
+            self.__scale = (bounds[:, 1] - bounds[:, 0]) / 2
+        else:
+            self.__center = None
+            self.__scale = None
+
+        # Index of the full terms: constant, linear, squared, then cross
+        self.__iu = np.triu_indices(ndim, k=1)
+        nfull = 1 + 2 * ndim + len(self.__iu[0])
+        self.__diagonal = np.arange(1 + 2 * ndim)
+        self.__full = np.arange(nfull)
+
+        if min_points is None:
+            min_points = 2 * len(self.__diagonal)
+        self.min_points = min_points
+
+        self.reset()
+
+    @property
+    def ndim(self) -> int:
+        """int: The number of parameters"""
+        return self.__ndim
+
+    @property
+    def npoints(self) -> int:
+        """int: The number of points added"""
+        return self.__npoints
+
+    @property
+    def terms(self) -> np.ndarray:
+        """numpy.ndarray: The indices of the model terms currently used"""
+        if self.__quadratic == 'full':
+            return self.__full
+        if (self.__quadratic == 'auto'
+            and self.__npoints >= 2 * len(self.__full)):
+            return self.__full
+        return self.__diagonal
+
+    @property
+    def residual(self) -> float:
+        """float: RMS of the out-of-sample log-error residuals, or inf if unknown"""
+        if self.__nresiduals == 0:
+            return np.inf
+        return np.sqrt(self.__sq_residual / self.__nresiduals)
+
+    @property
+    def ready(self) -> bool:
+        """bool: True if enough points have been added to reject points"""
+        return self.__npoints >= self.min_points and self.__nresiduals > 0
+
+    def reset(self):
+        """Removes all points from the model"""
+        nfull = len(self.__full)
+        self.__gram = np.zeros((nfull, nfull))
+        self.__rhs = np.zeros(nfull)
+        self.__npoints = 0
+        self.__sq_residual = 0.0
+        self.__nresiduals = 0
+        self.__points = []
+        self.__logerrors = []
+        self.__overpredictions = []
+        self.__coef = None
+        self.__inverse = None
+        self.__known = {}
+
+    def __features(self, points: npt.ArrayLike) -> np.ndarray:
+        """Builds the full quadratic terms of scaled points"""
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        z = (points - self.__center) / self.__scale
+        return np.hstack([np.ones((len(z), 1)), z, z**2,
+                          z[:, self.__iu[0]] * z[:, self.__iu[1]]])
+
+    def add(self, x: npt.ArrayLike, error: float):
+        """
+        Adds an evaluated point to the model.  Points with non-finite errors
+        are ignored.
+
+        Parameters
+        ----------
+        x : array-like object
+            The parameter values.
+        error : float
+            The full error of the parameters.  Partial errors should not be
+            added as they are only lower bounds.
+        """
+        if not np.isfinite(error):
+            return
+        x = np.asarray(x, dtype=float)
+        self.__known[x.tobytes()] = error
+
+        # Scale the parameters by the first point if no bounds were given
+        if self.__center is None:
+            self.__center = x.copy()
+            self.__scale = np.where(x != 0.0, np.abs(x), 1.0)
+
+        y = np.log(max(error, np.finfo(float).tiny))
+
+        # Track the out-of-sample prediction residual
+        if self.__npoints >= len(self.terms):
+            residual = self.__log_predict(x)[0] - y
+            self.__sq_residual = self.forget * self.__sq_residual + residual**2
+            self.__nresiduals = self.forget * self.__nresiduals + 1
+        else:
+            residual = 0.0
+        self.__points.append(x)
+        self.__logerrors.append(y)
+        self.__overpredictions.append(residual)
+
+        f = self.__features(x)[0]
+        self.__gram *= self.forget
+        self.__rhs *= self.forget
+        self.__gram += np.outer(f, f)
+        self.__rhs += f * y
+        self.__npoints += 1
+        self.__coef = None
+
+    def known(self, x: npt.ArrayLike) -> Optional[float]:
+        """
+        Returns the error of a point if it was already added.
+
+        Parameters
+        ----------
+        x : array-like object
+            The parameter values.
+
+        Returns
+        -------
+        float or None
+            The added error, or None if the point has not been added.
+        """
+        return self.__known.get(np.asarray(x, dtype=float).tobytes())
+
+    def __fit(self):
+        """Solves the normal equations if points were added since the last fit"""
+        terms = self.terms
+        if self.__coef is None or len(self.__coef) != len(terms):
+            gram = self.__gram[np.ix_(terms, terms)]
+            scale = np.trace(gram) / len(terms)
+            gram = gram + self.ridge * scale * np.eye(len(terms))
+            self.__inverse = np.linalg.pinv(gram, hermitian=True)
+            self.__coef = self.__inverse @ self.__rhs[terms]
+        return terms
+
+    def __log_predict(self, points: npt.ArrayLike,
+                      leverage: bool = False) -> np.ndarray:
+        """Predicts the log errors of points and optionally their leverages"""
+        terms = self.__fit()
+        f = self.__features(points)[:, terms]
+        if leverage:
+            return f @ self.__coef, np.einsum('ij,jk,ik->i', f, self.__inverse, f)
+        return f @ self.__coef
+
+    def predict(self, points: npt.ArrayLike) -> np.ndarray:
+        """
+        Predicts the errors of one or more points.
+
+        Parameters
+        ----------
+        points : array-like object
+            The parameter values of one point or an array of points.
+
+        Returns
+        -------
+        numpy.ndarray
+            The predicted errors.
+        """
+        if self.__npoints == 0:
+            raise ValueError('no points have been added')
+        return np.exp(self.__log_predict(points))
+
+    def rank(self, points: npt.ArrayLike) -> np.ndarray:
+        """
+        Ranks candidate points by their predicted errors.
+
+        Parameters
+        ----------
+        points : array-like object
+            An array of candidate parameter values.
+
+        Returns
+        -------
+        numpy.ndarray
+            The indices of the points from lowest to highest predicted error.
+        """
+        return np.argsort(self.__log_predict(points), kind='stable')
+
+    def promising(self, x: npt.ArrayLike, best_error: float) -> bool:
+        """
+        Checks if a point is worth evaluating.
+
+        Parameters
+        ----------
+        x : array-like object
+            The parameter values.
+        best_error : float
+            The best full error found so far.
+
+        Returns
+        -------
+        bool
+            False if the model confidently predicts the error to be above
+            reject_ratio times best_error, otherwise True.  Points predicted
+            to be below best_error are always promising.
+        """
+        if not self.ready:
+            return True
+        prediction, leverage = self.__log_predict(x, leverage=True)
+        if prediction[0] <= np.log(best_error):
+            return True
+
+        # Only trust the model as far as it has over-predicted points that
+        # were actually below the threshold
+        threshold = np.log(self.reject_ratio * best_error)
+        logerrors = np.asarray(self.__logerrors)
+        below = np.flatnonzero(logerrors <= threshold)
+        if len(below) == 0:
+            return True
+        current = self.__log_predict(np.asarray(self.__points)[below]) - logerrors[below]
+        overprediction = max(np.max(current),
+                             np.max(np.asarray(self.__overpredictions)[below]), 0.0)
+
+        # Widen the margin for points far from the evaluated ones
+        margin = self.confidence * overprediction * np.sqrt(1 + leverage[0])
+        return bool(prediction[0] - margin <= threshold)
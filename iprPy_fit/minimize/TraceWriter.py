@@ -0,0 +1,183 @@
+from typing import Optional, Union
+from pathlib import Path
+import json
+import queue
+import threading
+import time
+import warnings
+
+import numpy as np
+
+class TraceWriter():
+    """
+    Appends one JSON line per record to a trace file from a background
+    thread.  Records are put on a bounded queue so the optimizer loop never
+    waits on file I/O.  If the queue is full, the record is dropped and
+    counted instead.  The file is flushed whenever the queue empties, so the
+    trace can be followed live during a fit.
+
+    Records are dicts that may contain numpy arrays and floats.  These are
+    converted to JSON by the writer thread with nan values written as null.
+    Records that fail to be converted or written are skipped and counted as
+    failed, and a warning is issued the first time, so that a bad record or
+    full disk never stops or stalls the fit.
+    """
+    def __init__(self,
+                 path: Union[str, Path],
+                 maxsize: int = 1000,
+                 append: bool = True):
+        """
+        Opens the trace file and starts the writer thread.
+
+        Parameters
+        ----------
+        path : str or Path
+            The trace file.
+        maxsize : int, optional
+            The maximum number of queued records.  Default value is 1000.
+        append : bool, optional
+            If True (default), records are appended to an existing file.
+            If False, the file is overwritten.
+        """
+        self.__path = Path(path)
+        self.__queue = queue.Queue(maxsize)
+        self.__dropped = 0
+        self.__count = 0
+        self.__failed = 0
+        self.__error = None
+        self.__warned = False
+        self.__file = open(self.__path, 'a' if append else 'w', encoding='UTF-8')
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        """Path: The trace file"""
+        return self.__path
+
+    @property
+    def dropped(self) -> int:
+        """int: The number of records dropped because the queue was full"""
+        return self.__dropped
+
+    @property
+    def failed(self) -> int:
+        """int: The number of records that could not be written"""
+        return self.__failed
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """Exception or None: The first error raised while writing a record"""
+        return self.__error
+
+    @property
+    def count(self) -> int:
+        """int: The number of records given to write()"""
+        return self.__count
+
+    def write(self, record: dict):
+        """
+        Queues a record to be written.  A 'time' field with the current
+        time stamp is added if not given.
+
+        Parameters
+        ----------
+        record : dict
+            The record to write.
+        """
+        if self.__file is None:
+            raise ValueError('TraceWriter is closed')
+        self.__warn()
+        record.setdefault('time', time.time())
+        self.__count += 1
+        try:
+            self.__queue.put_nowait(record)
+        except queue.Full:
+            self.__dropped += 1
+
+    def close(self):
+        """Writes the remaining queued records and closes the file"""
+        if self.__file is None:
+            return
+
+        # Never wait on a queue that a stopped thread no longer drains
+        while self.__thread.is_alive():
+            try:
+                self.__queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.__thread.join()
+        self.__file.close()
+        self.__file = None
+        self.__warn()
+
+    def __warn(self):
+        """Warns once if the writer thread failed to write a record"""
+        if self.__error is not None and not self.__warned:
+            self.__warned = True
+            warnings.warn(f'failed to write trace records to {self.__path}: {self.__error!r}')
+
+    def __run(self):
+        """Writer thread loop"""
+        while True:
+            record = self.__queue.get()
+            if record is None:
+                break
+            try:
+                self.__file.write(json.dumps(_jsonable(record)) + '\n')
+                if self.__queue.empty():
+                    self.__file.flush()
+            except Exception as err:
+                # Keep draining the queue so that writers never block
+                self.__failed += 1
+                if self.__error is None:
+                    self.__error = err
+        try:
+            self.__file.flush()
+        except Exception as err:
+            if self.__error is None:
+                self.__error = err
+
+    @staticmethod
+    def read(path: Union[str, Path]) -> list:
+        """
+        Reads all records from a trace file.
+
+        Parameters
+        ----------
+        path : str or Path
+            The trace file.
+
+        Returns
+        -------
+        list of dict
+            The records.
+        """
+        records = []
+        with open(path, encoding='UTF-8') as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+        return records
+
+def _jsonable(value):
+    """Converts numpy values and nan to JSON compatible values"""
+    if isinstance(value, dict):
+        return {key: _jsonable(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return None if np.isnan(value) else value
+    return value
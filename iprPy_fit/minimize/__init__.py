@@ -1,5 +1,22 @@
 from .errorfxn import errorfxn
+from .PartialError import PartialError
+from .structure_error import structure_error
+from .structure_importance import structure_importance
+from .abort_order import abort_order
+from .ErrorAccumulator import ErrorAccumulator
+from .ParameterTransform import ParameterTransform
+from .TraceWriter import TraceWriter
+from .Surrogate import Surrogate
 from .minfxn import minfxn
+from .multistart import multistart
+from .morris_sensitivity import morris_sensitivity
 from .minimize import minimize
+from .select_batch import select_batch
+from .minimize_batch import minimize_batch
+from .sweep import sweep
 
-__all__ = ['errorfxn', 'minfxn', 'minimize']
\ No newline at end of file
+__all__ = ['errorfxn', 'PartialError', 'structure_error',
+           'structure_importance', 'abort_order', 'ErrorAccumulator',
+           'ParameterTransform', 'TraceWriter', 'Surrogate', 'minfxn',
+           'multistart', 'morris_sensitivity', 'minimize', 'select_batch',
+           'minimize_batch', 'sweep']
\ No newline at end of file
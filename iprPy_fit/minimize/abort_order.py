@@ -0,0 +1,27 @@
+import numpy as np
+import numpy.typing as npt
+
+def abort_order(costs: npt.ArrayLike,
+                importance: npt.ArrayLike) -> np.ndarray:
+    """
+    Orders structures for early-abort evaluations so that the structures
+    that contribute the most error per unit cost are evaluated first.
+
+    Parameters
+    ----------
+    costs : array-like object
+        The cost of evaluating each structure.
+    importance : array-like object
+        The importance of each structure, as from structure_importance().
+
+    Returns
+    -------
+    numpy.ndarray
+        The structure indices in evaluation order.  Structures with zero
+        importance are last.
+    """
+    costs = np.asarray(costs, dtype=float)
+    importance = np.asarray(importance, dtype=float)
+    with np.errstate(divide='ignore'):
+        ratio = np.where(importance > 0, costs / importance, np.inf)
+    return np.argsort(ratio, kind='stable')
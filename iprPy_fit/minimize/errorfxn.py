@@ -22,7 +22,7 @@ def errorfxn(values, ref_values, weights):
 
         if weight is None:
             continue
-        if isinstance(weight, float) and (np.isnan(weight) or weight <= 0.0):
+        if np.ndim(weight) == 0 and (np.isnan(weight) or weight <= 0.0):
             continue
         
         value = values[key]
@@ -1,5 +1,16 @@
-from ..evaluate import evaluate
-from . import errorfxn
+from pathlib import Path
+from typing import Optional
+import time
+
+import numpy as np
+import numpy.typing as npt
+
+from ..evaluate import (evaluate, iter_evaluate, EvaluationPlan, EvaluationError,
+                        IsolatedEvaluator)
+from ..lammps import SystemCache
+from ..parambuilder import ParameterMap, Constraints, InfeasibleParameters
+from . import (errorfxn, ErrorAccumulator, PartialError, ParameterTransform,
+               TraceWriter)
 
 def minfxn(params,
            paramnames,
@@ -14,7 +25,17 @@ def minfxn(params,
            potential = None,
            paramsets = None,
            include_velocities: bool = False,
-           units: str = 'metal'
+           units: str = 'metal',
+           reduction: Optional[dict] = None,
+           parammap: Optional[ParameterMap] = None,
+           transform: Optional[ParameterTransform] = None,
+           error_ceiling: Optional[float] = None,
+           order: Optional[npt.ArrayLike] = None,
+           buffers: Optional[dict] = None,
+           cache: Optional[SystemCache] = None,
+           trace: Optional[TraceWriter] = None,
+           plan: Optional[EvaluationPlan] = None,
+           constraints: Optional[Constraints] = None
 
            ) -> float:
     """
@@ -25,7 +46,8 @@ def minfxn(params,
     params : list
         The values for the parameters being manipulated by the minimization.
     paramnames : list
-        The names associated with the parameters.
+        The names associated with the parameters.  If parammap is given,
+        these are the free parameter names.
     parambuilder
         The parameter file builder.
     paramfilename : str
@@ -35,7 +57,9 @@ def minfxn(params,
     weights : dict
         Weights to use for error calculation.
     lmp : 
-        The LAMMPS executable or library object to use.
+        The LAMMPS executable, library object or evaluator to use.  If an
+        IsolatedEvaluator, crashed or timed out evaluations and non-finite
+        errors return its penalty error.
     
     scripts
         The LAMMPS script to run.
@@ -44,24 +68,161 @@ def minfxn(params,
     paramsets
     include_velocities
     units
-    
+    reduction : dict, optional
+        The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+        the given paramsets are a reduced set.
+    parammap : ParameterMap, optional
+        If given, params are the free parameter values which are expanded
+        into the full parameter values.
+    transform : ParameterTransform, optional
+        If given, params are in the transform's internal space and are
+        transformed back before use.
+    error_ceiling : float, optional
+        If given, evaluation stops once the running error exceeds the
+        ceiling, in which case a PartialError lower bound is returned.  Not
+        supported for LAMMPS executables.
+    order : array-like object, optional
+        The order in which to evaluate the structures.  See abort_order().
+    buffers : dict, optional
+        Force arrays to reuse between calls.  See iter_evaluate().
+    cache : SystemCache, optional
+        Reuses the LAMMPS setup parameters of systems between calls.
+    trace : TraceWriter, optional
+        If given, a record of the evaluation is written with the parameter
+        values, the total, per-key and per-structure errors, and the time
+        spent updating the parameter file and evaluating.
+    plan : EvaluationPlan, optional
+        If given, only the values needed by the plan are computed.  See
+        EvaluationPlan.from_weights().
+    constraints : Constraints, optional
+        If given, the parameters are checked against the constraints before
+        the parameter file is written.  Infeasible parameters are either
+        projected to feasible ones or given the constraint penalty error
+        without being evaluated.
+
+    Returns
+    -------
+    float
+        The error.  Parameters that the parammap or parambuilder reject as
+        InfeasibleParameters are not evaluated and get the penalty of the
+        constraints if given, else the penalty of an IsolatedEvaluator lmp,
+        else inf.
     """
+    if reduction is not None and plan is not None and plan.force_atoms is not None:
+        raise ValueError('sampled forces cannot be used with reduced paramsets')
 
-    # Match variable parameters to parameter names
-    kwargs = {}
-    for p, n, in zip(params, paramnames):
-        kwargs[n] = p
+    # Transform from the optimizer's internal space
+    if transform is not None:
+        params = transform.to_external(params)
+
+    # Expand free parameters to the full parameters
+    start = time.perf_counter()
+    if parammap is not None:
+        paramnames = parammap.names
+        try:
+            params = parammap.expand(params)
+        except InfeasibleParameters:
+            error = _infeasible_error(lmp, constraints)
+            if trace is not None:
+                _trace(trace, np.full(len(paramnames), np.nan), error, None,
+                       time.perf_counter() - start, 0.0)
+            return error
+
+    # Update parameter values
+    parambuilder.update_parameter_array(paramnames, params)
+
+    # Handle infeasible parameters before writing the file
+    if constraints is not None:
+        violation = constraints.violation(parambuilder)
+        if violation > 0.0 and constraints.mode == 'project':
+            violation = constraints.project(parambuilder, paramnames)
+            params = parambuilder.get_parameter_values(paramnames)
+        if violation > 0.0:
+            error = constraints.penalty * (1.0 + violation)
+            if trace is not None:
+                _trace(trace, params, error, None, time.perf_counter() - start, 0.0)
+            return error
 
     # Update parameter file
-    parambuilder.update_parameter_values(**kwargs)
-    parambuilder.save_paramfile(paramfilename)
+    try:
+        parambuilder.save_paramfile(paramfilename)
+    except InfeasibleParameters:
+        error = _infeasible_error(lmp, constraints)
+        if trace is not None:
+            _trace(trace, params, error, None, time.perf_counter() - start, 0.0)
+        return error
+    update_time = time.perf_counter() - start
     
-    # Build and run LAMMPS simulation to evaluate the current potential
-    values = evaluate(lmp=lmp, scripts=scripts, systems=systems,
-                      potential=potential, paramsets=paramsets,
-                      include_velocities=include_velocities, units=units)
+    # LAMMPS executables evaluate all structures at once
+    if isinstance(lmp, (str, Path)):
+        if error_ceiling is not None:
+            raise ValueError('error_ceiling cannot be used with a LAMMPS executable')
+        start = time.perf_counter()
+        values = evaluate(lmp=lmp, scripts=scripts, systems=systems,
+                          potential=potential, paramsets=paramsets,
+                          include_velocities=include_velocities, units=units,
+                          reduction=reduction, plan=plan)
+        evaluate_time = time.perf_counter() - start
+
+        # Evaluate the error
+        error = errorfxn(values, ref_values, weights)
+
+        if trace is not None:
+            accumulator = ErrorAccumulator(ref_values, weights)
+            for i in range(len(accumulator.errors)):
+                accumulator.add(i, {key: values[key][i] for key in weights})
+            _trace(trace, params, error, accumulator, update_time, evaluate_time)
+
+        return error
+
+    # Accumulate the error as each structure is evaluated
+    start = time.perf_counter()
+    accumulator = ErrorAccumulator(ref_values, weights, reduction=reduction)
+    evaluations = iter_evaluate(lmp=lmp, scripts=scripts, systems=systems,
+                                potential=potential, paramsets=paramsets,
+                                include_velocities=include_velocities,
+                                order=order, buffers=buffers,
+                                cache=cache, plan=plan)
+    try:
+        for i, rawresult in evaluations:
+            error = accumulator.add(i, rawresult)
+
+            # Stop once the partial error exceeds the ceiling
+            if error_ceiling is not None and error > error_ceiling:
+                evaluations.close()
+                error = PartialError(error)
+                break
+        else:
+            error = accumulator.error
+    except EvaluationError:
+        if not isinstance(lmp, IsolatedEvaluator):
+            raise
+        error = lmp.penalty
+    evaluate_time = time.perf_counter() - start
+
+    # Replace non-finite errors of isolated evaluations with the penalty
+    if isinstance(lmp, IsolatedEvaluator) and not np.isfinite(error):
+        error = lmp.penalty
+
+    if trace is not None:
+        _trace(trace, params, error, accumulator, update_time, evaluate_time)
+
+    return error
 
-    # Evaluate the error
-    error = errorfxn(values, ref_values, weights)
+def _infeasible_error(lmp, constraints) -> float:
+    """Gets the error of parameters that cannot be evaluated"""
+    if constraints is not None:
+        return constraints.penalty
+    if isinstance(lmp, IsolatedEvaluator):
+        return lmp.penalty
+    return np.inf
 
-    return error
\ No newline at end of file
+def _trace(trace, params, error, accumulator, update_time, evaluate_time):
+    """Writes the trace record of an evaluation"""
+    # Infeasible parameters are not evaluated and have no accumulator
+    trace.write({'params': np.array(params, dtype=float),
+                 'error': float(error),
+                 'partial': isinstance(error, PartialError),
+                 'key_errors': None if accumulator is None else accumulator.key_errors,
+                 'structure_errors': None if accumulator is None else accumulator.errors,
+                 'timings': {'update': update_time, 'evaluate': evaluate_time}})
\ No newline at end of file
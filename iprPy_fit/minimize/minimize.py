@@ -1,10 +1,19 @@
 from pathlib import Path
+from typing import Optional, Union
+import warnings
 
 from functools import partial
+from collections import deque
+
+import numpy as np
 
 import scipy.optimize
 
-from . import minfxn
+from ..parambuilder import ParameterMap, Constraints
+from ..lammps import SystemCache
+from ..evaluate import EvaluationPlan, IsolatedEvaluator
+from . import (minfxn, ParameterTransform, PartialError, Surrogate,
+               TraceWriter, multistart, structure_importance, abort_order)
 
 
 def minimize(parambuilder,
@@ -20,6 +29,20 @@ def minimize(parambuilder,
              paramsets = None,
              include_velocities: bool = False,
              units: str = 'metal',
+             reduction: Optional[dict] = None,
+             transform: Union[str, ParameterTransform, None] = None,
+             abort_ratio: Optional[float] = None,
+             surrogate: Union[bool, Surrogate, None] = None,
+             trace: Union[str, Path, TraceWriter, None] = None,
+             constraints: Optional[Constraints] = None,
+             buffers: Optional[dict] = None,
+             cache: Optional[SystemCache] = None,
+
+             n_starts: Optional[int] = None,
+             workers: Optional[int] = None,
+             abort_after: int = 100,
+             sampler: str = 'sobol',
+             seed: Optional[int] = None,
 
              min_method='Nelder-Mead',
              min_options=None,
@@ -32,15 +55,20 @@ def minimize(parambuilder,
         A iprPy_fit parambuilder object
     paramfilename : Path
         The location where the parameter file is to be found.
-    params : list or dict
+    params : list, dict or ParameterMap
         The names of the parameters to fit.  If dict, then keys are the names
-        and values are the fitting bounds.
+        and values are the fitting bounds.  If ParameterMap, then only its
+        free parameters are fit and the returned values are for all of the
+        parameters set by the map.
     ref_values : dict
         reference values to compare to.
     weights : dict
         Weights to use for error calculation.
     lmp : 
-        The LAMMPS executable or library object to use.
+        The LAMMPS executable, library object or evaluator to use.  Give an
+        IsolatedEvaluator to run each evaluation in a supervised worker
+        process, so that trial parameters that crash or hang LAMMPS get its
+        penalty error rather than ending the fit.
     
     scripts
         The LAMMPS script to run.
@@ -49,20 +77,133 @@ def minimize(parambuilder,
     paramsets
     include_velocities
     units
-    
+    reduction : dict, optional
+        The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+        the given paramsets are a reduced set.
+    transform : str or ParameterTransform, optional
+        If given, the optimizer works in a transformed parameter space built
+        from the bounds: 'affine', 'log', 'logit' or 'auto' (see
+        ParameterTransform).  For Nelder-Mead, the initial simplex is also
+        derived from the bounds unless min_options gives one.
+    abort_ratio : float, optional
+        If given, each trial evaluation stops once its running error exceeds
+        abort_ratio times the best error so far and returns a PartialError
+        lower bound.  The ceiling is never below the largest of the last
+        nparams + 1 full errors, which approximate the current simplex
+        vertices, so that a lower bound cannot appear better than a vertex
+        that the full error would not beat.  Partial, penalty and surrogate
+        predicted errors are not counted.  Structures are evaluated in
+        abort_order() with costs based on the number of atoms.  Must be at
+        least 1.  Requires a lammps.lammps lmp.  With n_starts, it is
+        instead the ratio to the shared best error above which a start is
+        abandoned, and None never abandons starts.
+    surrogate : bool or Surrogate, optional
+        If given, a Surrogate response surface is trained on the evaluated
+        points and trial points that it confidently predicts to be far worse
+        than the best error so far are not evaluated.  The predicted error is
+        returned to the optimizer instead, and points that were already
+        evaluated return their known error.  True uses a Surrogate with
+        default settings.  Intended for methods that only compare error
+        values, such as Nelder-Mead, as the predicted errors can mislead
+        line searches.  Not used with n_starts.
+    trace : str, Path or TraceWriter, optional
+        If given, a record of every evaluation is appended to this JSON
+        lines trace file by a background thread.  The first record written
+        gives the 'paramnames' of the 'params' in the evaluation records.
+        A TraceWriter that is given is left open.  Not used with n_starts.
+    constraints : Constraints, optional
+        If given, trial parameters are checked against the constraints
+        before the parameter file is written, such as those built by
+        TersoffModC.constraints().  Infeasible parameters are projected or
+        given a penalty error without running LAMMPS.  See minfxn().  The
+        returned parameters are projected if the mode is 'project'.
+    buffers : dict, optional
+        The force output buffers to reuse, see evaluate().  Give the same
+        dict to multiple fits of the same structures to share it.  Default
+        uses a new dict.
+    cache : SystemCache, optional
+        The SystemCache to use when evaluating systems.  Default uses a new
+        SystemCache.
+    n_starts : int, optional
+        If given, this many independent minimizations are run in parallel
+        from quasi-random starting points inside the bounds and the best
+        result is kept.  See multistart().  lmp is not used as each worker
+        creates its own LAMMPS library object, and scripts, surrogate,
+        trace, buffers and cache cannot be given.
+    workers : int, optional
+        The number of worker processes for n_starts.  Default value is the
+        smaller of n_starts and the number of CPUs.
+    abort_after : int, optional
+        The number of evaluations a start gets before it can be abandoned
+        with n_starts.  Default value is 100.
+    sampler : str, optional
+        The starting point sampler for n_starts: 'sobol' (default) or 'lhs'.
+    seed : int, optional
+        Random seed that makes the n_starts starting points reproducible.
+    min_method : str, optional
+        The scipy.optimize.minimize method to use.  Default value is
+        'Nelder-Mead'.
+    min_options : dict, optional
+        Options to pass to scipy.optimize.minimize.
     """
+    if abort_ratio is not None and abort_ratio < 1.0:
+        raise ValueError('abort_ratio must be at least 1')
+
+    # Run parallel minimizations from multiple starting points
+    if n_starts is not None:
+        if surrogate is not None:
+            raise ValueError('surrogate cannot be used with n_starts')
+        if trace is not None:
+            raise ValueError('trace cannot be used with n_starts')
+        if buffers is not None:
+            raise ValueError('buffers cannot be used with n_starts')
+        if cache is not None:
+            raise ValueError('cache cannot be used with n_starts')
+        if scripts is not None:
+            raise ValueError('n_starts requires systems + potential or paramsets')
+        return multistart(parambuilder, paramfilename, params, ref_values,
+                          weights, n_starts, workers=workers, systems=systems,
+                          potential=potential, paramsets=paramsets,
+                          include_velocities=include_velocities, units=units,
+                          reduction=reduction, transform=transform,
+                          constraints=constraints, sampler=sampler, seed=seed,
+                          abort_ratio=abort_ratio, abort_after=abort_after,
+                          min_method=min_method, min_options=min_options)
+
     # split params and bounds if needed
+    parammap = None
     if isinstance(params, list):
         paramnames = params
         bounds = None
     elif isinstance(params, dict):
         paramnames = list(params.keys())
         bounds = list(params.values())
+    elif isinstance(params, ParameterMap):
+        parammap = params
+        paramnames = parammap.free_names
+        bounds = parammap.bounds
     else:
-        raise TypeError('params must be list or dict')
+        raise TypeError('params must be list, dict or ParameterMap')
     
     # Get initial parameter values associated with paramnames
-    init_params = parambuilder.get_parameter_values(paramnames)
+    if parammap is None:
+        init_params = parambuilder.get_parameter_values(paramnames)
+    else:
+        init_params = parammap.initial_values(parambuilder)
+
+    # Set up the optimizer's internal parameter space
+    options = {}
+    if min_options is not None:
+        options.update(min_options)
+    if transform is not None:
+        if not isinstance(transform, ParameterTransform):
+            if bounds is None:
+                raise ValueError('params must give bounds to use transform')
+            transform = ParameterTransform(bounds, transform)
+        if min_method == 'Nelder-Mead' and 'initial_simplex' not in options:
+            options['initial_simplex'] = transform.initial_simplex(init_params)
+        init_params = transform.to_internal(init_params)
+        bounds = transform.bounds
 
     # Define partial function for minimization to set kwargs
     constant_kwargs = dict(
@@ -78,22 +219,136 @@ def minimize(parambuilder,
         potential = potential,
         paramsets = paramsets,
         include_velocities = include_velocities,
-        units = units)
+        units = units,
+        reduction = reduction,
+        parammap = parammap,
+        transform = transform,
+        buffers = {} if buffers is None else buffers,
+        cache = SystemCache() if cache is None else cache,
+        plan = EvaluationPlan.from_weights(weights, ref_values),
+        constraints = constraints)
+
+    # Open the trace and record the names of the traced parameter values
+    close_trace = False
+    if trace is not None:
+        if not isinstance(trace, TraceWriter):
+            trace = TraceWriter(trace)
+            close_trace = True
+        tracenames = paramnames if parammap is None else parammap.names
+        trace.write({'paramnames': list(tracenames)})
+    constant_kwargs['trace'] = trace
     partialminfxn = partial(minfxn, **constant_kwargs)
 
-    # Initial run to check error
-    init_error = partialminfxn(init_params)
-    print('Initial error is', init_error) 
+    try:
+        # Initial run to check error
+        init_error = partialminfxn(init_params)
+        print('Initial error is', init_error) 
+
+        # Build the surrogate in the optimizer's parameter space
+        if surrogate is True:
+            if bounds is not None and any(None in tuple(b) for b in bounds):
+                surrogate = Surrogate(len(init_params))
+            else:
+                surrogate = Surrogate(len(init_params), bounds=bounds)
+        elif surrogate is False:
+            surrogate = None
+        if surrogate is not None:
+            if min_method != 'Nelder-Mead':
+                warnings.warn('surrogate predictions can mislead line search methods')
+            surrogate.add(init_params, init_error)
 
-    # Run minimization
-    results = scipy.optimize.minimize(partialminfxn, init_params, method=min_method, 
-                                      options=min_options, bounds=bounds)
+        # Skip or stop trial evaluations that are far worse than the best so far
+        fxn = partialminfxn
+        counts = dict(evaluated=0, skipped=0)
+        if abort_ratio is not None or surrogate is not None:
+            order = None
+            if abort_ratio is not None:
+                order = _abort_order(ref_values, weights, scripts, systems,
+                                     paramsets, reduction)
+            best = dict(error=init_error)
+
+            # Recent full errors stand in for the current simplex vertices
+            recent = deque([init_error], maxlen=len(init_params) + 1)
+            def penalized(error):
+                if not np.isfinite(error):
+                    return True
+                if constraints is not None and error >= constraints.penalty:
+                    return True
+                return isinstance(lmp, IsolatedEvaluator) and error == lmp.penalty
+            def fxn(x):
+                if surrogate is not None:
+                    error = surrogate.known(x)
+                    if error is not None:
+                        counts['skipped'] += 1
+                        recent.append(error)
+                        return error
+                    if not surrogate.promising(x, best['error']):
+                        counts['skipped'] += 1
+                        return float(surrogate.predict(x)[0])
+
+                counts['evaluated'] += 1
+                if abort_ratio is not None:
+                    ceiling = max(abort_ratio * best['error'], max(recent))
+                    error = partialminfxn(x, error_ceiling=ceiling, order=order)
+                else:
+                    error = partialminfxn(x)
+
+                if not isinstance(error, PartialError) and not penalized(error):
+                    # Penalty errors of failed evaluations would skew the model
+                    if surrogate is not None:
+                        surrogate.add(x, error)
+                    if error < best['error']:
+                        best['error'] = error
+                    recent.append(error)
+                return error
+
+        # Run minimization
+        results = scipy.optimize.minimize(fxn, init_params, method=min_method, 
+                                          options=options, bounds=bounds)
+    finally:
+        if close_trace:
+            trace.close()
 
     print('Final error is', results.fun)
+    if isinstance(lmp, IsolatedEvaluator):
+        print('LAMMPS worker failed', lmp.failures, 'times')
+    if surrogate is not None:
+        print('Surrogate skipped', counts['skipped'], 'of',
+              counts['skipped'] + counts['evaluated'], 'evaluations')
 
     # Check final values
+    final_values = results.x
+    if transform is not None:
+        final_values = transform.to_external(final_values)
+    if parammap is not None:
+        paramnames = parammap.names
+        final_values = parammap.expand(final_values)
+    if constraints is not None and constraints.mode == 'project':
+        parambuilder.update_parameter_array(paramnames, final_values)
+        constraints.project(parambuilder, paramnames)
+        final_values = parambuilder.get_parameter_values(paramnames)
     final_params = {}
-    for key, value in zip(paramnames, results.x):
+    for key, value in zip(paramnames, final_values):
         final_params[key] = float(value)
     
-    return final_params
\ No newline at end of file
+    return final_params
+
+def _abort_order(ref_values, weights, scripts, systems, paramsets, reduction):
+    """Orders the evaluated structures for early-abort evaluations"""
+    if paramsets is not None:
+        costs = [len(p['atype']) for p in paramsets]
+    elif systems is not None:
+        costs = [system.natoms for system in systems]
+    elif scripts is not None:
+        costs = [1 for script in scripts]
+    else:
+        raise ValueError('scripts, systems + potential or paramsets must be given')
+
+    # Importance is for the original structures if reduced
+    if reduction is None:
+        importance = structure_importance(ref_values, weights, len(costs))
+    else:
+        importance = structure_importance(ref_values, weights, len(reduction['index']))
+        importance = np.bincount(reduction['index'], importance, minlength=len(costs))
+
+    return abort_order(costs, importance)
@@ -0,0 +1,277 @@
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+import scipy.optimize
+
+from ..parambuilder import ParameterMap, Constraints
+from ..lammps import SystemCache
+from ..evaluate import EvaluationPlan, PoolEvaluator, IsolatedEvaluator
+from . import minfxn, select_batch, structure_importance
+
+
+def minimize_batch(parambuilder,
+                   paramfilename: Path,
+                   params,
+                   ref_values,
+                   weights,
+
+                   lmp = None,
+                   scripts = None,
+                   systems = None,
+                   potential = None,
+                   paramsets = None,
+                   include_velocities: bool = False,
+                   units: str = 'metal',
+                   constraints: Optional[Constraints] = None,
+
+                   batch_budget: Optional[float] = None,
+                   batch_costs: Optional[npt.ArrayLike] = None,
+                   seed: Optional[int] = None,
+                   checkpoint_iter: int = 20,
+                   n_checkpoints: int = 10,
+                   n_inclusion_draws: int = 2000,
+
+                   min_method='Nelder-Mead',
+                   min_options=None,
+                   ):
+    """
+    Stochastic mini-batch variation of minimize().  The optimizer only
+    evaluates a weighted random subset of the reference structures whose
+    total cost fits within a budget.  The subset is drawn at the start of
+    each segment of checkpoint_iter optimizer steps and held fixed within
+    it, so the optimizer always compares values of the same objective.  The
+    full reference set is evaluated at the checkpoint ending each segment:
+    the new parameters are accepted if they lower the full error, otherwise
+    the next segment restarts from the best parameters found so far.
+
+    The error of each sampled structure is divided by its probability of
+    being included in a batch (Horvitz-Thompson weighting), so the batch
+    error is an unbiased estimate of the full error.  The inclusion
+    probabilities are estimated once by repeating the batch selection.
+
+    Parameters
+    ----------
+    parambuilder
+        A iprPy_fit parambuilder object
+    paramfilename : Path
+        The location where the parameter file is to be found.
+    params : list, dict or ParameterMap
+        The names of the parameters to fit.  If dict, then keys are the names
+        and values are the fitting bounds.  If ParameterMap, then only its
+        free parameters are fit and the returned values are for all of the
+        parameters set by the map.
+    ref_values : dict
+        reference values to compare to.
+    weights : dict
+        Weights to use for error calculation.  Structures are sampled with
+        probabilities proportional to the sum of their inverse squared
+        weights, so structures with only zero weights are never sampled.
+    lmp :
+        The LAMMPS library object, ThreadEvaluator or HybridEvaluator to use.
+        LAMMPS executables are not supported as the batch weights are per
+        structure, and PoolEvaluators and IsolatedEvaluators are not
+        supported as they only evaluate the full set of paramsets that
+        they were loaded with.
+
+    scripts
+        The LAMMPS script to run.
+    systems
+    potential
+    paramsets
+    include_velocities
+    units
+    constraints : Constraints, optional
+        If given, trial parameters are checked against the constraints
+        before the parameter file is written, such as those built by
+        TersoffModC.constraints().  Infeasible parameters are projected or
+        given a penalty error without running LAMMPS.  See minfxn().
+    batch_budget : float, optional
+        The maximum total cost of the structures in each batch.  Default
+        value is a quarter of the total cost of all structures.
+    batch_costs : array-like object, optional
+        The cost of evaluating each structure.  Default values are the
+        number of atoms in each of the systems or paramsets, or 1 for each
+        of the scripts.
+    seed : int, optional
+        Random seed that makes the batch selections reproducible.
+    checkpoint_iter : int, optional
+        The number of optimizer steps between full evaluations.  Default
+        value is 20.
+    n_checkpoints : int, optional
+        The number of full evaluation checkpoints to perform.  Default value
+        is 10.
+    n_inclusion_draws : int, optional
+        The number of batch selections used to estimate the inclusion
+        probabilities of the structures.  Default value is 2000.
+    min_method : str, optional
+        The scipy.optimize.minimize method to use.  Default value is
+        'Nelder-Mead'.
+    min_options : dict, optional
+        Options to pass to scipy.optimize.minimize.  Any maxiter value is
+        replaced by checkpoint_iter.
+    """
+    if isinstance(lmp, (str, Path)):
+        raise ValueError('minimize_batch does not support LAMMPS executables')
+    if isinstance(lmp, (PoolEvaluator, IsolatedEvaluator)):
+        raise ValueError('minimize_batch does not support PoolEvaluator or IsolatedEvaluator')
+
+    # split params and bounds if needed
+    parammap = None
+    if isinstance(params, list):
+        paramnames = params
+        bounds = None
+    elif isinstance(params, dict):
+        paramnames = list(params.keys())
+        bounds = list(params.values())
+    elif isinstance(params, ParameterMap):
+        parammap = params
+        paramnames = parammap.free_names
+        bounds = parammap.bounds
+    else:
+        raise TypeError('params must be list, dict or ParameterMap')
+
+    # Identify the structures and their costs
+    if paramsets is not None:
+        structures = paramsets
+        default_costs = [len(p['atype']) for p in paramsets]
+    elif systems is not None:
+        structures = systems
+        default_costs = [system.natoms for system in systems]
+    elif scripts is not None:
+        structures = scripts
+        default_costs = [1 for script in scripts]
+    else:
+        raise ValueError('scripts, systems + potential or paramsets must be given')
+    nsims = len(structures)
+    if batch_costs is None:
+        batch_costs = default_costs
+    batch_costs = np.asarray(batch_costs, dtype=float)
+    if batch_budget is None:
+        batch_budget = batch_costs.sum() / 4
+    importance = structure_importance(ref_values, weights, nsims)
+    rng = np.random.default_rng(seed)
+    inclusion = _inclusion_probabilities(batch_costs, importance, batch_budget,
+                                         n_inclusion_draws, rng)
+
+    # Set constant minfxn kwargs
+    constant_kwargs = dict(
+        paramnames = paramnames,
+        parambuilder = parambuilder,
+        paramfilename = paramfilename,
+        lmp = lmp,
+        potential = potential,
+        include_velocities = include_velocities,
+        units = units,
+        parammap = parammap,
+        buffers = {},
+        cache = SystemCache(),
+        constraints = constraints)
+
+    full_plan = EvaluationPlan.from_weights(weights, ref_values)
+    def fullfxn(x):
+        return minfxn(x, ref_values=ref_values, weights=weights,
+                      scripts=scripts, systems=systems, paramsets=paramsets,
+                      plan=full_plan, **constant_kwargs)
+
+    # Batch selection is stored in a dict and redrawn for each segment
+    batch = {}
+    def draw_batch():
+        index = select_batch(batch_costs, importance, batch_budget, rng)
+        batch['kwargs'] = dict(
+            ref_values = _subset(ref_values, index, nsims),
+            weights = _inclusion_weights(weights, index, inclusion, nsims),
+            scripts = _subset(scripts, index, nsims),
+            systems = _subset(systems, index, nsims),
+            paramsets = _subset(paramsets, index, nsims))
+        batch['kwargs']['plan'] = EvaluationPlan.from_weights(batch['kwargs']['weights'],
+                                                              batch['kwargs']['ref_values'])
+
+    def batchfxn(x):
+        return minfxn(x, **batch['kwargs'], **constant_kwargs)
+
+    # Initial run to check error
+    if parammap is None:
+        best_params = np.asarray(parambuilder.get_parameter_values(paramnames), dtype=float)
+    else:
+        best_params = parammap.initial_values(parambuilder)
+    best_error = fullfxn(best_params)
+    print('Initial error is', best_error)
+
+    options = {}
+    if min_options is not None:
+        options.update(min_options)
+    options['maxiter'] = checkpoint_iter
+
+    # Run minimization segments between checkpoints
+    for i in range(n_checkpoints):
+        draw_batch()
+        results = scipy.optimize.minimize(batchfxn, best_params, method=min_method,
+                                          options=options, bounds=bounds)
+        error = fullfxn(results.x)
+        if error < best_error:
+            best_error = error
+            best_params = results.x
+            print(f'Checkpoint {i+1}: error {error} accepted')
+        else:
+            print(f'Checkpoint {i+1}: error {error} rejected')
+
+    # Reset the parameter file to the best parameters
+    if parammap is not None:
+        paramnames = parammap.names
+        best_params = parammap.expand(best_params)
+    parambuilder.update_parameter_array(paramnames, best_params)
+    if constraints is not None and constraints.mode == 'project':
+        constraints.project(parambuilder, paramnames)
+        best_params = parambuilder.get_parameter_values(paramnames)
+    parambuilder.save_paramfile(paramfilename)
+    print('Final error is', best_error)
+
+    # Check final values
+    final_params = {}
+    for key, value in zip(paramnames, best_params):
+        final_params[key] = float(value)
+
+    return final_params
+
+def _inclusion_probabilities(costs, importance, budget, ndraws, rng) -> np.ndarray:
+    """Estimates the probability of each structure being selected by select_batch()"""
+    counts = np.zeros(len(costs))
+    for i in range(ndraws):
+        counts[select_batch(costs, importance, budget, rng)] += 1
+
+    # Structures that can be selected get at least one count
+    counts[(importance > 0) & (counts == 0)] = 1
+    return counts / ndraws
+
+def _inclusion_weights(weights: dict, index: np.ndarray, inclusion: np.ndarray,
+                       nsims: int) -> dict:
+    """
+    Builds per-structure batch weights that divide each structure's error
+    by its inclusion probability, as errors scale with 1 / weight^2.
+    """
+    scale = np.sqrt(inclusion[index])
+    batch_weights = {}
+    for key, weight in weights.items():
+        if weight is None:
+            batch_weights[key] = None
+            continue
+        if np.ndim(weight) == 0:
+            weight = [weight for i in range(nsims)]
+        batch_weights[key] = [None if weight[i] is None else weight[i] * s
+                              for i, s in zip(index, scale)]
+    return batch_weights
+
+def _subset(values, index: np.ndarray, nsims: int):
+    """Selects the index entries of per-structure lists, arrays and dicts"""
+    if values is None:
+        return None
+    if isinstance(values, dict):
+        return {key: _subset(value, index, nsims) for key, value in values.items()}
+    if isinstance(values, np.ndarray) and values.ndim > 0 and len(values) == nsims:
+        return values[index]
+    if isinstance(values, list) and len(values) == nsims:
+        return [values[i] for i in index]
+    return values
@@ -0,0 +1,264 @@
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from ..evaluate import evaluate, EvaluationPlan, EvaluationError
+from ..parambuilder import ParameterMap, Constraints, InfeasibleParameters
+from . import structure_error, ParameterTransform
+
+def morris_sensitivity(parambuilder,
+                       paramfilename: Path,
+                       params: Union[dict, ParameterMap],
+                       ref_values: dict,
+                       weights: dict,
+                       n_trajectories: int = 10,
+                       levels: int = 4,
+                       threshold: float = 0.05,
+
+                       lmp = None,
+                       scripts = None,
+                       systems = None,
+                       potential = None,
+                       paramsets = None,
+                       include_velocities: bool = False,
+                       units: str = 'metal',
+                       reduction: Optional[dict] = None,
+                       transform: Union[str, ParameterTransform] = 'auto',
+                       constraints: Optional[Constraints] = None,
+                       max_resample: int = 100,
+                       seed: Optional[int] = None) -> dict:
+    """
+    Morris elementary effects screening of how much each fitting parameter
+    affects each error term.  Each trajectory starts at a random point of a
+    grid over the parameter bounds and changes one parameter at a time, so
+    n_trajectories * (nparams + 1) evaluations are done in total.  The
+    effects are computed for the log of each error term as the errors vary
+    over orders of magnitude within typical bounds.
+
+    Grid points that are infeasible are not used.  A trajectory's starting
+    point is redrawn until a feasible one is found, and a step that lands
+    on an infeasible point is tried in the other direction and otherwise
+    skipped, so parameters can have fewer than n_trajectories effects.
+    Points are infeasible if they violate the constraints, are rejected as
+    InfeasibleParameters, fail with an EvaluationError, or have non-finite
+    errors.
+
+    Each evaluation uses evaluate(), so a PoolEvaluator, ThreadEvaluator or
+    HybridEvaluator can be given as lmp to evaluate the structures of each
+    point in parallel.  The points themselves are evaluated one at a time
+    as they share the parameter file.
+
+    Parameters
+    ----------
+    parambuilder
+        A iprPy_fit parambuilder object.  Its parameter values and the
+        parameter file are restored when the screening finishes.
+    paramfilename : Path
+        The location where the parameter file is to be found.
+    params : dict or ParameterMap
+        The names of the parameters to screen and their (min, max) bounds.
+        If ParameterMap, its free parameters are screened and all of them
+        need bounds.
+    ref_values : dict
+        reference values to compare to.
+    weights : dict
+        Weights to use for error calculation.  Each key with a positive
+        weight is an error term.
+    n_trajectories : int, optional
+        The number of Morris trajectories.  Default value is 10.
+    levels : int, optional
+        The number of grid levels along each parameter.  Each step changes
+        a parameter by half of the levels.  Default value is 4.
+    threshold : float, optional
+        Parameters whose mu_star for every error term is below threshold
+        times the largest mu_star of that term are suggested to be frozen.
+        Default value is 0.05.
+    lmp :
+        The LAMMPS executable, library object or evaluator to use.
+    scripts
+    systems
+    potential
+    paramsets
+    include_velocities
+    units
+    reduction : dict, optional
+        The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+        the given paramsets are a reduced set.
+    transform : str or ParameterTransform, optional
+        Defines the normalized space that the grid is built in, see
+        ParameterTransform.  Default value of 'auto' uses a log scale for
+        parameters whose bounds span orders of magnitude.
+    constraints : Constraints, optional
+        If given, grid points that violate the constraints are infeasible
+        and are not evaluated.  Points are never projected as that would
+        move them off the grid.
+    max_resample : int, optional
+        The number of times a trajectory's starting point is redrawn when
+        it is infeasible before the trajectory is skipped.  Default value
+        is 100.
+    seed : int, optional
+        Random seed that makes the trajectories reproducible.
+
+    Returns
+    -------
+    dict
+        - 'names': the screened parameter names.
+        - 'terms': the error terms, with 'total' last.
+        - 'mu_star': (nparams, nterms) mean absolute elementary effects.
+        - 'mu': (nparams, nterms) mean elementary effects.
+        - 'sigma': (nparams, nterms) standard deviations of the effects.
+        - 'n_effects': (nparams,) the number of effects found for each
+          parameter.  The statistics of parameters without effects are nan
+          and the parameters are kept.
+        - 'keep': the suggested parameters to fit.
+        - 'freeze': the suggested parameters to hold fixed.
+        - 'params': the bounds of the parameters to keep, which can be given
+          to minimize(), or None if params is a ParameterMap.
+    """
+    # split params and bounds
+    parammap = None
+    if isinstance(params, dict):
+        paramnames = list(params.keys())
+        bounds = list(params.values())
+    elif isinstance(params, ParameterMap):
+        parammap = params
+        paramnames = parammap.free_names
+        bounds = parammap.bounds
+        if bounds is None:
+            raise ValueError('all free parameters need bounds for morris_sensitivity')
+    else:
+        raise TypeError('params must be dict or ParameterMap')
+    if levels < 2:
+        raise ValueError('levels must be at least 2')
+
+    if not isinstance(transform, ParameterTransform):
+        transform = ParameterTransform(bounds, transform)
+
+    # Error terms are the keys with positive weights
+    terms = []
+    for key, weight in weights.items():
+        if weight is None:
+            continue
+        if np.ndim(weight) == 0 and (np.isnan(weight) or weight <= 0.0):
+            continue
+        terms.append(key)
+    if len(terms) == 0:
+        raise ValueError('weights must have at least one positive weight')
+    plan = EvaluationPlan.from_weights(weights, ref_values)
+
+    # Save the current parameters to restore at the end
+    allnames = paramnames if parammap is None else parammap.names
+    initial_values = parambuilder.get_parameter_values(allnames)
+
+    def log_errors(level):
+        """Evaluates the log error terms at a grid point, or None if infeasible"""
+        values = transform.from_unit_cube(level / (levels - 1))
+        names = paramnames
+        try:
+            if parammap is not None:
+                names = parammap.names
+                values = parammap.expand(values)
+            parambuilder.update_parameter_array(names, values)
+            if constraints is not None and constraints.violation(parambuilder) > 0.0:
+                return None
+            parambuilder.save_paramfile(paramfilename)
+
+            results = evaluate(lmp=lmp, scripts=scripts, systems=systems,
+                               potential=potential, paramsets=paramsets,
+                               include_velocities=include_velocities, units=units,
+                               reduction=reduction, plan=plan)
+        except (InfeasibleParameters, EvaluationError):
+            return None
+
+        errors = _term_errors(results, ref_values, weights, terms)
+        if not np.all(np.isfinite(errors)):
+            return None
+        return np.log(np.maximum(errors, np.finfo(float).tiny))
+
+    # Steps of half the levels pair the grid levels up
+    rng = np.random.default_rng(seed)
+    nparams = len(paramnames)
+    dlevel = levels // 2
+
+    # Effects of skipped steps and trajectories stay nan
+    effects = np.full((n_trajectories, nparams, len(terms) + 1), np.nan)
+    try:
+        for t in range(n_trajectories):
+            for n in range(max_resample + 1):
+                level = rng.integers(levels, size=nparams)
+                y = log_errors(level)
+                if y is not None:
+                    break
+            else:
+                continue
+
+            for j in rng.permutation(nparams):
+                sign = 1 if level[j] + dlevel < levels else -1
+                for step in (sign * dlevel, -sign * dlevel):
+                    if not 0 <= level[j] + step < levels:
+                        continue
+                    level[j] += step
+                    new_y = log_errors(level)
+                    if new_y is not None:
+                        effects[t, j] = (new_y - y) * (levels - 1) / step
+                        y = new_y
+                        break
+                    level[j] -= step
+    finally:
+        parambuilder.update_parameter_array(allnames, initial_values)
+        parambuilder.save_paramfile(paramfilename)
+
+    mu_star, mu, sigma, n_effects = _effect_statistics(effects)
+
+    # Suggest freezing parameters with small effects on every error term
+    with np.errstate(invalid='ignore'):
+        largest = np.max(np.where(np.isnan(mu_star), -np.inf, mu_star), axis=0)
+        insensitive = np.all(mu_star < threshold * largest, axis=1)
+    keep = [name for name, flag in zip(paramnames, insensitive) if not flag]
+    freeze = [name for name, flag in zip(paramnames, insensitive) if flag]
+
+    results = {}
+    results['names'] = paramnames
+    results['terms'] = terms + ['total']
+    results['mu_star'] = mu_star
+    results['mu'] = mu
+    results['sigma'] = sigma
+    results['n_effects'] = n_effects
+    results['keep'] = keep
+    results['freeze'] = freeze
+    if parammap is None:
+        results['params'] = {name: params[name] for name in keep}
+    else:
+        results['params'] = None
+
+    return results
+
+
+def _term_errors(results: dict,
+                 ref_values: dict,
+                 weights: dict,
+                 terms: list) -> np.ndarray:
+    """Sums the error of each term over the structures, with the total last"""
+    nsims = len(ref_values[terms[0]])
+    errors = np.zeros(len(terms) + 1)
+    for i in range(nsims):
+        values = {key: results[key][i] for key in terms}
+        for j, key in enumerate(terms):
+            errors[j] += structure_error(values, i, ref_values,
+                                         {key: weights[key]})
+    errors[-1] = errors[:-1].sum()
+    return errors
+
+def _effect_statistics(effects: np.ndarray) -> tuple:
+    """Computes mu_star, mu, sigma and the counts of the non-nan effects"""
+    found = ~np.isnan(effects)
+    counts = found.sum(axis=0)
+    values = np.where(found, effects, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mu_star = np.abs(values).sum(axis=0) / counts
+        mu = values.sum(axis=0) / counts
+        sqdev = np.where(found, effects - mu, 0.0)**2
+        sigma = np.where(counts > 1, np.sqrt(sqdev.sum(axis=0) / (counts - 1)), 0.0)
+    sigma[counts == 0] = np.nan
+    return mu_star, mu, sigma, counts[:, 0]
@@ -0,0 +1,296 @@
+from pathlib import Path
+from typing import Optional, Union
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+
+import numpy as np
+
+import scipy.optimize
+from scipy.stats import qmc
+
+from ..parambuilder import ParameterMap, Constraints
+from ..lammps import dump_lammps_dynamic_parameters
+from ..evaluate import EvaluationPlan
+from . import minfxn, ParameterTransform
+
+
+def multistart(parambuilder,
+               paramfilename: Path,
+               params,
+               ref_values,
+               weights,
+               n_starts: int,
+
+               workers: Optional[int] = None,
+               systems = None,
+               potential = None,
+               paramsets = None,
+               include_velocities: bool = False,
+               units: str = 'metal',
+               reduction: Optional[dict] = None,
+               transform: Union[str, ParameterTransform, None] = None,
+               constraints: Optional[Constraints] = None,
+
+               sampler: str = 'sobol',
+               seed: Optional[int] = None,
+               abort_ratio: Optional[float] = 10.0,
+               abort_after: int = 100,
+               cmdargs: Optional[list] = None,
+
+               min_method='Nelder-Mead',
+               min_options=None,
+               ):
+    """
+    Runs independent local minimizations from multiple quasi-random starting
+    points inside the parameter bounds.  The starts are spread across a
+    process pool in which each worker has its own LAMMPS library object and
+    its own copy of the parameter file.  The workers share the best error
+    found so far, and unless abort_ratio is None, a start is abandoned if,
+    after abort_after evaluations, its best error is still more than
+    abort_ratio times the shared best.  The parambuilder and parameter file
+    are updated with the best parameters found.
+
+    Parameters
+    ----------
+    parambuilder
+        A iprPy_fit parambuilder object.  It must be picklable.
+    paramfilename : Path
+        The location where the parameter file is to be found.
+    params : dict or ParameterMap
+        The names of the parameters to fit as keys and the fitting bounds
+        as values, or a ParameterMap whose free parameters all have bounds.
+    ref_values : dict
+        reference values to compare to.
+    weights : dict
+        Weights to use for error calculation.
+    n_starts : int
+        The number of starting points.
+    workers : int, optional
+        The number of worker processes.  Default value is the smaller of
+        n_starts and the number of CPUs.
+    systems
+    potential
+    paramsets
+        The reference structures.  systems and potential are converted to
+        paramsets.  The pair_info of the paramsets must reference
+        paramfilename.
+    include_velocities
+    units
+    reduction : dict, optional
+        The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+        the given paramsets are a reduced set.
+    transform : str or ParameterTransform, optional
+        If given, each start is optimized in the transformed parameter space
+        and the starting points are sampled uniformly in it.
+    constraints : Constraints, optional
+        If given, trial parameters are checked against the constraints
+        before the parameter file is written, such as those built by
+        TersoffModC.constraints().  Infeasible parameters are projected or
+        given a penalty error without running LAMMPS.  See minfxn().
+    sampler : str, optional
+        'sobol' (default) or 'lhs' for Latin hypercube sampling.
+    seed : int, optional
+        Random seed that makes the starting points reproducible.
+    abort_ratio : float or None, optional
+        The ratio to the shared best error above which a start is
+        abandoned.  If None, starts are never abandoned.  Default value is
+        10.0.
+    abort_after : int, optional
+        The number of evaluations a start gets before it can be abandoned.
+        Default value is 100.
+    cmdargs : list, optional
+        The command line arguments used when creating each worker's
+        lammps.lammps object.  Default value turns off the log and screen
+        outputs.
+    min_method : str, optional
+        The scipy.optimize.minimize method to use.  Default value is
+        'Nelder-Mead'.
+    min_options : dict, optional
+        Options to pass to scipy.optimize.minimize.
+
+    Returns
+    -------
+    dict
+        The best parameter values found.
+    """
+    # split params and bounds
+    parammap = None
+    if isinstance(params, dict):
+        paramnames = list(params.keys())
+        bounds = list(params.values())
+    elif isinstance(params, ParameterMap):
+        parammap = params
+        paramnames = parammap.free_names
+        bounds = parammap.bounds
+        if bounds is None:
+            raise ValueError('all free parameters need bounds for multistart')
+    else:
+        raise TypeError('params must be dict or ParameterMap')
+
+    # Build paramsets and check that they use paramfilename
+    if paramsets is None:
+        if systems is None or potential is None:
+            raise ValueError('systems + potential or paramsets must be given')
+        paramsets = [dump_lammps_dynamic_parameters(system, potential=potential,
+                                                    return_pair_info=True,
+                                                    include_velocities=include_velocities)
+                     for system in systems]
+    paramfilename = str(paramfilename)
+    for paramset in paramsets:
+        if paramfilename not in paramset['pair_info']:
+            raise ValueError('paramsets pair_info must reference paramfilename')
+
+    # Sample the starting points
+    if transform is not None and not isinstance(transform, ParameterTransform):
+        transform = ParameterTransform(bounds, transform)
+    if sampler == 'sobol':
+        engine = qmc.Sobol(len(bounds), seed=seed)
+    elif sampler == 'lhs':
+        engine = qmc.LatinHypercube(len(bounds), seed=seed)
+    else:
+        raise ValueError(f'unknown sampler {sampler}')
+    with warnings.catch_warnings():
+        # Sobol warns when n_starts is not a power of 2
+        warnings.simplefilter('ignore', UserWarning)
+        unit_points = engine.random(n_starts)
+    if transform is not None:
+        starts = transform.from_unit_cube(unit_points)
+    else:
+        lower, upper = np.array(bounds, dtype=float).T
+        starts = qmc.scale(unit_points, lower, upper)
+
+    options = {}
+    if min_options is not None:
+        options.update(min_options)
+
+    if workers is None:
+        workers = min(n_starts, mp.cpu_count())
+    if cmdargs is None:
+        cmdargs = ['-log', 'none', '-screen', 'none']
+
+    # Constant minfxn kwargs used by all workers
+    minfxn_kwargs = dict(
+        paramnames = paramnames,
+        ref_values = ref_values,
+        weights = weights,
+        include_velocities = include_velocities,
+        units = units,
+        reduction = reduction,
+        parammap = parammap,
+        transform = transform,
+        plan = EvaluationPlan.from_weights(weights, ref_values),
+        constraints = constraints)
+
+    context = mp.get_context('spawn')
+    best = context.Value('d', np.inf)
+    initargs = (parambuilder, paramfilename, paramsets, minfxn_kwargs, best,
+                cmdargs, abort_ratio, abort_after)
+    results = []
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=_init_worker, initargs=initargs) as executor:
+        futures = []
+        for i, start in enumerate(starts):
+            start_options = dict(options)
+            if transform is not None:
+                if min_method == 'Nelder-Mead' and 'initial_simplex' not in options:
+                    start_options['initial_simplex'] = transform.initial_simplex(start)
+                start = transform.to_internal(start)
+                start_bounds = transform.bounds
+            else:
+                start_bounds = bounds
+            futures.append(executor.submit(_run_start, i, start, start_bounds,
+                                           min_method, start_options))
+
+        for future in as_completed(futures):
+            result = future.result()
+            status = 'abandoned' if result['aborted'] else 'finished'
+            print(f"Start {result['start']+1}: error {result['error']} after",
+                  f"{result['nevals']} evaluations ({status})")
+            results.append(result)
+
+    # Update the parambuilder with the best parameters
+    bestresult = min(results, key=lambda result: result['error'])
+    final_values = bestresult['params']
+    if parammap is not None:
+        paramnames = parammap.names
+        final_values = parammap.expand(final_values)
+    parambuilder.update_parameter_array(paramnames, final_values)
+    if constraints is not None and constraints.mode == 'project':
+        constraints.project(parambuilder, paramnames)
+        final_values = parambuilder.get_parameter_values(paramnames)
+    parambuilder.save_paramfile(paramfilename)
+    print('Final error is', bestresult['error'])
+
+    final_params = {}
+    for key, value in zip(paramnames, final_values):
+        final_params[key] = float(value)
+
+    return final_params
+
+class _HopelessStart(Exception):
+    """Raised to stop a start that is far worse than the shared best"""
+
+_worker = None
+
+def _init_worker(parambuilder, paramfilename, paramsets, minfxn_kwargs, best,
+                 cmdargs, abort_ratio, abort_after):
+    """Creates the worker's LAMMPS object and its own parameter file"""
+    global _worker
+    from lammps import lammps
+
+    # Point the paramsets at a parameter file owned by this worker
+    tempdir = tempfile.TemporaryDirectory()
+    workerfilename = str(Path(tempdir.name, Path(paramfilename).name))
+    paramsets = [dict(paramset, pair_info=paramset['pair_info'].replace(paramfilename, workerfilename))
+                 for paramset in paramsets]
+
+    _worker = dict(
+        tempdir = tempdir,
+        best = best,
+        abort_ratio = abort_ratio,
+        abort_after = abort_after,
+        kwargs = dict(minfxn_kwargs,
+                      parambuilder = parambuilder,
+                      paramfilename = workerfilename,
+                      lmp = lammps(cmdargs=cmdargs),
+                      paramsets = paramsets,
+                      buffers = {}))
+
+def _run_start(i, start, bounds, min_method, options) -> dict:
+    """Runs one local minimization in a worker"""
+    best = _worker['best']
+    tracker = dict(error=np.inf, x=np.asarray(start), nevals=0)
+
+    def fxn(x):
+        error = minfxn(x, **_worker['kwargs'])
+        tracker['nevals'] += 1
+        if error < tracker['error']:
+            tracker['error'] = error
+            tracker['x'] = np.array(x)
+            with best.get_lock():
+                if error < best.value:
+                    best.value = error
+
+        # Abandon starts that are far behind the best
+        if (_worker['abort_ratio'] is not None and
+            tracker['nevals'] >= _worker['abort_after'] and
+            tracker['error'] > _worker['abort_ratio'] * best.value):
+            raise _HopelessStart()
+        return error
+
+    aborted = False
+    try:
+        scipy.optimize.minimize(fxn, start, method=min_method,
+                                options=options, bounds=bounds)
+    except _HopelessStart:
+        aborted = True
+
+    params = tracker['x']
+    transform = _worker['kwargs']['transform']
+    if transform is not None:
+        params = transform.to_external(params)
+
+    return dict(start=i, params=params, error=tracker['error'],
+                nevals=tracker['nevals'], aborted=aborted)
@@ -0,0 +1,50 @@
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+def select_batch(costs: npt.ArrayLike,
+                 importance: npt.ArrayLike,
+                 budget: float,
+                 rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Randomly selects a subset of the reference structures whose total cost
+    fits within a budget.  Structures are drawn without replacement with
+    probabilities proportional to their importance.
+
+    Parameters
+    ----------
+    costs : array-like object
+        The evaluation cost of each structure, e.g. the number of atoms.
+    importance : array-like object
+        The sampling weight of each structure.  Structures with zero
+        importance are never selected.
+    budget : float
+        The maximum total cost of the selected structures.  At least one
+        structure is always selected.
+    rng : numpy.random.Generator, optional
+        The random number generator to use.  If not given, a new unseeded
+        generator will be created.
+
+    Returns
+    -------
+    numpy.ndarray
+        The sorted indices of the selected structures.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    costs = np.asarray(costs, dtype=float)
+    importance = np.asarray(importance, dtype=float)
+
+    # Weighted random ordering using exponential keys
+    candidates = np.where(importance > 0)[0]
+    if len(candidates) == 0:
+        raise ValueError('no structures have nonzero importance')
+    keys = rng.exponential(size=len(candidates)) / importance[candidates]
+    order = candidates[np.argsort(keys)]
+
+    # Take structures in order until the budget is used up
+    total = np.cumsum(costs[order])
+    nselect = max(1, int(np.searchsorted(total, budget, side='right')))
+
+    return np.sort(order[:nselect])
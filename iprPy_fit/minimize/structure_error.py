@@ -0,0 +1,48 @@
+import numpy as np
+
+def structure_error(values: dict,
+                    index: int,
+                    ref_values: dict,
+                    weights: dict) -> float:
+    """
+    Computes the error contribution of a single structure
+        sum( ((value - ref) / weight)^2 )
+
+    Weights and reference values that are None, nan or have non-positive
+    weights are skipped.  If ref_values has a per-structure key + '_importance'
+    list, such as the 'F_importance' added by ForceSampler, the squared
+    differences of each atom are multiplied by its importance weight.
+
+    Parameters
+    ----------
+    values : dict
+        The property values computed for the structure.
+    index : int
+        The index of the structure in the reference values.
+    ref_values : dict
+        The reference property values to compare to.
+    weights : dict
+        The weights to use for each property type.  Each weight is either a
+        single value or a per-structure list of values.
+    """
+    error = 0.0
+    for key, weight in weights.items():
+        if weight is None:
+            continue
+        if np.ndim(weight) > 0:
+            weight = weight[index]
+        if weight is None or np.isnan(weight) or weight <= 0.0:
+            continue
+
+        value = values[key]
+        ref_value = ref_values[key][index]
+        if value is None or ref_value is None:
+            continue
+
+        sqdiff = ((np.asarray(value) - ref_value) / weight)**2
+        importance = ref_values.get(key + '_importance')
+        if importance is not None and importance[index] is not None:
+            sqdiff = importance[index][:, np.newaxis] * sqdiff
+        error += float(np.sum(sqdiff))
+
+    return error
@@ -0,0 +1,39 @@
+import numpy as np
+
+def structure_importance(ref_values: dict,
+                         weights: dict,
+                         nsims: int) -> np.ndarray:
+    """
+    Computes the importance of each structure as the sum of the inverse
+    squared weights of the reference values that it has.
+
+    Parameters
+    ----------
+    ref_values : dict
+        The reference property values.
+    weights : dict
+        The weights used for each property type.
+    nsims : int
+        The number of structures.
+
+    Returns
+    -------
+    numpy.ndarray
+        The importance of each structure.  Structures with only zero
+        weights have an importance of 0.
+    """
+    importance = np.zeros(nsims)
+    for key, weight in weights.items():
+        if weight is None or key not in ref_values:
+            continue
+        weight = np.broadcast_to(np.asarray(weight, dtype=float), (nsims,))
+        ref_value = ref_values[key]
+
+        for i in range(nsims):
+            if np.isnan(weight[i]) or weight[i] <= 0.0:
+                continue
+            if ref_value[i] is None or np.any(np.isnan(ref_value[i])):
+                continue
+            importance[i] += 1.0 / weight[i]**2
+
+    return importance
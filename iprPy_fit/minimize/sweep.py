@@ -0,0 +1,316 @@
+from pathlib import Path
+from typing import Optional, Union
+import contextlib
+import io
+import itertools
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+import multiprocessing as mp
+
+import numpy as np
+
+from ..lammps import dump_lammps_dynamic_parameters
+from ..evaluate import EvaluationPlan
+from . import minfxn, minimize
+
+# minimize() kwargs that are set by the sweep itself
+_reserved = ('parambuilder', 'paramfilename', 'ref_values', 'lmp', 'scripts',
+             'systems', 'potential', 'paramsets', 'include_velocities',
+             'units', 'reduction', 'buffers', 'cache', 'n_starts', 'workers')
+
+
+def sweep(parambuilder,
+          paramfilename: Path,
+          params,
+          ref_values,
+          weights,
+          design: Union[dict, list],
+
+          n_samples: Optional[int] = None,
+          seed: Optional[int] = None,
+          workers: Optional[int] = None,
+          systems = None,
+          potential = None,
+          paramsets = None,
+          include_velocities: bool = False,
+          units: str = 'metal',
+          reduction: Optional[dict] = None,
+          score_weights: Optional[dict] = None,
+          cmdargs: Optional[list] = None,
+          **kwargs):
+    """
+    Runs a set of fits with different weights, bounds and optimizer
+    options in parallel and summarizes their final errors.  The fits are
+    spread across a process pool in which each worker loads the reference
+    values and paramsets once, keeps one LAMMPS library object and force
+    buffers for all of its fits, and has its own copy of the parameter
+    file.  Each fit is a minimize() call that starts from the parameter
+    values of the given parambuilder, which is not changed.
+
+    The settings of each fit are the base params, weights and kwargs
+    updated by the values of one design point.  Design keys are either
+    minimize() parameter names, such as 'min_method' or 'transform', or
+    'weights.<key>', 'params.<name>' and 'min_options.<option>' to change
+    a single entry of those dicts.  A 'params.<name>' value of None leaves
+    the parameter out of the fit.
+
+    Parameters
+    ----------
+    parambuilder
+        A iprPy_fit parambuilder object.  It must be picklable.
+    paramfilename : Path
+        The location where the parameter file is to be found.
+    params : list or dict
+        The base parameters to fit, as for minimize().  Must be a dict to
+        use 'params.<name>' design keys.
+    ref_values : dict
+        reference values to compare to.
+    weights : dict
+        The base weights to use for error calculation.
+    design : dict or list
+        If dict, the design keys and lists of values to try.  All
+        combinations of the values are fit unless n_samples is given.  If
+        list, the settings dicts of each fit.
+    n_samples : int, optional
+        If given with a dict design, this many distinct random combinations
+        of the values are fit instead of all combinations.
+    seed : int, optional
+        Random seed that makes the n_samples combinations reproducible.
+    workers : int, optional
+        The number of worker processes.  Default value is the smaller of
+        the number of fits and the number of CPUs.
+    systems
+    potential
+    paramsets
+        The reference structures.  systems and potential are converted to
+        paramsets.  The pair_info of the paramsets must reference
+        paramfilename.
+    include_velocities
+    units
+    reduction : dict, optional
+        The mapping returned by iprPy_fit.reference.reduce_paramsets() if
+        the given paramsets are a reduced set.
+    score_weights : dict, optional
+        If given, the final parameters of every fit are also scored with
+        these weights, so that fits with different weights can be compared
+        on the same error.
+    cmdargs : list, optional
+        The command line arguments used when creating each worker's
+        lammps.lammps object.  Default value turns off the log and screen
+        outputs.
+    **kwargs : any, optional
+        Base settings passed on to minimize(), such as min_method,
+        min_options, transform, abort_ratio or constraints.
+
+    Returns
+    -------
+    list of dict
+        A summary row for each fit in design order, which can be given to
+        pandas.DataFrame.  Each row has the 'fit' index, the design values,
+        the final 'error' with the fit's own weights, the 'score' if
+        score_weights is given, the wall 'time' in seconds, and the
+        'final_params'.  Fits that raised an exception have nan errors and
+        the message in 'exception'.
+    """
+    for key in _reserved:
+        if key in kwargs:
+            raise ValueError(f'{key} cannot be given to sweep')
+
+    # Build the settings of each fit
+    points = _design_points(design, n_samples, seed)
+    base = dict(kwargs, params=params, weights=weights)
+    fits = [_apply_design(base, point) for point in points]
+
+    # Build paramsets and check that they use paramfilename
+    if paramsets is None:
+        if systems is None or potential is None:
+            raise ValueError('systems + potential or paramsets must be given')
+        paramsets = [dump_lammps_dynamic_parameters(system, potential=potential,
+                                                    return_pair_info=True,
+                                                    include_velocities=include_velocities)
+                     for system in systems]
+    paramfilename = str(paramfilename)
+    for paramset in paramsets:
+        if paramfilename not in paramset['pair_info']:
+            raise ValueError('paramsets pair_info must reference paramfilename')
+
+    if workers is None:
+        workers = min(len(fits), mp.cpu_count())
+    if cmdargs is None:
+        cmdargs = ['-log', 'none', '-screen', 'none']
+
+    # Constant kwargs used by all fits
+    shared_kwargs = dict(
+        ref_values = ref_values,
+        include_velocities = include_velocities,
+        units = units,
+        reduction = reduction)
+
+    context = mp.get_context('spawn')
+    initargs = (parambuilder, paramfilename, paramsets, shared_kwargs,
+                score_weights, cmdargs)
+    rows = [None for i in range(len(fits))]
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=_init_worker, initargs=initargs) as executor:
+        futures = [executor.submit(_run_fit, fit) for fit in fits]
+        futures = {future: i for i, future in enumerate(futures)}
+
+        for future in as_completed(futures):
+            i = futures[future]
+            result = future.result()
+            row = dict(fit=i)
+            row.update(points[i])
+            row.update(result)
+            rows[i] = row
+            if 'exception' in result:
+                print(f'Fit {i} failed: {result["exception"]}')
+            else:
+                print(f'Fit {i}: error {result["error"]} in {result["time"]:.1f} s')
+
+    _print_summary(rows, points, score_weights is not None)
+
+    return rows
+
+def _design_points(design, n_samples, seed) -> list:
+    """Lists the design values of each fit"""
+    if isinstance(design, list):
+        if n_samples is not None:
+            raise ValueError('n_samples requires a dict design')
+        return [dict(point) for point in design]
+    if not isinstance(design, dict):
+        raise TypeError('design must be dict or list')
+
+    keys = list(design.keys())
+    values = [list(design[key]) for key in keys]
+    sizes = [len(value) for value in values]
+    if 0 in sizes:
+        raise ValueError('design values cannot be empty')
+    ncombos = int(np.prod(sizes))
+
+    if n_samples is None:
+        combos = itertools.product(*[range(size) for size in sizes])
+    else:
+        if n_samples > ncombos:
+            raise ValueError(f'n_samples is larger than the {ncombos} combinations')
+        rng = np.random.default_rng(seed)
+        flat = rng.choice(ncombos, n_samples, replace=False)
+        combos = zip(*np.unravel_index(flat, sizes))
+
+    return [{key: value[j] for key, value, j in zip(keys, values, combo)}
+            for combo in combos]
+
+def _apply_design(base, point) -> dict:
+    """Builds the minimize() settings of a fit from the base and a design point"""
+    fit = dict(base)
+    for key, value in point.items():
+        if '.' in key:
+            group, name = key.split('.', 1)
+            if group not in ('weights', 'params', 'min_options'):
+                raise ValueError(f'unknown design key {key}')
+            entries = fit.get(group)
+            if entries is None:
+                entries = {}
+            elif not isinstance(entries, dict):
+                raise TypeError(f'{group} must be a dict to use design key {key}')
+            entries = dict(entries)
+            if group == 'params' and value is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = value
+            fit[group] = entries
+        elif key in _reserved:
+            raise ValueError(f'{key} cannot be a design key')
+        else:
+            fit[key] = value
+    return fit
+
+def _print_summary(rows, points, scored):
+    """Prints the summary table sorted by error"""
+    columns = []
+    for point in points:
+        for key in point:
+            if key not in columns:
+                columns.append(key)
+    header = ['fit'] + columns + ['error']
+    if scored:
+        header.append('score')
+
+    def cell(value):
+        if isinstance(value, (float, np.floating)):
+            return f'{value:.6g}'
+        return str(value)
+
+    def sortkey(row):
+        error = row['score'] if scored else row['error']
+        return np.inf if np.isnan(error) else error
+
+    table = [header]
+    for row in sorted(rows, key=sortkey):
+        table.append([cell(row.get(key, '')) for key in header])
+    widths = [max(len(line[j]) for line in table) for j in range(len(header))]
+    for line in table:
+        print('  '.join(value.ljust(width) for value, width in zip(line, widths)))
+
+_worker = None
+
+def _init_worker(parambuilder, paramfilename, paramsets, shared_kwargs,
+                 score_weights, cmdargs):
+    """Loads the shared data and creates the worker's LAMMPS object"""
+    global _worker
+    from lammps import lammps
+
+    # Point the paramsets at a parameter file owned by this worker
+    tempdir = tempfile.TemporaryDirectory()
+    workerfilename = str(Path(tempdir.name, Path(paramfilename).name))
+    paramsets = [dict(paramset, pair_info=paramset['pair_info'].replace(paramfilename, workerfilename))
+                 for paramset in paramsets]
+
+    score_plan = None
+    if score_weights is not None:
+        score_plan = EvaluationPlan.from_weights(score_weights, shared_kwargs['ref_values'])
+
+    _worker = dict(
+        tempdir = tempdir,
+        parambuilder = parambuilder,
+        score_weights = score_weights,
+        score_plan = score_plan,
+        kwargs = dict(shared_kwargs,
+                      paramfilename = workerfilename,
+                      lmp = lammps(cmdargs=cmdargs),
+                      paramsets = paramsets,
+                      buffers = {}))
+
+def _run_fit(fit) -> dict:
+    """Runs one fit in a worker"""
+    parambuilder = deepcopy(_worker['parambuilder'])
+    kwargs = _worker['kwargs']
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            final_params = minimize(parambuilder, **kwargs, **fit)
+
+        # Evaluate the final parameters
+        paramnames = list(final_params.keys())
+        values = list(final_params.values())
+        error = minfxn(values, paramnames=paramnames, parambuilder=parambuilder,
+                       weights=fit['weights'],
+                       plan=EvaluationPlan.from_weights(fit['weights'], kwargs['ref_values']),
+                       constraints=fit.get('constraints'), **kwargs)
+        result = dict(error=float(error))
+        if _worker['score_weights'] is not None:
+            score = minfxn(values, paramnames=paramnames, parambuilder=parambuilder,
+                           weights=_worker['score_weights'], plan=_worker['score_plan'],
+                           **kwargs)
+            result['score'] = float(score)
+        result['time'] = time.perf_counter() - start
+        result['final_params'] = final_params
+
+    except Exception as err:
+        result = dict(error=np.nan, time=time.perf_counter() - start,
+                      final_params=None, exception=f'{type(err).__name__}: {err}')
+        if _worker['score_weights'] is not None:
+            result['score'] = np.nan
+
+    return result
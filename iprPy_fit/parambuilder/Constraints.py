@@ -0,0 +1,301 @@
+from typing import Callable, Optional
+
+import numpy as np
+
+class Constraints():
+    """
+    Declarative inequality constraints on the parameters of a parambuilder.
+    Each constraint is written as g >= 0 with g either linear in the named
+    parameters or computed by a user function.  The linear constraints are
+    compiled into a matrix over the parambuilder's flattened parameter array
+    so that all of them are checked with a single matrix product.
+
+    Constraints can be given to minimize() and minfxn() so that infeasible
+    trial parameters are handled before the parameter file is written and
+    LAMMPS is called.  With mode 'penalty', an infeasible point gets the
+    error penalty * (1 + violation), where violation is the sum of squared
+    constraint violations, so the penalty is smooth and points the
+    optimizer back to the feasible region.  With mode 'project', the
+    parameters being fit are moved to the nearest point that satisfies the
+    linear constraints and then evaluated, with function constraints that
+    still fail falling back to the penalty.
+    """
+    def __init__(self,
+                 mode: str = 'penalty',
+                 penalty: float = 1e10,
+                 maxiter: int = 100,
+                 tol: float = 1e-10):
+        """
+        Initializes an empty set of constraints.
+
+        Parameters
+        ----------
+        mode : str, optional
+            'penalty' (default) or 'project'.  See class description.
+        penalty : float, optional
+            The base error of infeasible points.  Should be larger than the
+            errors of any feasible parameters of interest.  Default value is
+            1e10.
+        maxiter : int, optional
+            The maximum number of sweeps over the linear constraints done
+            when projecting.  Default value is 100.
+        tol : float, optional
+            Constraint values down to -tol are treated as satisfied so that
+            projected points are feasible.  Default value is 1e-10.
+        """
+        if mode not in ('penalty', 'project'):
+            raise ValueError("mode must be 'penalty' or 'project'")
+        self.mode = mode
+        self.penalty = penalty
+        self.maxiter = maxiter
+        self.tol = tol
+
+        self.__linear = []
+        self.__functions = []
+        self.__compiled = None
+
+    def __getstate__(self):
+        """Drops the compiled constraints when pickling"""
+        state = self.__dict__.copy()
+        state['_Constraints__compiled'] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self.__linear) + len(self.__functions)
+
+    @property
+    def descriptions(self) -> list:
+        """list: The descriptions of the linear then function constraints"""
+        return ([c[2] for c in self.__linear] + [c[2] for c in self.__functions])
+
+    def add_linear(self,
+                   coefficients: dict,
+                   lower: float = 0.0,
+                   description: Optional[str] = None):
+        """
+        Adds a linear constraint
+            sum(coefficient * parameter) >= lower
+
+        Parameters
+        ----------
+        coefficients : dict
+            The parameter names and their coefficients.
+        lower : float, optional
+            The lower limit.  Default value is 0.0.
+        description : str, optional
+            A description of the constraint.  Default builds one from the
+            coefficients.
+        """
+        if len(coefficients) == 0:
+            raise ValueError('coefficients cannot be empty')
+        if description is None:
+            terms = ' + '.join(f'{c:g}*{n}' for n, c in coefficients.items())
+            description = f'{terms} >= {lower:g}'
+        self.__linear.append((dict(coefficients), float(lower), description))
+        self.__compiled = None
+
+    def add_bounds(self,
+                   name: str,
+                   min: Optional[float] = None,
+                   max: Optional[float] = None):
+        """
+        Adds lower and/or upper limits on a single parameter.
+
+        Parameters
+        ----------
+        name : str
+            The parameter name.
+        min : float, optional
+            The lower limit.
+        max : float, optional
+            The upper limit.
+        """
+        if min is not None:
+            self.add_linear({name: 1.0}, min, f'{name} >= {min:g}')
+        if max is not None:
+            self.add_linear({name: -1.0}, -max, f'{name} <= {max:g}')
+
+    def add_equal(self,
+                  name1: str,
+                  name2: str,
+                  tol: float = 1e-8):
+        """
+        Adds a constraint that two parameters are equal within a tolerance.
+
+        Parameters
+        ----------
+        name1 : str
+            The first parameter name.
+        name2 : str
+            The second parameter name.
+        tol : float, optional
+            The allowed absolute difference.  Default value is 1e-8.
+        """
+        self.add_linear({name1: 1.0, name2: -1.0}, -tol, f'{name1} == {name2}')
+        self.add_linear({name1: -1.0, name2: 1.0}, -tol, f'{name1} == {name2}')
+
+    def add_function(self,
+                     fxn: Callable,
+                     names: list,
+                     description: Optional[str] = None):
+        """
+        Adds a user constraint function.
+
+        Parameters
+        ----------
+        fxn : callable
+            Called as fxn(values) with the numpy array of the named parameter
+            values.  Returns one or more values g that are feasible when
+            g >= 0.
+        names : list
+            The names of the parameters passed to fxn.
+        description : str, optional
+            A description of the constraint.
+        """
+        if description is None:
+            description = f'{getattr(fxn, "__name__", "function")}({", ".join(names)}) >= 0'
+        self.__functions.append((fxn, list(names), description))
+        self.__compiled = None
+
+    def __compile(self, parambuilder):
+        """Builds the constraint matrix for the parambuilder's parameter array"""
+        if self.__compiled is not None and self.__compiled[0] is parambuilder:
+            return self.__compiled
+
+        # Collect the parameters used by the linear constraints
+        names = []
+        for coefficients, lower, description in self.__linear:
+            for name in coefficients:
+                if name not in names:
+                    names.append(name)
+        slots = parambuilder.compile_parameter_map(names)
+
+        matrix = np.zeros((len(self.__linear), len(names)))
+        lowers = np.empty(len(self.__linear))
+        for i, (coefficients, lower, description) in enumerate(self.__linear):
+            for name, coefficient in coefficients.items():
+                matrix[i, names.index(name)] = coefficient
+            lowers[i] = lower
+
+        functions = [(fxn, parambuilder.compile_parameter_map(fnames))
+                     for fxn, fnames, description in self.__functions]
+
+        self.__compiled = (parambuilder, names, slots, matrix, lowers, functions)
+        return self.__compiled
+
+    def residuals(self, parambuilder) -> np.ndarray:
+        """
+        Evaluates all constraints for the parambuilder's current values.
+
+        Parameters
+        ----------
+        parambuilder
+            The parambuilder holding the parameter values.
+
+        Returns
+        -------
+        numpy.ndarray
+            The g - lower values of the linear constraints followed by the
+            g values of the function constraints.  Negative values are
+            violations.
+        """
+        parambuilder, names, slots, matrix, lowers, functions = self.__compile(parambuilder)
+        flat = parambuilder.parameter_array.reshape(-1)
+        residuals = [matrix @ flat[slots] - lowers]
+        for fxn, fslots in functions:
+            residuals.append(np.atleast_1d(np.asarray(fxn(flat[fslots]), dtype=float)))
+        return np.concatenate(residuals)
+
+    def violation(self, parambuilder) -> float:
+        """
+        Measures how far the parambuilder's current values are from
+        satisfying the constraints.
+
+        Parameters
+        ----------
+        parambuilder
+            The parambuilder holding the parameter values.
+
+        Returns
+        -------
+        float
+            The sum of the squared violations, which is 0.0 for feasible
+            values and inf for non-finite constraint values.
+        """
+        residuals = self.residuals(parambuilder)
+        if not np.all(np.isfinite(residuals)):
+            return np.inf
+        return float(np.sum(np.where(residuals < -self.tol, residuals, 0.0)**2))
+
+    def violated(self, parambuilder) -> list:
+        """
+        Lists the descriptions of the constraints that the parambuilder's
+        current values violate.
+
+        Parameters
+        ----------
+        parambuilder
+            The parambuilder holding the parameter values.
+
+        Returns
+        -------
+        list of str
+        """
+        residuals = self.residuals(parambuilder)
+        nlinear = len(self.__linear)
+        descriptions = [c[2] for c in self.__linear]
+        violated = [descriptions[i] for i in np.flatnonzero(~(residuals[:nlinear] >= -self.tol))]
+
+        # Function constraints can return multiple values
+        start = nlinear
+        parambuilder, names, slots, matrix, lowers, functions = self.__compile(parambuilder)
+        flat = parambuilder.parameter_array.reshape(-1)
+        for (fxn, fslots), (f, fnames, description) in zip(functions, self.__functions):
+            size = np.size(fxn(flat[fslots]))
+            if not np.all(residuals[start:start + size] >= -self.tol):
+                violated.append(description)
+            start += size
+        return violated
+
+    def project(self,
+                parambuilder,
+                names: list) -> float:
+        """
+        Moves the named parameters of the parambuilder to the nearest values
+        that satisfy the linear constraints, using Dykstra's alternating
+        projections.  Other parameters are held fixed.
+
+        Parameters
+        ----------
+        parambuilder
+            The parambuilder holding the parameter values.  Its values are
+            updated.
+        names : list
+            The names of the parameters that can be changed.
+
+        Returns
+        -------
+        float
+            The remaining violation of all constraints after projecting.
+        """
+        parambuilder, cnames, slots, matrix, lowers, functions = self.__compile(parambuilder)
+
+        # Only move constrained parameters that are being fit
+        free = np.isin(slots, parambuilder.compile_parameter_map(names))
+        rows = matrix * free
+        norms = np.sum(rows**2, axis=1)
+
+        x = parambuilder.parameter_array.reshape(-1)[slots].copy()
+        increments = np.zeros((len(lowers), len(x)))
+        for i in range(self.maxiter):
+            for k in np.flatnonzero(norms > 0.0):
+                y = x + increments[k]
+                shortfall = lowers[k] - matrix[k] @ y
+                x = y + max(shortfall, 0.0) / norms[k] * rows[k]
+                increments[k] = y - x
+            if np.all(matrix @ x - lowers >= -self.tol):
+                break
+
+        cnames = [name for name, flag in zip(cnames, free) if flag]
+        parambuilder.update_parameter_array(cnames, x[free])
+        return self.violation(parambuilder)
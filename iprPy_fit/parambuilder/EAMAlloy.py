@@ -0,0 +1,490 @@
+from pathlib import Path
+
+from typing import Callable, Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from yabadaba.tools import aslist
+from potentials.record.PotentialLAMMPS import PotentialLAMMPS
+
+from . import InfeasibleParameters
+
+class EAMAlloy():
+    """
+    Builds an eam/alloy setfl parameter file from analytical forms of the
+    embedding functions F(rho), electron densities rho(r) and pair
+    interactions phi(r).  Each function is a user-defined callable that is
+    evaluated with numpy over the full rho or r grid, and its parameters are
+    named so that they can be fit like those of the other parambuilders:
+
+    - '<symbol>_F_<param>' for the embedding function of an element.
+    - '<symbol>_rho_<param>' for the electron density of an element.
+    - '<symbol1>_<symbol2>_phi_<param>' for the pair interaction of two
+      elements, with the symbols in the order they were given to the
+      constructor.
+
+    The parameter values are stored in a single numpy array.  Only the
+    tables of functions whose parameters have changed are retabulated and
+    reformatted when the parameter file is built.  The functions must be
+    defined at the module level for the builder to be picklable.
+    """
+    # Format of each table value in the parameter file
+    _value_format = '%.12g'
+
+    # Number of table values on each parameter file line
+    _values_per_line = 5
+
+    def __init__(self,
+                 symbols: Union[str, list],
+                 nrho: int,
+                 drho: float,
+                 nr: int,
+                 dr: float,
+                 cutoff: Optional[float] = None,
+                 header: str = ''):
+        """
+        Init for EAMAlloy.
+
+        Parameters
+        ----------
+        symbols : str or list
+            The element symbols in the order they are listed in the
+            parameter file.
+        nrho : int
+            The number of points in the rho grid.
+        drho : float
+            The rho grid spacing.
+        nr : int
+            The number of points in the r grid.
+        dr : float
+            The r grid spacing.
+        cutoff : float, optional
+            The cutoff distance.  Default value is (nr - 1) * dr.
+        header : str, optional
+            A comment to include on the first line of the parameter file.
+        """
+        self.symbols = aslist(symbols)
+        if len(set(self.symbols)) != len(self.symbols):
+            raise ValueError('symbols must be unique')
+        if nrho < 2 or nr < 2:
+            raise ValueError('nrho and nr must be at least 2')
+        if cutoff is None:
+            cutoff = (nr - 1) * dr
+        self.nrho = int(nrho)
+        self.drho = float(drho)
+        self.nr = int(nr)
+        self.dr = float(dr)
+        self.cutoff = float(cutoff)
+        self.header = header
+
+        self.__elements = {symbol: None for symbol in self.symbols}
+        self.__functions = {}
+        self.__names = []
+        self.__array = np.empty(0)
+        self.__slots = {}
+        self.__param_maps = {}
+        self.__saved_paramfile = None
+
+    def __getstate__(self):
+        """Drops the table caches when pickling"""
+        state = self.__dict__.copy()
+        state['_EAMAlloy__functions'] = {key: dict(function, table=None, text=None)
+                                         for key, function in self.__functions.items()}
+        state['_EAMAlloy__saved_paramfile'] = None
+        return state
+
+    @property
+    def parameter_names(self) -> list:
+        """list: The names of all function parameters in array order"""
+        return list(self.__names)
+
+    @property
+    def rho_grid(self) -> np.ndarray:
+        """numpy.ndarray: The rho values the embedding functions are tabulated at"""
+        return np.arange(self.nrho) * self.drho
+
+    @property
+    def r_grid(self) -> np.ndarray:
+        """numpy.ndarray: The r values the density and pair functions are tabulated at"""
+        return np.arange(self.nr) * self.dr
+
+    def set_element(self,
+                    symbol: str,
+                    number: int,
+                    mass: float,
+                    alat: float = 0.0,
+                    lattice: str = 'fcc'):
+        """
+        Sets the element information listed in the parameter file.
+
+        Parameters
+        ----------
+        symbol : str
+            The element symbol.
+        number : int
+            The atomic number.
+        mass : float
+            The atomic mass.
+        alat : float, optional
+            The lattice constant.  Not used by LAMMPS.  Default value is 0.0.
+        lattice : str, optional
+            The lattice type.  Not used by LAMMPS.  Default value is 'fcc'.
+        """
+        self.__check_symbols(symbol)
+        self.__elements[symbol] = (int(number), float(mass), float(alat), lattice)
+        self.__saved_paramfile = None
+
+    def set_embedding(self,
+                      symbol: str,
+                      fxn: Callable,
+                      **params):
+        """
+        Sets the embedding function F(rho) of an element.
+
+        Parameters
+        ----------
+        symbol : str
+            The element symbol.
+        fxn : callable
+            Called as fxn(rho, **params) with the numpy array of the rho grid.
+        **params : float
+            The initial values of the function's parameters.
+        """
+        self.__check_symbols(symbol)
+        self.__set_function(('F', symbol), f'{symbol}_F', fxn, params)
+
+    def set_density(self,
+                    symbol: str,
+                    fxn: Callable,
+                    **params):
+        """
+        Sets the electron density function rho(r) of an element.
+
+        Parameters
+        ----------
+        symbol : str
+            The element symbol.
+        fxn : callable
+            Called as fxn(r, **params) with the numpy array of the r grid.
+        **params : float
+            The initial values of the function's parameters.
+        """
+        self.__check_symbols(symbol)
+        self.__set_function(('rho', symbol), f'{symbol}_rho', fxn, params)
+
+    def set_pair(self,
+                 symbol1: str,
+                 symbol2: str,
+                 fxn: Callable,
+                 **params):
+        """
+        Sets the pair interaction function phi(r) of two elements.  The
+        parameter file lists r * phi(r), which is computed by the builder.
+
+        Parameters
+        ----------
+        symbol1 : str
+            The first element symbol.
+        symbol2 : str
+            The second element symbol.  Can be the same as symbol1.
+        fxn : callable
+            Called as fxn(r, **params) with the numpy array of the r grid.
+        **params : float
+            The initial values of the function's parameters.
+        """
+        self.__check_symbols(symbol1, symbol2)
+        symbol1, symbol2 = sorted([symbol1, symbol2], key=self.symbols.index)
+        self.__set_function(('phi', symbol1, symbol2), f'{symbol1}_{symbol2}_phi',
+                            fxn, params)
+
+    def __check_symbols(self, *symbols):
+        """Checks that symbols are known"""
+        for symbol in symbols:
+            if symbol not in self.__elements:
+                raise ValueError(f'Unknown symbol {symbol}')
+
+    def __set_function(self, key, prefix, fxn, params):
+        """Adds or replaces a function and its parameters"""
+        if not callable(fxn):
+            raise TypeError('fxn must be callable')
+
+        # Remove the parameters of a replaced function
+        if key in self.__functions:
+            old = self.__functions[key]
+            keep = np.ones(len(self.__names), dtype=bool)
+            keep[old['slots']] = False
+            self.__names = [name for name, flag in zip(self.__names, keep) if flag]
+            self.__array = self.__array[keep]
+            del self.__functions[key]
+
+        # Append the new parameters
+        self.__names += [f'{prefix}_{name}' for name in params]
+        self.__array = np.concatenate([self.__array,
+                                       np.asarray(list(params.values()), dtype=float)])
+        self.__functions[key] = dict(fxn=fxn, params=list(params), table=None,
+                                     text=None, values=None)
+
+        # Rebuild the slots of all functions
+        self.__slots = {name: i for i, name in enumerate(self.__names)}
+        for fkey, function in self.__functions.items():
+            fprefix = self.__prefix(fkey)
+            function['slots'] = np.array([self.__slots[f'{fprefix}_{name}']
+                                          for name in function['params']], dtype=int)
+        self.__param_maps = {}
+        self.__saved_paramfile = None
+
+    @staticmethod
+    def __prefix(key) -> str:
+        """Gets the parameter name prefix of a function key"""
+        if key[0] == 'phi':
+            return f'{key[1]}_{key[2]}_phi'
+        return f'{key[1]}_{key[0]}'
+
+    def tabulate(self, key: tuple) -> np.ndarray:
+        """
+        Gets the table of a function for the current parameter values.  The
+        table is only recomputed if the function's parameters have changed.
+
+        Parameters
+        ----------
+        key : tuple
+            ('F', symbol), ('rho', symbol) or ('phi', symbol1, symbol2).
+
+        Returns
+        -------
+        numpy.ndarray
+            The tabulated values as listed in the parameter file, i.e.
+            r * phi(r) for the pair functions.
+
+        Raises
+        ------
+        InfeasibleParameters
+            If the table has non-finite values other than at the first grid
+            point.
+        """
+        if key[0] == 'phi':
+            key = ('phi', *sorted(key[1:], key=self.symbols.index))
+        try:
+            function = self.__functions[key]
+        except KeyError as err:
+            raise ValueError(f'No function set for {key}') from err
+
+        values = self.__array[function['slots']]
+        if function['table'] is not None and np.array_equal(values, function['values']):
+            return function['table']
+
+        params = dict(zip(function['params'], values.tolist()))
+        if key[0] == 'F':
+            grid = self.rho_grid
+        else:
+            grid = self.r_grid
+        with np.errstate(all='ignore'):
+            table = np.broadcast_to(np.asarray(function['fxn'](grid, **params), dtype=float),
+                                    grid.shape)
+            if key[0] == 'phi':
+                table = grid * table
+            else:
+                table = table.copy()
+
+        # Values at r = 0 or rho = 0, such as of rho * log(rho), are often
+        # singular and are replaced by the next grid value
+        if not np.isfinite(table[0]):
+            table[0] = table[1]
+        if not np.all(np.isfinite(table)):
+            raise InfeasibleParameters(f'non-finite values in the table of {key}')
+
+        function['table'] = table
+        function['text'] = None
+        function['values'] = values
+        return table
+
+    def __table_text(self, key) -> str:
+        """Gets the formatted text of a function table"""
+        table = self.tabulate(key)
+        function = self.__functions[key]
+        if function['text'] is None:
+            n = len(table)
+            perline = self._values_per_line
+            line = ' '.join([self._value_format] * perline) + '\n'
+            template = line * (n // perline)
+            if n % perline > 0:
+                template += ' '.join([self._value_format] * (n % perline)) + '\n'
+            function['text'] = template % tuple(table.tolist())
+        return function['text']
+
+    def build_paramfile(self) -> str:
+        """
+        Build a parameter file.  Only the tables of functions whose
+        parameters changed since the last build are recomputed.
+        """
+        for symbol, element in self.__elements.items():
+            if element is None:
+                raise ValueError(f'No element information set for {symbol}')
+
+        lines = [
+            f'# {self.header}\n',
+            '# eam/alloy setfl file\n',
+            '#\n',
+            f'{len(self.symbols)} {" ".join(self.symbols)}\n',
+            f'{self.nrho} {self.drho!r} {self.nr} {self.dr!r} {self.cutoff!r}\n',
+        ]
+        for symbol in self.symbols:
+            number, mass, alat, lattice = self.__elements[symbol]
+            lines.append(f'{number} {mass!r} {alat!r} {lattice}\n')
+            lines.append(self.__table_text(('F', symbol)))
+            lines.append(self.__table_text(('rho', symbol)))
+        for i, symbol1 in enumerate(self.symbols):
+            for symbol2 in self.symbols[:i + 1]:
+                lines.append(self.__table_text(('phi', symbol2, symbol1)))
+
+        return ''.join(lines)
+
+    def build_potential_object(self,
+                               filename: Union[str, Path]) -> PotentialLAMMPS:
+        """
+        Creates a PotentialLAMMPS object allowing for direct integration of the
+        parameter file into atomman.
+
+        Parameters
+        ----------
+        filename : str or Path
+            The filename/path where the parameter file is expected to be found.
+        """
+        masses = []
+        for symbol in self.symbols:
+            element = self.__elements[symbol]
+            masses.append(None if element is None else element[1])
+
+        potential = PotentialLAMMPS.paramfile(filename, pair_style='eam/alloy',
+                                              elements=self.symbols, symbols=self.symbols,
+                                              masses=masses)
+
+        return potential
+
+    def save_paramfile(self,
+                       filename: Union[str, Path] = None,
+                       return_potential: bool = False):
+        """
+        Builds and saves a parameter file
+
+        Parameters
+        ----------
+        filename : str, Path or None, optional
+            The filename/path where the parameter file will be saved.
+            If None (default) will save to the local directory as
+            "<symbols>.eam.alloy".
+        return_potential : bool, optional
+            Setting this to True will generate a PotentialLAMMPS object
+            allowing for direct integration of the parameter file into
+            atomman. Default value is None.
+
+        Returns
+        -------
+        potentials.record.PotentialLAMMPS
+            atomman-compatible PotentialLAMMPS object.  Returned if
+            return_potential is True.
+        """
+        if filename is None:
+            filename = f'{"".join(self.symbols)}.eam.alloy'
+
+        # Only write if the contents differ from the last save to filename
+        paramfile = self.build_paramfile()
+        saved = (str(Path(filename).resolve()), paramfile)
+        if self.__saved_paramfile != saved or not Path(filename).is_file():
+            with open(filename, 'w') as f:
+                f.write(paramfile)
+            self.__saved_paramfile = saved
+
+        if return_potential:
+            return self.build_potential_object(filename)
+
+    @property
+    def parameter_array(self) -> np.ndarray:
+        """
+        numpy.ndarray: The values of all function parameters in the order
+        of parameter_names.  Use the update methods to change values.
+        """
+        return self.__array
+
+    def compile_parameter_map(self, names: list) -> np.ndarray:
+        """
+        Resolves parameter names to their positions in the parameter array.
+        Results are cached so repeated calls with the same names are fast.
+
+        Parameters
+        ----------
+        names : list
+            The names of the parameters, such as 'Cu_F_F0', 'Cu_rho_beta'
+            or 'Cu_Ni_phi_alpha'.
+
+        Returns
+        -------
+        numpy.ndarray
+            The parameter array index of each name.
+        """
+        key = tuple(names)
+        if key in self.__param_maps:
+            return self.__param_maps[key]
+
+        slots = np.empty(len(names), dtype=int)
+        for i, name in enumerate(names):
+            try:
+                slots[i] = self.__slots[name]
+            except KeyError as err:
+                raise ValueError(f'Unknown parameter name {name}') from err
+
+        self.__param_maps[key] = slots
+        return slots
+
+    def update_parameter_array(self,
+                               names: list,
+                               values: npt.ArrayLike):
+        """
+        Fast vectorized update of multiple parameter values.
+
+        Parameters
+        ----------
+        names : list
+            The names of the parameters to update.
+        values : array-like object
+            The new values for the named parameters.
+        """
+        slots = self.compile_parameter_map(names)
+        self.__array[slots] = np.asarray(values, dtype=float)
+
+    def update_parameter_values(self, **kwargs):
+        """
+        Convenience function for easily updating any of the parameter values.
+
+        Parameters
+        ----------
+        **kwargs : float
+            The names and values of any parameters to update.
+        """
+        self.update_parameter_array(list(kwargs.keys()), list(kwargs.values()))
+
+    def get_parameter_value(self, name: str) -> float:
+        """
+        Convenience function for easily fetching any of the parameter values
+        based on its name.
+
+        Parameters
+        ----------
+        name : str
+            The name of the parameter to get.
+        """
+        return self.get_parameter_values([name])[0]
+
+    def get_parameter_values(self, names: list) -> list:
+        """
+        Convenience function for easily fetching multiple parameter values
+        based on their names.
+
+        Parameters
+        ----------
+        names : list
+            The names of the parameters to get.
+        """
+        slots = self.compile_parameter_map(names)
+        return self.__array[slots].tolist()
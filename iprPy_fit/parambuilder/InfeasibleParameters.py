@@ -0,0 +1,7 @@
+class InfeasibleParameters(ValueError):
+    """
+    Raised when parameter values cannot be turned into a valid parameter
+    file, such as non-positive sources of a geometric ParameterMap rule or
+    non-finite EAMAlloy tables.  minfxn() gives such trial parameters a penalty error rather than
+    stopping the fit.
+    """
@@ -0,0 +1,264 @@
+from typing import Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from . import InfeasibleParameters
+
+class ParameterMap():
+    """
+    Maps a reduced vector of free parameters onto the full set of potential
+    parameters.  Each full parameter can be set directly by a free
+    parameter, tied to a free parameter, mixed from multiple free parameters
+    or fixed to a constant.  The rules are compiled into a matrix and offset
+    so that expanding a free parameter vector is a single matrix operation.
+
+    A ParameterMap can be given as the params of minimize() to optimize only
+    the free parameters.
+    """
+    def __init__(self,
+                 free: Union[list, dict, None] = None):
+        """
+        Initializes a ParameterMap.
+
+        Parameters
+        ----------
+        free : list or dict, optional
+            Initial free parameters to add.  Each is also assigned to the full
+            parameter of the same name.  If dict, the values are the fitting
+            bounds.
+        """
+        self.__free = []
+        self.__free_values = {}
+        self.__free_bounds = {}
+        self.__rules = {}
+        self.__compiled = None
+
+        if isinstance(free, dict):
+            for name, bounds in free.items():
+                self.add_free(name, bounds=bounds)
+        elif free is not None:
+            for name in free:
+                self.add_free(name)
+
+    @property
+    def free_names(self) -> list:
+        """list: The names of the free parameters in vector order"""
+        return list(self.__free)
+
+    @property
+    def names(self) -> list:
+        """list: The names of the full parameters set by the map"""
+        return list(self.__rules.keys())
+
+    @property
+    def bounds(self) -> Optional[list]:
+        """list or None: The bounds of the free parameters, if all are given"""
+        if len(self.__free_bounds) < len(self.__free):
+            return None
+        return [self.__free_bounds[name] for name in self.__free]
+
+    def add_free(self,
+                 name: str,
+                 value: Optional[float] = None,
+                 bounds: Optional[tuple] = None,
+                 assign: bool = True):
+        """
+        Adds a free parameter.
+
+        Parameters
+        ----------
+        name : str
+            The name of the free parameter.
+        value : float, optional
+            The initial value of the free parameter.  Required if name is not
+            a parameter of the parambuilder.
+        bounds : tuple, optional
+            The (min, max) fitting bounds for the free parameter.
+        assign : bool, optional
+            If True (default), the free parameter directly sets the full
+            parameter of the same name.
+        """
+        if name in self.__free:
+            raise ValueError(f'free parameter {name} already defined')
+        self.__free.append(name)
+        if value is not None:
+            self.__free_values[name] = value
+        if bounds is not None:
+            self.__free_bounds[name] = bounds
+        if assign:
+            self.__set_rule(name, ('linear', [name], [1.0], 0.0))
+
+    def tie(self,
+            target: str,
+            source: str,
+            scale: float = 1.0,
+            offset: float = 0.0):
+        """
+        Ties a full parameter to a free parameter: target = scale * source + offset.
+
+        Parameters
+        ----------
+        target : str
+            The name of the full parameter to set.
+        source : str
+            The name of the free parameter to tie to.
+        scale : float, optional
+            Multiplier applied to the source value.  Default value is 1.0.
+        offset : float, optional
+            Constant added to the scaled source value.  Default value is 0.0.
+        """
+        self.__set_rule(target, ('linear', [source], [scale], offset))
+
+    def mix(self,
+            target: str,
+            sources: list,
+            coefficients: Optional[npt.ArrayLike] = None,
+            rule: str = 'arithmetic',
+            offset: float = 0.0):
+        """
+        Sets a full parameter by mixing free parameters, such as for cross
+        interaction terms.
+
+        Parameters
+        ----------
+        target : str
+            The name of the full parameter to set.
+        sources : list
+            The names of the free parameters to mix.
+        coefficients : array-like object, optional
+            The mixing coefficients.  Default values are 1/len(sources),
+            i.e. the arithmetic or geometric mean.
+        rule : str, optional
+            'arithmetic' gives target = sum(c_i * source_i) + offset.
+            'geometric' gives target = prod(source_i ** c_i) and requires
+            positive source values.  Default value is 'arithmetic'.
+        offset : float, optional
+            Constant added for the arithmetic rule.  Default value is 0.0.
+        """
+        if coefficients is None:
+            coefficients = np.full(len(sources), 1.0 / len(sources))
+        if len(coefficients) != len(sources):
+            raise ValueError('coefficients and sources must be the same length')
+        if rule == 'arithmetic':
+            self.__set_rule(target, ('linear', list(sources), list(coefficients), offset))
+        elif rule == 'geometric':
+            if offset != 0.0:
+                raise ValueError('offset not supported for geometric rule')
+            self.__set_rule(target, ('geometric', list(sources), list(coefficients), 0.0))
+        else:
+            raise ValueError(f'unknown mixing rule {rule}')
+
+    def fix(self,
+            target: str,
+            value: float):
+        """
+        Fixes a full parameter to a constant value.
+
+        Parameters
+        ----------
+        target : str
+            The name of the full parameter to set.
+        value : float
+            The constant value.
+        """
+        self.__set_rule(target, ('linear', [], [], value))
+
+    def __set_rule(self, target, rule):
+        """Stores a rule and discards any compiled transform"""
+        self.__rules[target] = rule
+        self.__compiled = None
+
+    def compile(self):
+        """
+        Compiles the rules into the matrices used by expand().
+
+        Returns
+        -------
+        matrix : numpy.ndarray
+            The (nnames, nfree) linear coefficients.
+        offset : numpy.ndarray
+            The (nnames,) constant offsets.
+        geometric : numpy.ndarray
+            The (nnames,) bool mask of the names set by geometric rules.  For
+            these, the matrix rows are applied to the log of the free values
+            and the result is exponentiated.
+        """
+        if self.__compiled is not None:
+            return self.__compiled
+
+        column = {name: i for i, name in enumerate(self.__free)}
+        matrix = np.zeros((len(self.__rules), len(self.__free)))
+        offset = np.zeros(len(self.__rules))
+        geometric = np.zeros(len(self.__rules), dtype=bool)
+
+        for i, (target, (style, sources, coefficients, const)) in enumerate(self.__rules.items()):
+            for source, coefficient in zip(sources, coefficients):
+                if source not in column:
+                    raise ValueError(f'{target} depends on {source} which is not a free parameter')
+                matrix[i, column[source]] += coefficient
+            offset[i] = const
+            geometric[i] = style == 'geometric'
+
+        self.__compiled = (matrix, offset, geometric)
+        return self.__compiled
+
+    def expand(self, free_values: npt.ArrayLike) -> np.ndarray:
+        """
+        Computes the full parameter values from the free parameter values.
+
+        Parameters
+        ----------
+        free_values : array-like object
+            The values of the free parameters in free_names order.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values of the full parameters in names order.
+
+        Raises
+        ------
+        InfeasibleParameters
+            If a source of a geometric rule is not positive.
+        """
+        matrix, offset, geometric = self.compile()
+        free_values = np.asarray(free_values, dtype=float)
+
+        values = matrix @ free_values + offset
+        if np.any(geometric):
+            # Only the sources of the geometric rules need to be positive
+            geomatrix = matrix[geometric]
+            used = np.any(geomatrix != 0.0, axis=0)
+            sources = free_values[used]
+            if np.any(sources <= 0.0):
+                names = np.asarray(self.__free)[used][sources <= 0.0]
+                raise InfeasibleParameters(f'geometric mixing sources must be positive: {", ".join(names)}')
+            values[geometric] = np.exp(geomatrix[:, used] @ np.log(sources))
+        return values
+
+    def initial_values(self, parambuilder) -> np.ndarray:
+        """
+        Gets the starting values of the free parameters.
+
+        Parameters
+        ----------
+        parambuilder
+            The parambuilder to get values from for free parameters that were
+            not given an initial value.
+
+        Returns
+        -------
+        numpy.ndarray
+            The free parameter values in free_names order.
+        """
+        values = np.empty(len(self.__free))
+        missing = [name for name in self.__free if name not in self.__free_values]
+        if len(missing) > 0:
+            builder_values = dict(zip(missing, parambuilder.get_parameter_values(missing)))
+        for i, name in enumerate(self.__free):
+            if name in self.__free_values:
+                values[i] = self.__free_values[name]
+            else:
+                values[i] = builder_values[name]
+        return values
@@ -3,6 +3,10 @@ import itertools
 from pathlib import Path
 
 from typing import Union, Optional
+
+import numpy as np
+import numpy.typing as npt
+
 from yabadaba.record import Record
 from yabadaba.tools import aslist
 from potentials.record.PotentialLAMMPS import PotentialLAMMPS
@@ -10,6 +14,8 @@ from potentials.record.PotentialLAMMPS import PotentialLAMMPS
 from DataModelDict import DataModelDict as DM
 from DataModelDict import uber_open_rmode
 
+from .Constraints import Constraints
+
 class TersoffModCInteraction(Record):
     """
     Record subclass representing the parameters of a single three symbol
@@ -44,6 +50,11 @@ class TersoffModCInteraction(Record):
     def modelroot(self):
         """str: The root element of the content"""
         return 'interaction'
+
+    @property
+    def parameter_names(self) -> list:
+        """list: The names of the interaction's numeric parameters in file order"""
+        return [valobj.name for valobj in self.value_objects[3:]]
     
     ############################# Define Values  ##############################
 
@@ -136,7 +147,26 @@ class TersoffModCInteraction(Record):
 class TersoffModC(Record):
     """
     Record for reading and generating a tersoff.modc potential parameter file.
+
+    For fast updates during fitting, the parameter values of all interactions
+    are also stored in a numpy array that the update and get methods work on.
+    The values are copied back to the interaction records by sync_values(),
+    which build_model() and get_interaction() call automatically.  Changes
+    made directly to the interaction records are picked up the next time the
+    array is used after calling get_interaction() or reset_parameter_array().
     """
+    # Parameter array and file rendering caches
+    _param_array = None
+    _param_columns = None
+    _param_rows = None
+    _param_maps = None
+    _paramfile_cache = None
+    _saved_paramfile = None
+
+    # Format for the three parameter file lines of each interaction
+    _paramline_format = ('{} {:.8f} {:.8f} {:.8f} {:.8f}\n'
+                         '{} {:.8f} {:.8f} {:.8f} {:.8f} {:.8f} {:.8f}\n'
+                         '{:.8f} {:.8f} {:.8f} {:.8f} {:.8f} {:.8f} {:.8f}')
     def __init__(self,
                  model: Union[str, io.IOBase, DM, None] = None,
                  name: Optional[str] = None,
@@ -219,12 +249,45 @@ class TersoffModC(Record):
         self._add_value('record', 'interactions', recordclass=TersoffModCInteraction,
                         description='Interaction parameter sets')
 
+    def load_model(self,
+                   model: Union[str, io.IOBase, DM],
+                   name: Optional[str] = None):
+        """
+        Loads record contents from a given model.
+
+        Parameters
+        ----------
+        model : str, file-like object, or DataModelDict
+            The model contents of the record to load.
+        name : str, optional
+            The name to assign to the record.  Often inferred from other
+            attributes if not given.
+        """
+        super().load_model(model, name=name)
+        self.reset_parameter_array(clear_maps=True)
+
+    def build_model(self) -> DM:
+        """
+        Generates and returns model content based on the values set to object.
+        """
+        self.sync_values()
+        return super().build_model()
+
+    def __reduce__(self):
+        """Allows pickling by rebuilding the record from its model"""
+        try:
+            name = self.name
+        except AttributeError:
+            name = None
+        return (_rebuild_record, (type(self), self.build_model(), name))
+
     def add_interaction(self, **kwargs):
         """Creates a new interaction parameter set and adds it to the interaction list"""
         # Create new interaction object
         newinteraction = TersoffModCInteraction(**kwargs)
         
         # Verify that the new interaction's symbols are different than the old interactions
+        self.sync_values()
         for interaction in self.interactions:
             if ((interaction.symbol1 == newinteraction.symbol1) and
                 (interaction.symbol2 == newinteraction.symbol2) and
@@ -232,6 +295,7 @@ class TersoffModC(Record):
                 raise ValueError(f'Interaction parameters already exist for {newinteraction.symbol1}-{newinteraction.symbol2}-{newinteraction.symbol3}')
 
         self.interactions.append(newinteraction)
+        self.reset_parameter_array(clear_maps=True)
 
     def add_all_interactions(self, symbols):
         """Auto creates empty interaction lines based on unique elemental symbols"""
@@ -240,6 +304,10 @@ class TersoffModC(Record):
 
     def get_interaction(self, symbol1, symbol2, symbol3):
         """Return the interaction parameter set for the given model symbols"""
+        # Sync values and allow for the returned interaction to be modified
+        self.sync_values()
+        self.reset_parameter_array()
+
         for interaction in self.interactions:
             if ((interaction.symbol1 == symbol1) and
                 (interaction.symbol2 == symbol2) and
@@ -274,8 +342,13 @@ class TersoffModC(Record):
 
     def build_paramfile(self):
         """
-        Build a parameter file.
+        Build a parameter file.  The file contents are cached and only
+        rebuilt when the header or parameter values change.
         """
+        array = self.parameter_array
+        if self._paramfile_cache is not None and self._paramfile_cache[0] == self.header:
+            return self._paramfile_cache[1]
+
         lines = [
             f'# {self.header}',
             '#',
@@ -284,10 +357,13 @@ class TersoffModC(Record):
             '# beta_ters lambda2 B R D lambda1 A',
             '# n c1 c2 c3 c4 c5 c0',
         ]
-        for interaction in self.interactions:
-            lines.extend(interaction.build_paramlines())
+        for symbols, row in zip(self._param_rows, array):
+            prefix = f'{symbols[0]:2} {symbols[1]:2} {symbols[2]:2}'
+            lines.append(self._paramline_format.format(prefix, *row[:4], int(row[4]), *row[5:]))
         
-        return '\n'.join(lines)
+        paramfile = '\n'.join(lines)
+        self._paramfile_cache = (self.header, paramfile)
+        return paramfile
     
     def build_potential_object(self,
                                filename: Union[str, Path]) -> PotentialLAMMPS:
@@ -339,12 +415,141 @@ class TersoffModC(Record):
         """
         if filename is None:
             filename = f'{self.name}.tersoff.modc'
-        with open(filename, 'w') as f:
-            f.write(self.build_paramfile())
+        
+        # Only write if the contents differ from the last save to filename
+        paramfile = self.build_paramfile()
+        saved = (str(Path(filename).resolve()), paramfile)
+        if self._saved_paramfile != saved or not Path(filename).is_file():
+            with open(filename, 'w') as f:
+                f.write(paramfile)
+            self._saved_paramfile = saved
 
         if return_potential:
             return self.build_potential_object(filename)
 
+    @property
+    def parameter_array(self) -> np.ndarray:
+        """
+        numpy.ndarray: The (ninteractions, 18) array of all interaction
+        parameter values.  Use the update methods to change values.
+        """
+        return self._build_parameter_array()
+
+    def _build_parameter_array(self) -> np.ndarray:
+        """
+        Builds the parameter array from the interaction records if it does
+        not exist, along with its row and column labels.  Returns the array.
+        """
+        if self._param_array is None:
+            interactions = self.interactions
+            self._param_rows = [(i.symbol1, i.symbol2, i.symbol3) for i in interactions]
+            if len(interactions) > 0:
+                self._param_columns = interactions[0].parameter_names
+            else:
+                self._param_columns = TersoffModCInteraction().parameter_names
+
+            array = np.empty((len(interactions), len(self._param_columns)))
+            for i, interaction in enumerate(interactions):
+                for j, valobj in enumerate(interaction.value_objects[3:]):
+                    array[i, j] = valobj.value
+            self._param_array = array
+            self._paramfile_cache = None
+
+        return self._param_array
+
+    def reset_parameter_array(self, clear_maps: bool = False):
+        """
+        Discards the parameter array so that it is rebuilt from the
+        interaction records the next time it is used.
+
+        Parameters
+        ----------
+        clear_maps : bool, optional
+            If True, compiled parameter maps are also discarded.  This is
+            needed if interactions are added or removed.
+        """
+        self._param_array = None
+        self._paramfile_cache = None
+        if clear_maps:
+            self._param_maps = None
+
+    def sync_values(self):
+        """
+        Copies the values in the parameter array to the interaction records.
+        """
+        if self._param_array is None:
+            return
+        for interaction, row in zip(self.interactions, self._param_array):
+            for valobj, value in zip(interaction.value_objects[3:], row):
+                valobj.value = value
+
+    def compile_parameter_map(self, names: list) -> np.ndarray:
+        """
+        Resolves parameter names to their positions in the flattened
+        parameter array.  Results are cached so repeated calls with the same
+        names are fast.
+
+        Parameters
+        ----------
+        names : list
+            The long names of the parameters.  The names
+            combine the three symbol models and the parameter name
+            delimited by underscores.  For example, 'Si_C_Si_beta' refers to
+            the beta value of the Si-C-Si interaction.
+
+        Returns
+        -------
+        numpy.ndarray
+            The flat parameter array index of each name.
+        """
+        key = tuple(names)
+        if self._param_maps is None:
+            self._param_maps = {}
+        elif key in self._param_maps:
+            return self._param_maps[key]
+        
+        self._build_parameter_array()
+        ncols = len(self._param_columns)
+        slots = np.empty(len(names), dtype=int)
+        for i, name in enumerate(names):
+            terms = name.split('_')
+            symbols = tuple(terms[0:3])
+            try:
+                row = self._param_rows.index(symbols)
+            except ValueError as err:
+                raise ValueError(f'No interaction parameters found for {symbols[0]}-{symbols[1]}-{symbols[2]}') from err
+            try:
+                col = self._param_columns.index('_'.join(terms[3:]))
+            except ValueError as err:
+                raise ValueError(f'Unknown parameter name {name}') from err
+            slots[i] = row * ncols + col
+
+        self._param_maps[key] = slots
+        return slots
+
+    def update_parameter_array(self,
+                               names: list,
+                               values: npt.ArrayLike):
+        """
+        Fast vectorized update of multiple parameter values.
+
+        Parameters
+        ----------
+        names : list
+            The long names of the parameters to update.  The names
+            combine the three symbol models and the parameter name
+            delimited by underscores.  For example, 'Si_C_Si_beta' refers to
+            the beta value of the Si-C-Si interaction.
+        values : array-like object
+            The new values for the named parameters.
+        """
+        slots = self.compile_parameter_map(names)
+        flat = self.parameter_array.reshape(-1)
+        values = np.asarray(values, dtype=float)
+        if not np.array_equal(flat[slots], values):
+            flat[slots] = values
+            self._paramfile_cache = None
+
     def update_parameter_values(self, **kwargs):
         """
         Convenience function for easily updating any of the parameter values.
@@ -357,9 +562,7 @@ class TersoffModC(Record):
             delimited by underscores.  For example, 'Si_C_Si_beta' will alter
             the beta value of the Si-C-Si interaction.
         """
-        for name, value in kwargs.items():
-            terms = name.split('_')
-            self.get_interaction(*terms[0:3]).set_values(**{'_'.join(terms[3:]): value})
+        self.update_parameter_array(list(kwargs.keys()), list(kwargs.values()))
             
     def get_parameter_value(self, name):
         """
@@ -374,9 +577,66 @@ class TersoffModC(Record):
             delimited by underscores.  For example, 'Si_C_Si_beta' will get
             the beta value of the Si-C-Si interaction.
         """
-        terms = name.split('_')
-        return getattr(self.get_interaction(*terms[0:3]), '_'.join(terms[3:]))
+        return self.get_parameter_values([name])[0]
     
+    def constraints(self,
+                    mode: str = 'penalty',
+                    penalty: float = 1e10,
+                    margin: float = 1e-6,
+                    cross: bool = True,
+                    cross_tol: float = 1e-8) -> Constraints:
+        """
+        Builds the standard constraints for the current interactions.  Each
+        interaction gets the checks that LAMMPS applies when reading a
+        tersoff/mod/c file, which otherwise stop the run with an "Illegal
+        Tersoff parameter" error: beta (the power m) of 1 or 3, R >= D, and
+        non-negative eta, beta_ters, lambda1, lambda2, A, B and D.  D is also
+        kept above margin as a zero cutoff width divides by zero.  The beta
+        constraint is a function constraint, so it is penalized rather than
+        projected and beta is best held fixed.  More constraints can be added
+        to the returned object.
+
+        Parameters
+        ----------
+        mode : str, optional
+            The Constraints mode, 'penalty' (default) or 'project'.
+        penalty : float, optional
+            The base error of infeasible points.  Default value is 1e10.
+        margin : float, optional
+            The minimum value of D.  Default value is 1e-6.
+        cross : bool, optional
+            If True (default), the cutoff R and D of each i-j-k interaction
+            with j != k are also constrained to equal those of the i-k-k
+            interaction so that the three-body and pair cutoffs of the i-k
+            bond agree.
+        cross_tol : float, optional
+            The allowed difference for the cross constraints.  Default value
+            is 1e-8.
+
+        Returns
+        -------
+        Constraints
+        """
+        constraints = Constraints(mode=mode, penalty=penalty)
+        self._build_parameter_array()
+        for symbols in self._param_rows:
+            prefix = '_'.join(symbols)
+            R, D = f'{prefix}_R', f'{prefix}_D'
+            constraints.add_linear({R: 1.0, D: -1.0}, 0.0, f'{R} >= {D}')
+            constraints.add_bounds(D, min=margin)
+            for name in ['eta', 'beta_ters', 'lambda1', 'lambda2', 'A', 'B']:
+                constraints.add_bounds(f'{prefix}_{name}', min=0.0)
+            constraints.add_function(_beta_values, [f'{prefix}_beta'],
+                                     f'{prefix}_beta in (1, 3)')
+
+            if cross and symbols[1] != symbols[2]:
+                pair = '_'.join([symbols[0], symbols[2], symbols[2]])
+                if (symbols[0], symbols[2], symbols[2]) in self._param_rows:
+                    constraints.add_equal(R, f'{pair}_R', cross_tol)
+                    constraints.add_equal(D, f'{pair}_D', cross_tol)
+
+        return constraints
+
     def get_parameter_values(self, names):
         """
         Convenience function for easily fetching multiple parameter values
@@ -390,7 +650,18 @@ class TersoffModC(Record):
             delimited by underscores.  For example, 'Si_C_Si_beta' will get
             the beta value of the Si-C-Si interaction.
         """
-        values = []
-        for name in names:
-            values.append(self.get_parameter_value(name))
-        return values
\ No newline at end of file
+        slots = self.compile_parameter_map(names)
+        values = self.parameter_array.reshape(-1)[slots].tolist()
+        for i, name in enumerate(names):
+            if name.endswith('_beta_ters'):
+                values[i] = int(values[i])
+        return values
+
+def _beta_values(values):
+    """Constraint that the Tersoff power m (beta) is 1 or 3"""
+    beta = values[0]
+    return -min(abs(beta - 1.0), abs(beta - 3.0))
+
+def _rebuild_record(recordclass, model, name):
+    """Unpickles a record from its model"""
+    return recordclass(model=model, name=name, noname=name is None)
@@ -1,3 +1,8 @@
+from .InfeasibleParameters import InfeasibleParameters
+from .Constraints import Constraints
 from .TersoffModC import TersoffModC, TersoffModCInteraction
+from .EAMAlloy import EAMAlloy
+from .ParameterMap import ParameterMap
 
-__all__ = ['TersoffModC', 'TersoffModCInteraction']
\ No newline at end of file
+__all__ = ['TersoffModC', 'TersoffModCInteraction', 'EAMAlloy', 'ParameterMap',
+           'Constraints', 'InfeasibleParameters']
\ No newline at end of file
@@ -1,4 +1,7 @@
 from potentials.record import recordmanager
 
+# atomman defines the system_model Value style used by ReferenceStructure
+import atomman
+
 # Add the modular Record styles
-recordmanager.import_style('reference_structure', '.ReferenceStructure', __name__)
\ No newline at end of file
+recordmanager.import_style('reference_structure', '.ReferenceStructure', __name__)
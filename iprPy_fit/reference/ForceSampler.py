@@ -0,0 +1,149 @@
+from typing import Optional
+
+import numpy as np
+
+class ForceSampler():
+    """
+    Selects a fixed subset of the atoms of large structures whose forces are
+    compared during fitting.  The atoms of a structure are stratified by
+    their coordination number, which separates surface and defect atoms from
+    bulk ones, and a seeded random sample is drawn from each stratum.  Each
+    sampled atom gets the importance weight N_h / n_h of its stratum so that
+    the force error of the sample is an unbiased estimate of the error over
+    all atoms.
+
+    The sampled reference forces are given to the fitting functions through
+    the 'F_atoms' and 'F_importance' reference values added by sample().
+    EvaluationPlan.from_weights() then limits the extracted forces to the
+    sampled atoms and structure_error() applies the importance weights.
+    """
+    def __init__(self,
+                 max_atoms: int = 500,
+                 cutoff: float = 3.0,
+                 min_per_stratum: int = 2,
+                 seed: int = 0):
+        """
+        Initializes a ForceSampler.
+
+        Parameters
+        ----------
+        max_atoms : int, optional
+            Structures with more atoms than this are sampled down to this
+            many atoms.  Default value is 500.
+        cutoff : float, optional
+            The neighbor cutoff distance used to find the coordination
+            numbers, in Angstroms.  The default value of 3.0 counts the first
+            neighbor shell of Si.
+        min_per_stratum : int, optional
+            The minimum number of atoms sampled from each coordination
+            stratum, or all of them if the stratum is smaller.  Default value
+            is 2.
+        seed : int, optional
+            The random seed.  Each structure's sample is drawn from the seed
+            and the structure's index, so samples are reproducible.  Default
+            value is 0.
+        """
+        if max_atoms < 1:
+            raise ValueError('max_atoms must be at least 1')
+        self.max_atoms = max_atoms
+        self.cutoff = cutoff
+        self.min_per_stratum = min_per_stratum
+        self.seed = seed
+
+    def select(self,
+               system,
+               index: int = 0) -> Optional[tuple]:
+        """
+        Selects the sampled atoms of one structure.
+
+        Parameters
+        ----------
+        system : atomman.System
+            The structure.
+        index : int, optional
+            The structure's index, which is combined with the seed.
+
+        Returns
+        -------
+        atoms : numpy.ndarray
+            The sorted indices of the sampled atoms.
+        importance : numpy.ndarray
+            The importance weight of each sampled atom.
+
+        None is returned instead if the structure is not sampled.
+        """
+        if system.natoms <= self.max_atoms:
+            return None
+        rng = np.random.default_rng([self.seed, index])
+
+        # Stratify the atoms by coordination number
+        coord = system.neighborlist(cutoff=self.cutoff).coord
+        strata, stratum = np.unique(coord, return_inverse=True)
+        sizes = np.bincount(stratum)
+
+        # Allocate the sample to the strata
+        counts = np.minimum(sizes, self.min_per_stratum)
+        remaining = self.max_atoms - counts.sum()
+        if remaining > 0:
+            capacity = sizes - counts
+            quota = remaining * capacity / capacity.sum()
+            extra = np.floor(quota).astype(int)
+            leftover = remaining - extra.sum()
+            extra[np.argsort(extra - quota, kind='stable')[:leftover]] += 1
+            counts += extra
+
+        atoms = []
+        importance = []
+        for h in range(len(strata)):
+            members = np.flatnonzero(stratum == h)
+            chosen = rng.choice(members, counts[h], replace=False)
+            atoms.append(chosen)
+            importance.append(np.full(counts[h], sizes[h] / counts[h]))
+        atoms = np.concatenate(atoms)
+        importance = np.concatenate(importance)
+
+        order = np.argsort(atoms)
+        return atoms[order], importance[order]
+
+    def sample(self,
+               systems: list,
+               ref_values: dict) -> dict:
+        """
+        Samples the reference forces of the structures.
+
+        Parameters
+        ----------
+        systems : list of atomman.System
+            The reference structures.
+        ref_values : dict
+            The reference values, with the forces of all atoms in 'F'.
+
+        Returns
+        -------
+        dict
+            A copy of ref_values where 'F' has the reference forces of the
+            sampled atoms, 'F_atoms' has the sampled atom indices and
+            'F_importance' has their importance weights.  Both are None for
+            structures that are not sampled.
+        """
+        if len(systems) != len(ref_values['F']):
+            raise ValueError('systems and reference forces have different lengths')
+        sampled = dict(ref_values)
+        sampled['F'] = []
+        sampled['F_atoms'] = []
+        sampled['F_importance'] = []
+        for i, (system, forces) in enumerate(zip(systems, ref_values['F'])):
+            selection = self.select(system, i)
+            if selection is None:
+                sampled['F'].append(forces)
+                sampled['F_atoms'].append(None)
+                sampled['F_importance'].append(None)
+                continue
+            atoms, importance = selection
+            if forces is not None:
+                forces = np.asarray(forces)[atoms]
+            sampled['F'].append(forces)
+            sampled['F_atoms'].append(atoms)
+            sampled['F_importance'].append(importance)
+
+        return sampled
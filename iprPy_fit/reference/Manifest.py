@@ -0,0 +1,418 @@
+from typing import Optional, Union
+from pathlib import Path
+import hashlib
+import json
+
+class Manifest():
+    """
+    Index of the reference_structure files in a directory.  Each file is
+    parsed once when the manifest is built, and its family, composition,
+    number of atoms, periodicity, content hash and available reference values
+    are recorded in a small JSON file saved alongside the structures.
+    Subsets of the structures can then be selected from the manifest and only
+    the matching files loaded.
+
+    The manifest only holds content that is the same on every machine, so it
+    can be committed with the structures.  The sizes and modification times
+    of files whose hashes were checked are kept in a separate stat cache
+    file, which should not be committed, so that refresh() can skip
+    unchanged files without hashing them again.
+
+    The family of each file is taken from its name, which is expected to be
+    "<composition>-<family>-<id>.json", e.g. "Si-surface-1234.json".
+    """
+    default_filename = 'manifest.json'
+    stat_filename = '.manifest_stats.json'
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 entries: Optional[list] = None):
+        """
+        Initializes a Manifest.  Use Manifest.build() or Manifest.load() to
+        generate the entries.
+
+        Parameters
+        ----------
+        directory : str or Path
+            The directory containing the reference_structure files.
+        entries : list of dict, optional
+            The manifest entries, one for each file.
+        """
+        self.__directory = Path(directory)
+        if entries is None:
+            entries = []
+        self.__entries = list(entries)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __iter__(self):
+        return iter(self.__entries)
+
+    @property
+    def directory(self) -> Path:
+        """Path: The directory containing the reference_structure files"""
+        return self.__directory
+
+    @property
+    def entries(self) -> list:
+        """list of dict: The manifest entries, one for each file"""
+        return self.__entries
+
+    @staticmethod
+    def entry(path: Union[str, Path]) -> dict:
+        """
+        Parses a reference_structure JSON file and returns its manifest entry.
+
+        Parameters
+        ----------
+        path : str or Path
+            The reference_structure file.
+
+        Returns
+        -------
+        dict
+            The entry with keys 'filename', 'family', 'composition',
+            'symbols', 'natypes', 'natoms', 'pbc', 'sha256', 'size' and
+            'reference_values'.
+        """
+        path = Path(path)
+        content = path.read_bytes()
+        model = json.loads(content)['reference-structure']
+        info = model['system-info']
+        atomic = model['atomic-system']
+
+        # Family is the second field of the file name
+        fields = path.stem.split('-')
+        family = fields[1] if len(fields) > 2 else None
+
+        symbols = info['symbol']
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        # List the reference values that are present, including forces
+        available = []
+        for key, value in model.get('reference_values', {}).items():
+            if value is not None:
+                available.append(key)
+        props = atomic['atoms'].get('property', [])
+        if isinstance(props, dict):
+            props = [props]
+        if 'force' in [prop['name'] for prop in props]:
+            available.append('F')
+
+        return {
+            'filename': path.name,
+            'family': family,
+            'composition': info['composition'],
+            'symbols': symbols,
+            'natypes': int(info['cell']['natypes']),
+            'natoms': int(atomic['atoms']['natoms']),
+            'pbc': [bool(p) for p in atomic['periodic-boundary-condition']],
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'size': len(content),
+            'reference_values': available,
+        }
+
+    @classmethod
+    def build(cls,
+              directory: Union[str, Path],
+              pattern: str = '*.json',
+              save: bool = True) -> 'Manifest':
+        """
+        Builds a manifest by parsing every reference_structure file in a
+        directory.
+
+        Parameters
+        ----------
+        directory : str or Path
+            The directory containing the reference_structure files.
+        pattern : str, optional
+            The glob pattern of the files to include.  Default value is
+            '*.json'.  The manifest file itself is always skipped.
+        save : bool, optional
+            If True (default), the manifest is saved to the directory.
+
+        Returns
+        -------
+        Manifest
+        """
+        directory = Path(directory)
+        entries = []
+        stats = {}
+        for path in sorted(directory.glob(pattern)):
+            if path.name in (cls.default_filename, cls.stat_filename):
+                continue
+            stat = path.stat()
+            entries.append(cls.entry(path))
+            stats[path.name] = [stat.st_size, stat.st_mtime_ns]
+
+        manifest = cls(directory, entries)
+        if save:
+            manifest.save()
+            manifest.__save_stats(stats)
+        return manifest
+
+    @classmethod
+    def load(cls,
+             directory: Union[str, Path],
+             build: bool = True) -> 'Manifest':
+        """
+        Loads the manifest saved in a directory.
+
+        Parameters
+        ----------
+        directory : str or Path
+            The directory containing the reference_structure files.
+        build : bool, optional
+            If True (default), the manifest is built and saved if the
+            directory does not have one.  If False, a missing manifest raises
+            a FileNotFoundError.
+
+        Returns
+        -------
+        Manifest
+        """
+        directory = Path(directory)
+        path = Path(directory, cls.default_filename)
+        if not path.is_file():
+            if build:
+                return cls.build(directory)
+            raise FileNotFoundError(f'no manifest found in {directory}')
+
+        with open(path, encoding='UTF-8') as f:
+            entries = json.load(f)['entries']
+        return cls(directory, entries)
+
+    def save(self):
+        """Saves the manifest to the directory"""
+        path = Path(self.directory, self.default_filename)
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump({'entries': self.entries}, f, indent=1)
+
+    def __load_stats(self) -> dict:
+        """Loads the stat cache, or an empty one if missing or unreadable"""
+        path = Path(self.directory, self.stat_filename)
+        try:
+            with open(path, encoding='UTF-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def __save_stats(self, stats: dict):
+        """Saves the stat cache to the directory"""
+        path = Path(self.directory, self.stat_filename)
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(stats, f)
+
+    def refresh(self,
+                pattern: str = '*.json',
+                save: bool = True) -> list:
+        """
+        Updates the manifest for files that were added, removed or changed
+        since it was built.  Files with the same size and content hash as
+        recorded are not parsed again, and the hash is not recomputed for
+        files whose size and modification time match the stat cache.  The
+        manifest file is only rewritten if entries changed, so refreshing a
+        fresh copy of the directory only builds the stat cache.
+
+        Parameters
+        ----------
+        pattern : str, optional
+            The glob pattern of the files to include.  Default value is
+            '*.json'.
+        save : bool, optional
+            If True (default), the manifest is saved if any entries were
+            updated, and the stat cache is saved if it changed.
+
+        Returns
+        -------
+        list of str
+            The names of the files that were added, removed or changed.
+        """
+        old = {entry['filename']: entry for entry in self.entries}
+        oldstats = self.__load_stats()
+        stats = {}
+        changed = []
+        updated = False
+        entries = []
+        for path in sorted(self.directory.glob(pattern)):
+            if path.name in (self.default_filename, self.stat_filename):
+                continue
+            entry = old.pop(path.name, None)
+            stat = path.stat()
+            stats[path.name] = [stat.st_size, stat.st_mtime_ns]
+
+            # Files only need hashing if their stats differ from the cache
+            if (entry is not None
+                and entry['size'] == stat.st_size
+                and (oldstats.get(path.name) == stats[path.name]
+                     or hashlib.sha256(path.read_bytes()).hexdigest() == entry['sha256'])):
+                entries.append(entry)
+                continue
+
+            new = self.entry(path)
+            if entry is None or entry['sha256'] != new['sha256']:
+                changed.append(path.name)
+            if new != entry:
+                updated = True
+            entries.append(new)
+        changed.extend(old.keys())
+
+        self.__entries = entries
+        if save:
+            if updated or len(changed) > 0:
+                self.save()
+            if stats != oldstats:
+                self.__save_stats(stats)
+        return changed
+
+    def select(self,
+               family: Union[str, list, None] = None,
+               exclude_family: Union[str, list, None] = None,
+               composition: Union[str, list, None] = None,
+               symbols: Union[str, list, None] = None,
+               min_natoms: Optional[int] = None,
+               max_natoms: Optional[int] = None,
+               pbc: Optional[list] = None,
+               require: Union[str, list, None] = None) -> list:
+        """
+        Selects the entries that match all of the given conditions.  For
+        example, all non-surface Si structures with fewer than 500 atoms are
+        selected by select(exclude_family='surface', composition='Si',
+        max_natoms=499).
+
+        Parameters
+        ----------
+        family : str or list, optional
+            The families to include.
+        exclude_family : str or list, optional
+            The families to exclude.
+        composition : str or list, optional
+            The compositions to include.
+        symbols : str or list, optional
+            Only structures whose symbols are all in this list are included.
+        min_natoms : int, optional
+            The minimum number of atoms, inclusive.
+        max_natoms : int, optional
+            The maximum number of atoms, inclusive.
+        pbc : list of bool, optional
+            The periodic boundary conditions that the structures must have.
+        require : str or list, optional
+            The reference values that the structures must have, e.g. 'F'
+            for forces.
+
+        Returns
+        -------
+        list of dict
+            The matching entries, in manifest order.
+        """
+        def aslist(value):
+            if value is None or isinstance(value, list):
+                return value
+            if isinstance(value, str):
+                return [value]
+            return list(value)
+
+        family = aslist(family)
+        exclude_family = aslist(exclude_family)
+        composition = aslist(composition)
+        symbols = aslist(symbols)
+        require = aslist(require)
+        if pbc is not None:
+            pbc = [bool(p) for p in pbc]
+
+        selected = []
+        for entry in self.entries:
+            if family is not None and entry['family'] not in family:
+                continue
+            if exclude_family is not None and entry['family'] in exclude_family:
+                continue
+            if composition is not None and entry['composition'] not in composition:
+                continue
+            if symbols is not None and not set(entry['symbols']).issubset(symbols):
+                continue
+            if min_natoms is not None and entry['natoms'] < min_natoms:
+                continue
+            if max_natoms is not None and entry['natoms'] > max_natoms:
+                continue
+            if pbc is not None and entry['pbc'] != pbc:
+                continue
+            if require is not None and not set(require).issubset(entry['reference_values']):
+                continue
+            selected.append(entry)
+
+        return selected
+
+    def paths(self, entries: Optional[list] = None, **kwargs) -> list:
+        """
+        Returns the file paths of selected entries.
+
+        Parameters
+        ----------
+        entries : list of dict, optional
+            The entries to return paths for.  If not given, the entries are
+            selected using the keyword arguments.
+        **kwargs : any, optional
+            Selection conditions passed to select().
+
+        Returns
+        -------
+        list of Path
+        """
+        if entries is None:
+            entries = self.select(**kwargs)
+        elif len(kwargs) > 0:
+            raise ValueError('entries and selection conditions cannot both be given')
+
+        return [Path(self.directory, entry['filename']) for entry in entries]
+
+    def load_records(self, entries: Optional[list] = None, **kwargs) -> list:
+        """
+        Loads the reference_structure records of selected entries.  Only the
+        matching files are parsed.
+
+        Parameters
+        ----------
+        entries : list of dict, optional
+            The entries to load.  If not given, the entries are selected using
+            the keyword arguments.
+        **kwargs : any, optional
+            Selection conditions passed to select().
+
+        Returns
+        -------
+        list of ReferenceStructure
+        """
+        import yabadaba
+
+        # Make certain the reference_structure style is registered
+        from .. import record
+
+        return [yabadaba.load_record('reference_structure', model=path)
+                for path in self.paths(entries, **kwargs)]
+
+    def verify(self, entries: Optional[list] = None) -> list:
+        """
+        Checks the content hashes of files against the manifest.
+
+        Parameters
+        ----------
+        entries : list of dict, optional
+            The entries to check.  Default value checks all entries.
+
+        Returns
+        -------
+        list of str
+            The names of the files that are missing or whose content changed.
+        """
+        if entries is None:
+            entries = self.entries
+
+        mismatched = []
+        for entry in entries:
+            path = Path(self.directory, entry['filename'])
+            if (not path.is_file()
+                or hashlib.sha256(path.read_bytes()).hexdigest() != entry['sha256']):
+                mismatched.append(entry['filename'])
+        return mismatched
@@ -0,0 +1,232 @@
+from typing import Optional
+from multiprocessing import shared_memory
+
+import numpy as np
+
+class SharedReferenceData():
+    """
+    Publishes the arrays of a list of paramsets and their reference values
+    in a single shared memory block so that worker processes can use them
+    without each getting their own copy.  The atom types, positions,
+    velocities and boxes of the paramsets and the reference energies,
+    pressures and forces are packed into the block once by the parent.
+    Pickling a SharedReferenceData only sends the name of the block and its
+    layout, and unpickling it in a worker attaches to the block and rebuilds
+    the arrays as read-only numpy views without copying.
+
+    A SharedReferenceData behaves as the list of paramsets, so it can be
+    given as the paramsets of PoolEvaluator, IsolatedEvaluator, evaluate(),
+    minimize() and multistart().  The ref_values attribute is a dict that is
+    also pickled as a reference to the block.
+
+    The process that creates the data owns the block and should call
+    unlink() when the workers are done with it, or use it as a context
+    manager.
+    """
+    def __init__(self,
+                 paramsets: list,
+                 ref_values: Optional[dict] = None):
+        """
+        Packs the paramsets and reference values into a new shared memory
+        block.
+
+        Parameters
+        ----------
+        paramsets : list of dict
+            The paramsets as generated by dump_lammps_dynamic_parameters().
+        ref_values : dict, optional
+            The reference values of the paramsets.  Each value is either a
+            sequence of numbers or a sequence of per-structure arrays, such
+            as the forces, with None for missing entries.
+        """
+        if ref_values is None:
+            ref_values = {}
+        nstructures = len(paramsets)
+
+        # Split the paramsets into small metadata and arrays
+        arrays = {}
+        metadata = []
+        natoms = np.array([len(paramset['atype']) for paramset in paramsets])
+        arrays['atom_offsets'] = np.concatenate([[0], np.cumsum(natoms)])
+        arrays['atype'] = np.concatenate([np.asarray(p['atype'], dtype=np.int32)
+                                          for p in paramsets])
+        arrays['x'] = np.concatenate([np.asarray(p['x'], dtype=float).reshape(-1)
+                                      for p in paramsets])
+        arrays['region_params'] = np.array([p['region_params'] for p in paramsets],
+                                           dtype=float).reshape(nstructures, 9)
+        if any(p['v'] is not None for p in paramsets):
+            arrays['v'] = np.concatenate([np.zeros(3 * n) if p['v'] is None
+                                          else np.asarray(p['v'], dtype=float).reshape(-1)
+                                          for p, n in zip(paramsets, natoms)])
+        for paramset in paramsets:
+            metadata.append({key: value for key, value in paramset.items()
+                             if key not in ('atype', 'x', 'v', 'region_params')})
+            metadata[-1]['has_v'] = paramset['v'] is not None
+
+        # Pack the reference values
+        refkeys = {}
+        for key, values in ref_values.items():
+            if len(values) != nstructures:
+                raise ValueError(f'ref_values {key} has a different length than paramsets')
+            if all(value is not None and np.ndim(value) == 0 for value in values):
+                arrays[f'ref.{key}'] = np.asarray(values, dtype=float)
+                refkeys[key] = 'scalar'
+            else:
+                entries = [None if value is None else np.asarray(value) for value in values]
+                present = [entry for entry in entries if entry is not None]
+                dtype = np.result_type(*present) if len(present) > 0 else float
+                sizes = [0 if entry is None else entry.size for entry in entries]
+                arrays[f'ref.{key}'] = np.concatenate([np.zeros(0, dtype=dtype)] +
+                                                      [entry.reshape(-1) for entry in present]).astype(dtype)
+                arrays[f'ref.{key}.offsets'] = np.concatenate([[0], np.cumsum(sizes)])
+                refkeys[key] = [None if entry is None else entry.shape for entry in entries]
+
+        # Lay the arrays out in one block with 8 byte alignment
+        layout = {}
+        nbytes = 0
+        for key, array in arrays.items():
+            layout[key] = (nbytes, array.dtype.str, array.shape)
+            nbytes += -(-array.nbytes // 8) * 8
+
+        self.__shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self.__owner = True
+        self.__layout = layout
+        self.__metadata = metadata
+        self.__refkeys = refkeys
+        self.__attach_views()
+        for key, array in arrays.items():
+            view = self.__views[key]
+            view.flags.writeable = True
+            view[...] = array
+            view.flags.writeable = False
+        self.__build_paramsets()
+
+    def __getstate__(self):
+        """Pickles only the block name and layout"""
+        return dict(name=self.__shm.name, layout=self.__layout,
+                    metadata=self.__metadata, refkeys=self.__refkeys)
+
+    def __setstate__(self, state):
+        """Attaches to an existing block"""
+        self.__shm = shared_memory.SharedMemory(name=state['name'])
+        self.__owner = False
+        self.__layout = state['layout']
+        self.__metadata = state['metadata']
+        self.__refkeys = state['refkeys']
+        self.__attach_views()
+        self.__build_paramsets()
+
+    def __attach_views(self):
+        """Builds the numpy views of the block"""
+        views = {}
+        for key, (offset, dtype, shape) in self.__layout.items():
+            view = np.ndarray(shape, dtype=dtype, buffer=self.__shm.buf, offset=offset)
+            view.flags.writeable = False
+            views[key] = view
+        self.__views = views
+        self.__paramsets = None
+        self.__ref_values = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        if self.__owner:
+            self.unlink()
+
+    def __len__(self) -> int:
+        return len(self.__metadata)
+
+    def __getitem__(self, index: int) -> dict:
+        """
+        Gets a paramset.  The atype, x and v values are views of the block.
+        The same dict is returned each time so that evaluation buffers keyed
+        by the paramset can be reused.
+        """
+        return self.__paramsets[index]
+
+    def __build_paramsets(self):
+        """Builds the paramset dicts from the metadata and views"""
+        self.__paramsets = [self.__build_paramset(i) for i in range(len(self.__metadata))]
+
+    def __build_paramset(self, index: int) -> dict:
+        """Builds a paramset dict from the metadata and views"""
+        views = self.__views
+        start, end = views['atom_offsets'][index:index + 2]
+        paramset = dict(self.__metadata[index])
+        if paramset.pop('has_v'):
+            paramset['v'] = views['v'][3 * start:3 * end]
+        else:
+            paramset['v'] = None
+        paramset['atype'] = views['atype'][start:end]
+        paramset['x'] = views['x'][3 * start:3 * end]
+        paramset['region_params'] = views['region_params'][index].tolist()
+        return paramset
+
+    def __iter__(self):
+        return iter(self.__paramsets)
+
+    @property
+    def name(self) -> str:
+        """str: The name of the shared memory block"""
+        return self.__shm.name
+
+    @property
+    def nbytes(self) -> int:
+        """int: The size of the shared memory block in bytes"""
+        return self.__shm.size
+
+    @property
+    def natoms(self) -> np.ndarray:
+        """numpy.ndarray: The number of atoms in each paramset"""
+        return np.diff(self.__views['atom_offsets'])
+
+    @property
+    def ref_values(self) -> dict:
+        """dict: The reference values as views of the block"""
+        if self.__ref_values is None:
+            ref_values = _SharedRefValues(self)
+            views = self.__views
+            for key, kind in self.__refkeys.items():
+                data = views[f'ref.{key}']
+                if kind == 'scalar':
+                    ref_values[key] = data
+                    continue
+                offsets = views[f'ref.{key}.offsets']
+                ref_values[key] = [None if shape is None else
+                                   data[offsets[i]:offsets[i + 1]].reshape(shape)
+                                   for i, shape in enumerate(kind)]
+            self.__ref_values = ref_values
+        return self.__ref_values
+
+    def close(self):
+        """
+        Releases this process's mapping of the block.  If arrays taken from
+        it are still in use, the mapping is instead released when the
+        process exits.
+        """
+        self.__views = {}
+        self.__paramsets = []
+        self.__ref_values = None
+        try:
+            self.__shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        """Frees the block.  Call once when no process needs it anymore"""
+        self.__shm.unlink()
+
+class _SharedRefValues(dict):
+    """Reference values dict that pickles as a reference to its block"""
+    def __init__(self, shared):
+        super().__init__()
+        self.__shared = shared
+
+    def __reduce__(self):
+        return (_shared_ref_values, (self.__shared,))
+
+def _shared_ref_values(shared):
+    """Rebuilds the reference values from an unpickled SharedReferenceData"""
+    return shared.ref_values
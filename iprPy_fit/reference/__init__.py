@@ -0,0 +1,6 @@
+from .reduce_paramsets import reduce_paramsets
+from .Manifest import Manifest
+from .ForceSampler import ForceSampler
+from .SharedReferenceData import SharedReferenceData
+
+__all__ = ['reduce_paramsets', 'Manifest', 'ForceSampler', 'SharedReferenceData']
@@ -0,0 +1,178 @@
+import numpy as np
+
+def reduce_paramsets(paramsets: list,
+                     symprec: float = 1e-5,
+                     boxprec: float = 1e-8,
+                     reduce_cells: bool = True,
+                     remove_duplicates: bool = True):
+    """
+    Preprocesses a list of paramsets so that only the smallest unique set of
+    structures needs to be evaluated.  Each paramset is checked to see if it
+    is a supercell of a smaller cell obtained by dividing the box vectors
+    along its periodic directions, and then identical structures are
+    collapsed onto a single entry.  Energies, pressures and forces computed
+    for the reduced paramsets can be mapped back to the original list with
+    iprPy_fit.evaluate.expand_results().
+
+    Parameters
+    ----------
+    paramsets : list of dict
+        The paramsets as generated by dump_lammps_dynamic_parameters().
+    symprec : float, optional
+        The fractional coordinate tolerance used when comparing atomic
+        positions.  Default value is 1e-5.
+    boxprec : float, optional
+        The absolute tolerance used when comparing the box region parameters
+        of two structures.  Default value is 1e-8.
+    reduce_cells : bool, optional
+        If True (default), supercells will be reduced to the smallest
+        equivalent cell.
+    remove_duplicates : bool, optional
+        If True (default), identical structures will only be evaluated once.
+
+    Returns
+    -------
+    reduced_paramsets : list of dict
+        The unique, reduced paramsets to evaluate.
+    reduction : dict
+        Maps the reduced paramsets back to the original ones. 'index' gives
+        the reduced paramset index for each original paramset, 'multiplier'
+        gives the ratio of the original to the reduced number of atoms, and
+        'atom_map' lists for each original paramset the reduced atom index
+        associated with each original atom.
+    """
+    scale = int(round(1 / symprec))
+
+    reduced_paramsets = []
+    signatures = {}
+    keymaps = []
+
+    index = np.empty(len(paramsets), dtype=int)
+    multiplier = np.empty(len(paramsets), dtype=int)
+    atom_map = []
+
+    for i, params in enumerate(paramsets):
+
+        # Identify the smallest periodic cell and group atoms to it
+        if reduce_cells:
+            newparams, mult, amap, keys = _reduce_cell(params, scale)
+        else:
+            newparams = params
+            mult = 1
+            amap = np.arange(len(params['atype']))
+            keys = _frac_keys(np.asarray(params['atype'], dtype=np.int64),
+                              _frac(params), np.ones(3, dtype=int), scale)
+
+        # Check if the structure duplicates a previous one
+        signature = _signature(newparams, keys, boxprec)
+        if remove_duplicates and signature in signatures:
+            j = signatures[signature]
+            sort, sortedkeys = keymaps[j]
+            amap = sort[np.searchsorted(sortedkeys, keys)][amap]
+        else:
+            j = len(reduced_paramsets)
+            signatures[signature] = j
+            reduced_paramsets.append(newparams)
+            sort = np.argsort(keys)
+            keymaps.append((sort, keys[sort]))
+
+        index[i] = j
+        multiplier[i] = mult
+        atom_map.append(amap)
+
+    reduction = {}
+    reduction['index'] = index
+    reduction['multiplier'] = multiplier
+    reduction['atom_map'] = atom_map
+
+    return reduced_paramsets, reduction
+
+def _box_matrix(region_params: list) -> np.ndarray:
+    """Builds the box vector matrix from LAMMPS prism region parameters"""
+    xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = region_params
+    return np.array([[xhi - xlo, 0.0, 0.0],
+                     [xy, yhi - ylo, 0.0],
+                     [xz, yz, zhi - zlo]])
+
+def _frac(params: dict) -> np.ndarray:
+    """Computes the fractional coordinates of the atoms in a paramset"""
+    region_params = params['region_params']
+    origin = np.array(region_params[0:6:2])
+    pos = np.asarray(params['x'], dtype=float).reshape(-1, 3)
+    return np.linalg.solve(_box_matrix(region_params).T, (pos - origin).T).T
+
+def _frac_keys(atype: np.ndarray,
+               frac: np.ndarray,
+               mults: np.ndarray,
+               scale: int) -> np.ndarray:
+    """
+    Builds an integer key for each atom by combining its atom type with its
+    quantized fractional coordinates within the cell reduced by mults.
+    """
+    qfrac = np.round(frac * mults * scale).astype(np.int64) % scale
+    return ((atype * scale + qfrac[:, 0]) * scale + qfrac[:, 1]) * scale + qfrac[:, 2]
+
+def _reduce_cell(params: dict,
+                 scale: int):
+    """
+    Finds the smallest cell along each periodic box vector that exactly
+    reproduces the structure and builds the associated reduced paramset.
+    """
+    atype = np.asarray(params['atype'], dtype=np.int64)
+    frac = _frac(params)
+    natoms = len(atype)
+    mults = np.ones(3, dtype=int)
+
+    for k in range(3):
+        if params['pbc'][k] != 'p':
+            continue
+
+        # Check divisors of natoms from largest to smallest
+        for n in range(natoms, 1, -1):
+            if natoms % n != 0:
+                continue
+            trial = np.ones(3, dtype=int)
+            trial[k] = n
+            counts = np.unique(_frac_keys(atype, frac, trial, scale),
+                               return_counts=True)[1]
+            if np.all(counts == n):
+                mults[k] = n
+                break
+
+    # Group atoms by their reduced cell keys
+    keys = _frac_keys(atype, frac, mults, scale)
+    mult = int(np.prod(mults))
+    if mult == 1:
+        return params, 1, np.arange(natoms), keys
+    ukeys, first, amap, counts = np.unique(keys, return_index=True,
+                                           return_inverse=True, return_counts=True)
+    if not np.all(counts == mult):
+        return params, 1, np.arange(natoms), keys
+
+    # Build reduced box and atoms from the first atom in each group
+    xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = params['region_params']
+    newparams = dict(params)
+    newparams['region_params'] = [
+        xlo, xlo + (xhi - xlo) / mults[0],
+        ylo, ylo + (yhi - ylo) / mults[1],
+        zlo, zlo + (zhi - zlo) / mults[2],
+        xy / mults[1], xz / mults[2], yz / mults[2]]
+
+    newfrac = (frac[first] * mults) % 1.0
+    newpos = np.array([xlo, ylo, zlo]) + newfrac @ _box_matrix(newparams['region_params'])
+    newparams['x'] = newpos.flatten().tolist()
+    newparams['atype'] = atype[first].tolist()
+    if params.get('v', None) is not None:
+        v = np.asarray(params['v'], dtype=float).reshape(-1, 3)
+        newparams['v'] = v[first].flatten().tolist()
+
+    return newparams, mult, amap.reshape(-1), ukeys
+
+def _signature(params: dict,
+               keys: np.ndarray,
+               boxprec: float) -> tuple:
+    """Builds a hashable signature that identifies identical structures"""
+    region = np.round(np.asarray(params['region_params']) / boxprec).astype(np.int64)
+    return (tuple(params['pbc']), params['natypes'], tuple(params['symbols']),
+            tuple(params['masses']), params['units'], params['atom_style'],
+            params.get('pair_info', None), region.tobytes(), np.sort(keys).tobytes())
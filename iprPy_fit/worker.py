@@ -0,0 +1,139 @@
+"""
+Entry point for worker processes that evaluate paramsets.  Only numpy and
+the lammps Python package are imported by this module, so spawning many
+workers does not repeat the import of atomman, potentials, iprPy, yabadaba
+and scipy in each one.  The unit conversion factors that lib_output() would
+otherwise get from atomman are computed by the parent with unit_factors()
+and passed to init().
+"""
+from typing import Optional
+import time
+
+from .evaluate.lib_params import lib_params
+from .evaluate.lib_output import _unit_factors, _unit_factor_cache
+
+_lmp = None
+_paramsets = None
+
+def unit_factors(paramsets: list) -> dict:
+    """
+    Gets the unit conversion factors needed by workers for a list of
+    paramsets.  Called in the parent process.
+
+    Parameters
+    ----------
+    paramsets : list of dict
+        The paramsets as generated by dump_lammps_dynamic_parameters().
+
+    Returns
+    -------
+    dict
+        The energy, pressure and force conversion factors for each LAMMPS
+        units style used by the paramsets.
+    """
+    return {units: _unit_factors(units)
+            for units in set(params['units'] for params in paramsets)}
+
+def init(paramsets: list,
+         cmdargs: Optional[list] = None,
+         factors: Optional[dict] = None):
+    """
+    Creates the worker's LAMMPS object and stores the paramsets.  Used as
+    the initializer of worker processes.
+
+    Parameters
+    ----------
+    paramsets : list of dict
+        The paramsets as generated by dump_lammps_dynamic_parameters().
+    cmdargs : list, optional
+        The command line arguments used when creating the lammps.lammps
+        object.  Default value turns off the log and screen outputs.
+    factors : dict, optional
+        The unit conversion factors as returned by unit_factors().  If not
+        given, atomman is imported by the worker to get them.
+    """
+    global _lmp, _paramsets
+    from lammps import lammps
+
+    if cmdargs is None:
+        cmdargs = ['-log', 'none', '-screen', 'none']
+    if factors is not None:
+        _unit_factor_cache.update(factors)
+
+    _lmp = lammps(cmdargs=cmdargs)
+    _paramsets = paramsets
+
+def run_chunk(chunk, plan = None) -> list:
+    """
+    Evaluates a chunk of the worker's paramsets and times each one.
+
+    Parameters
+    ----------
+    chunk : list of int
+        The indices of the paramsets to evaluate.
+    plan : EvaluationPlan, optional
+        If given, only the planned values are computed and extracted.
+
+    Returns
+    -------
+    list of tuple
+        The index, results as returned by lib_params() and evaluation time
+        in seconds for each paramset.
+    """
+    results = []
+    for i in chunk:
+        start = time.perf_counter()
+        atoms = None if plan is None else plan.atoms(i)
+        raw = lib_params(_lmp, plan=plan, atoms=atoms, **_paramsets[i])
+        results.append((int(i), raw, time.perf_counter() - start))
+    return results
+
+def serve(conn,
+          paramsets: list,
+          cmdargs: Optional[list] = None,
+          factors: Optional[dict] = None):
+    """
+    Request loop of a supervised worker process.  Used as the target of
+    IsolatedEvaluator processes.  Each request is an (order, plan) tuple
+    and the (index, results) of each structure are sent back as soon as
+    they finish, followed by None.  A 'stop' message received between
+    structures ends the request early, and a None request ends the loop.
+    If an evaluation raises an error, its message is sent and the worker
+    exits as its LAMMPS object may no longer be usable.
+
+    Parameters
+    ----------
+    conn : multiprocessing.connection.Connection
+        The worker end of the pipe to the supervisor.
+    paramsets : list of dict
+        The paramsets as generated by dump_lammps_dynamic_parameters().
+    cmdargs : list, optional
+        The command line arguments used when creating the lammps.lammps
+        object.
+    factors : dict, optional
+        The unit conversion factors as returned by unit_factors().
+    """
+    init(paramsets, cmdargs, factors)
+    conn.send('ready')
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            if request == 'stop':
+                # Arrived after the request had already finished
+                continue
+            order, plan = request
+            for i in order:
+                if conn.poll() and conn.recv() == 'stop':
+                    break
+                try:
+                    atoms = None if plan is None else plan.atoms(i)
+                    raw = lib_params(_lmp, plan=plan, atoms=atoms, **_paramsets[i])
+                except Exception as err:
+                    conn.send(str(err))
+                    return
+                conn.send((int(i), raw))
+            conn.send(None)
+    finally:
+        _lmp.close()
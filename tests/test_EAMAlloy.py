@@ -0,0 +1,111 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from iprPy_fit.parambuilder import EAMAlloy, InfeasibleParameters
+
+def embedding(rho, F0):
+    return F0 * np.sqrt(rho)
+
+def rho_log_rho(rho, F0):
+    return F0 * rho * np.log(rho)
+
+def density(r, beta):
+    return np.exp(-beta * r)
+
+def pair(r, D, alpha):
+    return D * np.exp(-alpha * r) / r
+
+def build_eam():
+    eam = EAMAlloy(['Cu', 'Ni'], nrho=12, drho=0.5, nr=13, dr=0.25, header='test')
+    eam.set_element('Cu', 29, 63.546, 3.615)
+    eam.set_element('Ni', 28, 58.6934, 3.52)
+    for symbol in eam.symbols:
+        eam.set_embedding(symbol, embedding, F0=-1.5)
+        eam.set_density(symbol, density, beta=1.2)
+    eam.set_pair('Cu', 'Cu', pair, D=0.4, alpha=1.1)
+    eam.set_pair('Ni', 'Cu', pair, D=0.5, alpha=1.3)
+    eam.set_pair('Ni', 'Ni', pair, D=0.6, alpha=1.5)
+    return eam
+
+def read_setfl(text):
+    """Reads the tables of a setfl file"""
+    lines = text.splitlines()
+    symbols = lines[3].split()[1:]
+    grid = lines[4].split()
+    nrho = int(grid[0])
+    nr = int(grid[2])
+    values = ' '.join(lines[5:]).split()
+
+    tables = {}
+    i = 0
+    for symbol in symbols:
+        i += 4
+        tables[('F', symbol)] = np.array(values[i:i + nrho], dtype=float)
+        i += nrho
+        tables[('rho', symbol)] = np.array(values[i:i + nr], dtype=float)
+        i += nr
+    for j, symbol1 in enumerate(symbols):
+        for symbol2 in symbols[:j + 1]:
+            tables[('phi', symbol2, symbol1)] = np.array(values[i:i + nr], dtype=float)
+            i += nr
+    assert i == len(values)
+    return symbols, tables
+
+def test_parameter_names():
+    eam = build_eam()
+    assert eam.parameter_names == ['Cu_F_F0', 'Cu_rho_beta', 'Ni_F_F0',
+                                   'Ni_rho_beta', 'Cu_Cu_phi_D', 'Cu_Cu_phi_alpha',
+                                   'Cu_Ni_phi_D', 'Cu_Ni_phi_alpha',
+                                   'Ni_Ni_phi_D', 'Ni_Ni_phi_alpha']
+    with pytest.raises(ValueError):
+        eam.get_parameter_value('Ni_Cu_phi_D')
+
+def test_tabulate():
+    eam = build_eam()
+    assert eam.tabulate(('F', 'Cu')) == pytest.approx(-1.5 * np.sqrt(eam.rho_grid))
+
+    r = eam.r_grid
+    table = eam.tabulate(('phi', 'Ni', 'Cu'))
+    assert table[1:] == pytest.approx(0.5 * np.exp(-1.3 * r[1:]))
+    assert table[0] == table[1]
+
+def test_tabulate_cache():
+    eam = build_eam()
+    table = eam.tabulate(('rho', 'Ni'))
+    assert eam.tabulate(('rho', 'Ni')) is table
+
+    eam.update_parameter_values(Cu_rho_beta=2.0)
+    assert eam.tabulate(('rho', 'Ni')) is table
+
+    eam.update_parameter_values(Ni_rho_beta=2.0)
+    assert eam.tabulate(('rho', 'Ni')) == pytest.approx(np.exp(-2.0 * eam.r_grid))
+
+def test_tabulate_singular_embedding():
+    eam = build_eam()
+    eam.set_embedding('Cu', rho_log_rho, F0=1.0)
+    table = eam.tabulate(('F', 'Cu'))
+    assert np.all(np.isfinite(table))
+    assert table[0] == table[1]
+
+    eam.update_parameter_values(Cu_F_F0=np.inf)
+    with pytest.raises(InfeasibleParameters):
+        eam.tabulate(('F', 'Cu'))
+
+def test_paramfile_round_trip():
+    eam = build_eam()
+    eam.update_parameter_array(['Cu_Ni_phi_D', 'Ni_F_F0'], [0.75, -2.0])
+    symbols, tables = read_setfl(eam.build_paramfile())
+
+    assert symbols == ['Cu', 'Ni']
+    assert len(tables) == 7
+    for key, table in tables.items():
+        assert table == pytest.approx(eam.tabulate(key), rel=1e-11)
+
+def test_pickle():
+    eam = build_eam()
+    paramfile = eam.build_paramfile()
+    copy = pickle.loads(pickle.dumps(eam))
+    assert copy.parameter_names == eam.parameter_names
+    assert copy.build_paramfile() == paramfile
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from iprPy_fit.minimize import ErrorAccumulator, errorfxn
+
+ref_values = {
+    'E_pot_total': np.array([-8.0, -16.0, -9.0]),
+    'E_pot_atom': np.array([-4.0, -4.0, -3.0]),
+    'F': [np.zeros((2, 3)), np.zeros((4, 3)), np.ones((3, 3))],
+}
+weights = {'E_pot_total': 1.0, 'E_pot_atom': 0.5, 'F': None}
+
+def rawresult(E_pot_total, natoms):
+    return {'E_pot_total': E_pot_total, 'E_pot_atom': E_pot_total / natoms,
+            'F': None}
+
+def test_matches_errorfxn():
+    values = {'E_pot_total': np.array([-7.0, -15.0, -9.5]),
+              'E_pot_atom': np.array([-3.5, -3.75, -9.5 / 3])}
+    accumulator = ErrorAccumulator(ref_values, weights)
+    assert np.all(np.isnan(accumulator.errors))
+
+    for i in [2, 0, 1]:
+        accumulator.add(i, {'E_pot_total': values['E_pot_total'][i],
+                            'E_pot_atom': values['E_pot_atom'][i], 'F': None})
+    assert accumulator.complete
+    assert accumulator.nevaluated == 3
+    assert accumulator.error == pytest.approx(errorfxn(values, ref_values, weights))
+    assert accumulator.errors.sum() == pytest.approx(accumulator.error)
+    assert sum(accumulator.key_errors.values()) == pytest.approx(accumulator.error)
+    assert accumulator.key_errors['F'] == 0.0
+
+def test_readd_and_reset():
+    accumulator = ErrorAccumulator(ref_values, weights)
+    accumulator.add(0, rawresult(-7.0, 2))
+    assert accumulator.error == pytest.approx(1.0 + 1.0)
+    accumulator.add(0, rawresult(-8.0, 2))
+    assert accumulator.error == 0.0
+    assert not accumulator.complete
+
+    accumulator.reset()
+    assert accumulator.nevaluated == 0
+    assert accumulator.error == 0.0
+
+def test_reduction():
+    # Structures 0 and 1 are 2 and 4 atom cells of the same reduced structure
+    reduction = {'index': np.array([0, 0, 1]),
+                 'multiplier': np.array([1, 2, 1]),
+                 'atom_map': [np.array([0, 1]), np.array([0, 1, 0, 1]),
+                              np.array([0, 1, 2])]}
+    accumulator = ErrorAccumulator(ref_values, weights, reduction=reduction)
+    accumulator.add(0, rawresult(-7.0, 2))
+    assert accumulator.nevaluated == 2
+    assert accumulator.errors[:2] == pytest.approx([2.0, 4.0 + 1.0])
+    assert accumulator.error == pytest.approx(7.0)
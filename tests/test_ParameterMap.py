@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from iprPy_fit.parambuilder import ParameterMap, InfeasibleParameters
+
+def build_map():
+    parammap = ParameterMap(['Si_Si_Si_A', 'C_C_C_A', 'Si_Si_Si_h'])
+    parammap.mix('Si_C_C_A', ['Si_Si_Si_A', 'C_C_C_A'], rule='geometric')
+    parammap.mix('Si_C_C_B', ['Si_Si_Si_A', 'C_C_C_A'], coefficients=[0.25, 0.75])
+    parammap.tie('C_C_C_h', 'Si_Si_Si_h', scale=2.0, offset=0.1)
+    parammap.fix('Si_C_C_c', 1.5)
+    return parammap
+
+def test_expand():
+    parammap = build_map()
+    assert parammap.names == ['Si_Si_Si_A', 'C_C_C_A', 'Si_Si_Si_h',
+                              'Si_C_C_A', 'Si_C_C_B', 'C_C_C_h', 'Si_C_C_c']
+
+    values = parammap.expand([3000.0, 1000.0, 0.5])
+    assert values == pytest.approx([3000.0, 1000.0, 0.5,
+                                    np.sqrt(3000.0 * 1000.0), 1500.0, 1.1, 1.5])
+
+def test_expand_nonpositive_unrelated_free():
+    parammap = build_map()
+    values = parammap.expand([3000.0, 1000.0, -0.38])
+    assert np.all(np.isfinite(values))
+    assert values[3] == pytest.approx(np.sqrt(3000.0 * 1000.0))
+    assert values[5] == pytest.approx(-0.66)
+
+def test_expand_nonpositive_geometric_source():
+    parammap = build_map()
+    with pytest.raises(InfeasibleParameters, match='C_C_C_A'):
+        parammap.expand([3000.0, 0.0, 0.5])
+
+def test_rule_errors():
+    parammap = ParameterMap(['a'])
+    with pytest.raises(ValueError):
+        parammap.add_free('a')
+    with pytest.raises(ValueError):
+        parammap.mix('b', ['a'], coefficients=[0.5, 0.5])
+    with pytest.raises(ValueError):
+        parammap.mix('b', ['a'], rule='harmonic')
+    parammap.tie('b', 'c')
+    with pytest.raises(ValueError):
+        parammap.compile()
+
+def test_bounds_and_initial_values():
+    parammap = ParameterMap({'a': (0.0, 1.0)})
+    parammap.add_free('b', value=2.0)
+    assert parammap.bounds is None
+
+    class Builder():
+        def get_parameter_values(self, names):
+            return [0.25 for name in names]
+
+    assert parammap.initial_values(Builder()) == pytest.approx([0.25, 2.0])
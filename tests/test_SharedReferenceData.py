@@ -0,0 +1,64 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from iprPy_fit.reference import SharedReferenceData
+
+def paramset(natoms, v=False):
+    rng = np.random.default_rng(natoms)
+    return dict(units='metal', atom_style='atomic', pbc=[True, True, True],
+                natypes=1, region_params=list(range(9)),
+                atype=np.ones(natoms, dtype=int),
+                x=rng.random(3 * natoms),
+                v=rng.random(3 * natoms) if v else None,
+                symbols=['Si'], masses=[28.0855], pair_info=None)
+
+@pytest.fixture
+def shared_data():
+    paramsets = [paramset(2), paramset(8, v=True), paramset(1)]
+    ref_values = {'E_pot_atom': [-4.6, -4.3, -3.9],
+                  'F': [np.zeros((2, 3)), np.ones((8, 3)), None]}
+    with SharedReferenceData(paramsets, ref_values) as shared:
+        yield paramsets, ref_values, shared
+
+def check(paramsets, ref_values, shared):
+    assert len(shared) == 3
+    assert shared.natoms.tolist() == [2, 8, 1]
+    for original, loaded in zip(paramsets, shared):
+        assert np.array_equal(loaded['atype'], original['atype'])
+        assert np.array_equal(loaded['x'], original['x'])
+        if original['v'] is None:
+            assert loaded['v'] is None
+        else:
+            assert np.array_equal(loaded['v'], original['v'])
+        assert loaded['region_params'] == original['region_params']
+        assert loaded['symbols'] == original['symbols']
+
+    assert np.array_equal(shared.ref_values['E_pot_atom'], ref_values['E_pot_atom'])
+    assert np.array_equal(shared.ref_values['F'][1], ref_values['F'][1])
+    assert shared.ref_values['F'][2] is None
+
+def test_pack(shared_data):
+    paramsets, ref_values, shared = shared_data
+    check(paramsets, ref_values, shared)
+    assert shared[0] is shared[0]
+    assert not shared[1]['x'].flags.writeable
+
+def test_pickle(shared_data):
+    paramsets, ref_values, shared = shared_data
+
+    # Only the block name and layout are pickled
+    data = pickle.dumps(shared)
+    assert paramsets[1]['x'].tobytes() not in data
+    copy = pickle.loads(data)
+    assert copy.name == shared.name
+    check(paramsets, ref_values, copy)
+
+    ref_copy = pickle.loads(pickle.dumps(shared.ref_values))
+    assert np.array_equal(ref_copy['F'][0], ref_values['F'][0])
+    copy.close()
+
+def test_length_mismatch():
+    with pytest.raises(ValueError):
+        SharedReferenceData([paramset(2)], {'E_pot_atom': [1.0, 2.0]})
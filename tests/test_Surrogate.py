@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from iprPy_fit.minimize import Surrogate
+
+def error(x):
+    """Error whose log is quadratic in the parameters"""
+    x = np.asarray(x)
+    return np.exp(1.0 + (x[0] - 0.2)**2 + 2.0 * (x[1] + 0.1)**2)
+
+def trained(quadratic='diagonal', npoints=12, seed=2):
+    surrogate = Surrogate(2, bounds=[(-1.0, 1.0), (-1.0, 1.0)], quadratic=quadratic)
+    rng = np.random.default_rng(seed)
+    for x in rng.uniform(-1.0, 1.0, size=(npoints, 2)):
+        surrogate.add(x, error(x))
+    return surrogate
+
+def test_predict_exact_model():
+    surrogate = trained()
+    points = np.array([[0.0, 0.0], [0.5, -0.5], [-0.9, 0.8]])
+    assert surrogate.predict(points) == pytest.approx(error(points.T), rel=1e-6)
+    assert surrogate.rank(points).tolist() == [0, 1, 2]
+
+def test_known_and_nonfinite():
+    surrogate = Surrogate(2)
+    with pytest.raises(ValueError):
+        surrogate.predict([0.0, 0.0])
+    surrogate.add([0.5, 0.5], 3.0)
+    surrogate.add([0.1, 0.1], np.nan)
+    assert surrogate.npoints == 1
+    assert surrogate.known([0.5, 0.5]) == 3.0
+    assert surrogate.known([0.1, 0.1]) is None
+
+def test_promising():
+    surrogate = Surrogate(2, bounds=[(-1.0, 1.0), (-1.0, 1.0)])
+    assert surrogate.promising([5.0, 5.0], 1.0)
+
+    surrogate = trained()
+    assert surrogate.ready
+    best = error([0.2, -0.1])
+    assert surrogate.promising([0.2, -0.1], best)
+    assert not surrogate.promising([1.0, 1.0], best)
+
+def test_auto_terms():
+    surrogate = trained(quadratic='auto', npoints=5)
+    assert len(surrogate.terms) == 5
+    surrogate = trained(quadratic='auto', npoints=12)
+    assert len(surrogate.terms) == 6
+
+def test_reset():
+    surrogate = trained()
+    surrogate.reset()
+    assert surrogate.npoints == 0
+    assert not surrogate.ready
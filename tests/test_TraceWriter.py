@@ -0,0 +1,38 @@
+import threading
+
+import numpy as np
+import pytest
+
+from iprPy_fit.minimize import TraceWriter
+
+def test_write_and_read(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    with TraceWriter(path) as trace:
+        trace.write({'error': np.float64(2.5), 'params': np.array([1.0, np.nan])})
+        trace.write({'error': 1.0, 'partial': np.bool_(True), 'time': 0.0})
+    assert trace.count == 2
+    assert trace.failed == 0
+
+    records = TraceWriter.read(path)
+    assert records[0]['error'] == 2.5
+    assert records[0]['params'] == [1.0, None]
+    assert records[1] == {'error': 1.0, 'partial': True, 'time': 0.0}
+
+def test_bad_record_does_not_hang(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    trace = TraceWriter(path, maxsize=2)
+    trace.write({'x': object()})
+    with pytest.warns(UserWarning):
+        for i in range(5):
+            trace.write({'i': i})
+
+        # close() must return even though a record failed
+        closer = threading.Thread(target=trace.close)
+        closer.start()
+        closer.join(timeout=10)
+    assert not closer.is_alive()
+
+    assert trace.failed == 1
+    assert isinstance(trace.error, TypeError)
+    records = TraceWriter.read(path)
+    assert len(records) + trace.dropped == 5
@@ -0,0 +1,24 @@
+import numpy as np
+
+from iprPy_fit.evaluate import lpt_schedule
+
+def test_lpt_schedule():
+    costs = [5.0, 1.0, 8.0, 3.0, 3.0, 2.0]
+    assignments = lpt_schedule(costs, 3)
+
+    assert len(assignments) == 3
+    assert sorted(np.concatenate(assignments).tolist()) == list(range(6))
+
+    # Each worker's structures are listed from most to least expensive
+    for assignment in assignments:
+        assigned_costs = np.asarray(costs)[assignment]
+        assert np.all(np.diff(assigned_costs) <= 0)
+
+    # Loads are 8, 5 + 2 and 3 + 3 + 1
+    loads = [np.asarray(costs)[a].sum() for a in assignments]
+    assert sorted(loads) == [7.0, 7.0, 8.0]
+
+def test_lpt_schedule_more_workers_than_structures():
+    assignments = lpt_schedule([2.0, 1.0], 4)
+    assert len(assignments) == 2
+    assert [a.tolist() for a in assignments] == [[0], [1]]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from iprPy_fit.minimize import minfxn, TraceWriter
+from iprPy_fit.parambuilder import ParameterMap, Constraints, EAMAlloy
+
+class FakeBuilder():
+    """Parambuilder that records parameter updates and file saves"""
+    def __init__(self):
+        self.values = {}
+        self.saved = 0
+
+    def get_parameter_values(self, names):
+        return [self.values[name] for name in names]
+
+    def update_parameter_array(self, names, values):
+        self.values.update(zip(names, values))
+
+    def save_paramfile(self, paramfilename):
+        self.saved += 1
+
+def embedding(rho, F0):
+    return F0 * np.sqrt(rho)
+
+def density(r, beta):
+    return np.exp(-beta * r)
+
+def geometric_map():
+    parammap = ParameterMap(['a', 'b'])
+    parammap.mix('c', ['a', 'b'], rule='geometric')
+    return parammap
+
+def test_infeasible_parammap(tmp_path):
+    builder = FakeBuilder()
+    kwargs = dict(paramnames=['a', 'b'], parambuilder=builder,
+                  paramfilename='fake.param', ref_values={}, weights={},
+                  lmp='lmp_serial', parammap=geometric_map())
+
+    assert minfxn([-0.01, 4.0], **kwargs) == np.inf
+    assert minfxn([-0.01, 4.0], constraints=Constraints(penalty=1e8), **kwargs) == 1e8
+    assert builder.values == {}
+    assert builder.saved == 0
+
+    with TraceWriter(tmp_path / 'trace.jsonl') as trace:
+        minfxn([0.0, 4.0], trace=trace, **kwargs)
+    record = TraceWriter.read(tmp_path / 'trace.jsonl')[0]
+    assert record['params'] == [None, None, None]
+
+def test_infeasible_eam_table(tmp_path):
+    eam = EAMAlloy('Cu', nrho=10, drho=0.5, nr=10, dr=0.5)
+    eam.set_element('Cu', 29, 63.546)
+    eam.set_embedding('Cu', embedding, F0=-1.0)
+    eam.set_density('Cu', density, beta=1.0)
+    eam.set_pair('Cu', 'Cu', density, beta=1.0)
+
+    paramfile = tmp_path / 'Cu.eam.alloy'
+    kwargs = dict(paramnames=['Cu_rho_beta'], parambuilder=eam,
+                  paramfilename=paramfile, ref_values={}, weights={},
+                  lmp='lmp_serial')
+
+    # exp(-beta * r) overflows for large negative beta
+    assert minfxn([-1000.0], **kwargs) == np.inf
+    assert minfxn([-1000.0], constraints=Constraints(), **kwargs) == 1e10
+    assert not paramfile.exists()
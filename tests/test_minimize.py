@@ -0,0 +1,31 @@
+import importlib
+
+import pytest
+
+from iprPy_fit.minimize import minimize
+from iprPy_fit.lammps import SystemCache
+
+minimize_module = importlib.import_module('iprPy_fit.minimize.minimize')
+
+def test_n_starts_options(monkeypatch):
+    calls = []
+    def multistart(*args, **kwargs):
+        calls.append(kwargs)
+        return {}
+    monkeypatch.setattr(minimize_module, 'multistart', multistart)
+
+    args = (None, 'fake.param', {'a': (0.0, 1.0)}, {}, {})
+    minimize(*args, paramsets=[], n_starts=4)
+    minimize(*args, paramsets=[], n_starts=4, abort_ratio=3.0, abort_after=20)
+    assert calls[0]['abort_ratio'] is None
+    assert calls[1]['abort_ratio'] == 3.0
+    assert calls[1]['abort_after'] == 20
+
+def test_n_starts_unsupported():
+    args = (None, 'fake.param', {'a': (0.0, 1.0)}, {}, {})
+    with pytest.raises(ValueError, match='buffers'):
+        minimize(*args, paramsets=[], n_starts=4, buffers={})
+    with pytest.raises(ValueError, match='cache'):
+        minimize(*args, paramsets=[], n_starts=4, cache=SystemCache())
+    with pytest.raises(ValueError, match='abort_ratio'):
+        minimize(*args, paramsets=[], n_starts=4, abort_ratio=0.5)
@@ -0,0 +1,58 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from iprPy_fit.minimize import minimize_batch, structure_error
+
+batch_module = importlib.import_module('iprPy_fit.minimize.minimize_batch')
+
+def test_inclusion_weights():
+    weights = {'E_pot_atom': 0.5, 'P_xx': [1.0, None, 2.0, 4.0], 'F': None}
+    index = np.array([1, 3])
+    inclusion = np.array([1.0, 0.25, 0.5, 0.04])
+    batch_weights = batch_module._inclusion_weights(weights, index, inclusion, 4)
+
+    assert batch_weights['F'] is None
+    assert batch_weights['E_pot_atom'] == pytest.approx([0.25, 0.1])
+    assert batch_weights['P_xx'][0] is None
+    assert batch_weights['P_xx'][1] == pytest.approx(0.8)
+
+def test_inclusion_weighted_error():
+    # Each batch structure's error is divided by its inclusion probability
+    ref_values = {'E_pot_atom': np.array([-4.0, -3.0, -2.0])}
+    values = {'E_pot_atom': np.array([-3.0, -2.5, -2.0])}
+    weights = {'E_pot_atom': 1.0}
+    inclusion = np.array([0.5, 0.2, 1.0])
+    index = np.array([0, 1])
+
+    batch_ref = batch_module._subset(ref_values, index, 3)
+    batch_weights = batch_module._inclusion_weights(weights, index, inclusion, 3)
+    for j, i in enumerate(index):
+        error = structure_error({'E_pot_atom': values['E_pot_atom'][i]}, j,
+                                batch_ref, batch_weights)
+        full_error = structure_error({'E_pot_atom': values['E_pot_atom'][i]}, i,
+                                     ref_values, weights)
+        assert error == pytest.approx(full_error / inclusion[i])
+
+def test_subset():
+    values = {'a': np.arange(4), 'b': ['w', 'x', 'y', 'z'], 'c': 'constant'}
+    subset = batch_module._subset(values, np.array([3, 0]), 4)
+    assert np.all(subset['a'] == [3, 0])
+    assert subset['b'] == ['z', 'w']
+    assert subset['c'] == 'constant'
+    assert batch_module._subset(None, np.array([0]), 4) is None
+
+def test_inclusion_probabilities():
+    rng = np.random.default_rng(3)
+    costs = np.array([1.0, 1.0, 1.0, 1.0])
+    importance = np.array([1.0, 1.0, 1.0, 0.0])
+    inclusion = batch_module._inclusion_probabilities(costs, importance, 2.0, 500, rng)
+    assert inclusion[3] == 0.0
+    assert np.all(inclusion[:3] > 0.0)
+    assert np.all(inclusion <= 1.0)
+
+def test_rejects_lammps_executable():
+    with pytest.raises(ValueError, match='executable'):
+        minimize_batch(None, 'fake.param', ['a'], {}, {}, lmp='lmp_serial',
+                       scripts=['run 0'])
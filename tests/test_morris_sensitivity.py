@@ -0,0 +1,124 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from iprPy_fit.minimize import morris_sensitivity
+from iprPy_fit.evaluate import EvaluationError
+from iprPy_fit.parambuilder import Constraints
+
+morris_module = importlib.import_module('iprPy_fit.minimize.morris_sensitivity')
+
+ref_values = {
+    'E_pot_atom': np.array([-4.6, -4.3, -3.9]),
+    'F': [np.zeros((2, 3)), np.ones((1, 3)), np.full((3, 3), 0.5)],
+}
+
+class FakeBuilder():
+    """Array-backed parameters with the parambuilder methods used by morris_sensitivity"""
+    names = ['a', 'b']
+
+    def __init__(self):
+        self.parameter_array = np.zeros(2)
+
+    @property
+    def values(self):
+        return dict(zip(self.names, self.parameter_array.tolist()))
+
+    def compile_parameter_map(self, names):
+        return np.array([self.names.index(name) for name in names], dtype=int)
+
+    def get_parameter_values(self, names):
+        return self.parameter_array[self.compile_parameter_map(names)].tolist()
+
+    def update_parameter_array(self, names, values):
+        self.parameter_array[self.compile_parameter_map(names)] = values
+
+    def save_paramfile(self, paramfilename):
+        pass
+
+def fake_evaluate(builder):
+    """evaluate() where a shifts the energies and b shifts the forces"""
+    def evaluate(**kwargs):
+        a = builder.values['a']
+        b = builder.values['b']
+        return {'E_pot_atom': ref_values['E_pot_atom'] + a,
+                'F': [F + b for F in ref_values['F']]}
+    return evaluate
+
+def test_term_errors_exact_match_is_zero():
+    weights = {'E_pot_atom': 1.0, 'F': 1.0}
+    errors = morris_module._term_errors(ref_values, ref_values, weights,
+                                        ['E_pot_atom', 'F'])
+    assert np.all(errors == 0.0)
+
+def test_term_errors_per_structure():
+    weights = {'E_pot_atom': 0.5, 'F': 1.0}
+    results = {'E_pot_atom': ref_values['E_pot_atom'] + 1.0,
+               'F': [F + 2.0 for F in ref_values['F']]}
+    errors = morris_module._term_errors(results, ref_values, weights,
+                                        ['E_pot_atom', 'F'])
+    assert errors[0] == pytest.approx(3 * (1.0 / 0.5)**2)
+    assert errors[1] == pytest.approx(6 * 3 * 2.0**2)
+    assert errors[2] == pytest.approx(errors[0] + errors[1])
+
+def test_morris_separates_terms(monkeypatch):
+    builder = FakeBuilder()
+    monkeypatch.setattr(morris_module, 'evaluate', fake_evaluate(builder))
+
+    weights = {'E_pot_atom': 1.0, 'F': 1.0}
+    results = morris_sensitivity(builder, 'fake.param',
+                                 {'a': (0.1, 1.0), 'b': (0.1, 1.0)},
+                                 ref_values, weights, n_trajectories=4,
+                                 transform='affine', seed=1)
+
+    assert results['terms'] == ['E_pot_atom', 'F', 'total']
+    mu_star = results['mu_star']
+    # a only affects the energies and b only the forces
+    assert mu_star[0, 0] > 0.0 and mu_star[0, 1] == 0.0
+    assert mu_star[1, 1] > 0.0 and mu_star[1, 0] == 0.0
+
+    # initial values are restored
+    assert builder.values == {'a': 0.0, 'b': 0.0}
+
+def test_morris_skips_infeasible_points(monkeypatch):
+    builder = FakeBuilder()
+    evaluate = fake_evaluate(builder)
+    def failing_evaluate(**kwargs):
+        if builder.values['b'] > 0.9:
+            raise EvaluationError('LAMMPS crashed')
+        return evaluate(**kwargs)
+    monkeypatch.setattr(morris_module, 'evaluate', failing_evaluate)
+
+    # a > 0.9 is infeasible and b > 0.9 fails to evaluate
+    constraints = Constraints()
+    constraints.add_function(lambda values: 0.9 - values[0], ['a'])
+
+    weights = {'E_pot_atom': 1.0, 'F': 1.0}
+    results = morris_sensitivity(builder, 'fake.param',
+                                 {'a': (0.1, 1.0), 'b': (0.1, 1.0)},
+                                 ref_values, weights, n_trajectories=6,
+                                 levels=4, transform='affine',
+                                 constraints=constraints, seed=3)
+
+    # Steps toward the top level of a or b are always rejected
+    assert np.all(results['n_effects'] > 0)
+    mu_star = results['mu_star']
+    assert mu_star[0, 0] > 0.0 and mu_star[0, 1] == 0.0
+    assert mu_star[1, 1] > 0.0 and mu_star[1, 0] == 0.0
+    assert builder.values == {'a': 0.0, 'b': 0.0}
+
+def test_morris_needs_positive_weight():
+    with pytest.raises(ValueError, match='positive weight'):
+        morris_sensitivity(FakeBuilder(), 'fake.param', {'a': (0.1, 1.0)},
+                           ref_values, {'E_pot_atom': 0.0, 'F': None})
+
+def test_effect_statistics():
+    effects = np.full((3, 2, 1), np.nan)
+    effects[:, 0, 0] = [1.0, -3.0, np.nan]
+    mu_star, mu, sigma, counts = morris_module._effect_statistics(effects)
+    assert counts.tolist() == [2, 0]
+    assert mu_star[0, 0] == 2.0
+    assert mu[0, 0] == -1.0
+    assert sigma[0, 0] == pytest.approx(np.sqrt(8.0))
+    assert np.isnan(mu_star[1, 0]) and np.isnan(sigma[1, 0])
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from iprPy_fit.minimize import structure_error
+
+ref_values = {
+    'E_pot_atom': [-4.0, -3.0, None],
+    'P_xx': [0.0, 10.0, 20.0],
+    'F': [np.zeros((2, 3)), np.ones((1, 3)), None],
+}
+
+def test_exact_match():
+    weights = {'E_pot_atom': 0.1, 'P_xx': 1.0, 'F': 0.5}
+    for i in range(2):
+        values = {key: ref_values[key][i] for key in ref_values}
+        assert structure_error(values, i, ref_values, weights) == 0.0
+
+def test_weights():
+    values = {'E_pot_atom': -2.0, 'P_xx': 13.0, 'F': np.full((1, 3), 2.0)}
+    weights = {'E_pot_atom': 0.5, 'P_xx': [None, 3.0, 1.0], 'F': 2.0}
+    error = structure_error(values, 1, ref_values, weights)
+    assert error == pytest.approx(4.0 + 1.0 + 3 * 0.25)
+
+def test_skipped_terms():
+    values = {'E_pot_atom': 0.0, 'P_xx': 30.0, 'F': None}
+    weights = {'E_pot_atom': 1.0, 'P_xx': [1.0, 1.0, np.nan], 'F': 1.0}
+    assert structure_error(values, 2, ref_values, weights) == 0.0
+
+    weights = {'E_pot_atom': None, 'P_xx': 0.0}
+    assert structure_error(values, 0, ref_values, weights) == 0.0
+
+def test_importance():
+    ref = {'F': [np.zeros((3, 3))], 'F_importance': [np.array([1.0, 2.0, 0.0])]}
+    values = {'F': np.ones((3, 3))}
+    assert structure_error(values, 0, ref, {'F': 1.0}) == pytest.approx(9.0)